@@ -9,12 +9,12 @@ import json
 import re
 import random
 import logging
+import tempfile
 import streamlit.components.v1 as components
 from datetime import datetime, timedelta
 from itertools import combinations
 
 # --- Imports de Terceiros --
-import requests
 import pandas as pd
 import numpy as np
 import streamlit as st
@@ -60,7 +60,6 @@ def fetch_espn_scoreboard(progress_ui=False):
     Busca jogos e ODDS BRUTAS direto da API da ESPN.
     Salva tudo no session_state['scoreboard'].
     """
-    import requests
     from datetime import datetime, timedelta
     
     try:
@@ -71,7 +70,7 @@ def fetch_espn_scoreboard(progress_ui=False):
         date_str = et_now.strftime("%Y%m%d")
         
         url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/nba/scoreboard?dates={date_str}"
-        resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
+        resp = http_get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
         data = resp.json()
         
         games = []
@@ -129,15 +128,8 @@ def fetch_espn_scoreboard(progress_ui=False):
 # ============================================================================
 
 # Mapa de tradução NBA Oficial -> Códigos URL da ESPN
-# Essencial para baixar elencos e fotos corretamente.
-ESPN_TEAM_CODES = {
-    "ATL": "atl", "BOS": "bos", "BKN": "bkn", "CHA": "cha", "CHI": "chi",
-    "CLE": "cle", "DAL": "dal", "DEN": "den", "DET": "det", "GSW": "gs",
-    "HOU": "hou", "IND": "ind", "LAC": "lac", "LAL": "lal", "MEM": "mem",
-    "MIA": "mia", "MIL": "mil", "MIN": "min", "NOP": "no", "NYK": "ny",
-    "OKC": "okc", "ORL": "orl", "PHI": "phi", "PHX": "pho", "POR": "por",
-    "SAC": "sac", "SAS": "sa", "TOR": "tor", "UTA": "utah", "WAS": "wsh"
-}
+# Essencial para baixar elencos e fotos corretamente (vive no roster_loader).
+from roster_loader import roster_snapshot, player_key, slate_teams
 # ============================================================================
 # 1. CONFIGURAÇÃO DE CAMINHOS E BANCO DE DADOS
 # ============================================================================
@@ -166,11 +158,21 @@ DVP_CACHE_FILE = os.path.join(CACHE_DIR, "dvp_cache.json")
 AUDIT_CACHE_FILE = os.path.join(CACHE_DIR, "audit_trixies.json")
 FEATURE_STORE_FILE = os.path.join(CACHE_DIR, "feature_store.json")
 LOGS_CACHE_FILE = os.path.join(CACHE_DIR, "real_game_logs.json")
+L5_CHECKPOINT_FILE = os.path.join(CACHE_DIR, "l5_checkpoint.json") # download L5 parcial (retomada)
 
 # Se o arquivo se chama db_manager.py:
-from db_manager import db, DatabaseHandler
+from db_manager import create_database_handler, dumps_clean
+from nba_scheduler import nba_frame, PRIORITY_BACKGROUND, scheduler as nba_scheduler
+from http_client import http_get, http as http_client
+from boxscore_store import boxscore_store, parse_espn_players, PlayerIndex
+from h2h_table import h2h_table
+from ingest_worker import job_lock, KEY_INGEST_HEALTH, INGEST_HEALTH_FILE
+from player_log_store import get_log_store
+from player_identity import get_player_identity
+from game_slate import get_game_slate, canonical_team
+from injury_index import get_injury_index
 try:
-    db = DatabaseHandler()
+    db = create_database_handler()  # Supabase ou SQLite (DB_BACKEND)
     if not db.connected:
         db = None # Garante que é None se falhar, pro código usar fallback
 except:
@@ -205,19 +207,59 @@ def get_data_universal(key_db, file_fallback=None):
     
     return data
 
+def get_identity(logs=None):
+    """Resolver nome -> ID/foto do processo (L5 da sessão + logs + nba_players_map.json)."""
+    try: df_l5 = st.session_state.get('df_l5')
+    except Exception: df_l5 = None  # fora do Streamlit (worker/scripts)
+    return get_player_identity(df_l5=df_l5, logs=logs)
+
+def get_many_universal(keys):
+    """
+    Versão em lote do get_data_universal (só nuvem): uma ida ao Supabase
+    para todas as chaves. Retorna {key: valor ou None}.
+    """
+    if not db or not keys: return {k: None for k in keys}
+    try:
+        return db.get_many(keys)
+    except Exception as e:
+        print(f"⚠️ Erro nuvem lote {keys}: {e}")
+        return {k: None for k in keys}
+
+def get_logs_for_slate(games):
+    """
+    real_game_logs apenas dos times do slate: com a chave fatiada por time,
+    baixa só os shards necessários. Sem jogos (ou sem nuvem), cai no completo.
+    """
+    teams = set()
+    for g in games or []:
+        if isinstance(g, dict):
+            teams.update(normalize_team(g.get(side)) for side in ("home", "away") if g.get(side))
+    if db and teams:
+        try:
+            data = db.get_shards(KEY_LOGS, teams)
+            if data: return data
+        except Exception as e:
+            print(f"⚠️ Erro shards '{KEY_LOGS}': {e}")
+    return get_data_universal(KEY_LOGS, LOGS_CACHE_FILE)
+
 # ============================================================================
 # FUNÇÃO SAVE BLINDADA v2 (COM REPORT DE ERRO DETALHADO)
 # ============================================================================
-def save_data_universal(key_db, data, file_path=None):
-    import json
+def save_data_universal(key_db, data, file_path=None, background=None):
+    """
+    Salva local (síncrono) e na nuvem. background=True manda o upload para a
+    fila write-behind do db_manager; None segue o modo global do painel de Config.
+    """
     import time
     
     sucesso_nuvem = False
     
-    # 1. Limpeza
+    # 1. Limpeza (passada única: NaN/Infinity -> null, tipos Numpy/Pandas/datas)
+    sanitized = False
+    json_str = None
     try:
-        json_str = json.dumps(data, default=str).replace("NaN", "null").replace("Infinity", "null")
-        clean_data = json.loads(json_str)
+        clean_data, json_str = dumps_clean(data)
+        sanitized = True
         size_kb = len(json_str) / 1024
         print(f"📦 [CLEAN] '{key_db}': {size_kb:.2f} KB")
     except Exception as e:
@@ -225,13 +267,24 @@ def save_data_universal(key_db, data, file_path=None):
         clean_data = data
         size_kb = 0
 
-    # 2. Salva na Nuvem
+    # 2. Salva Local (sempre síncrono: durabilidade não depende da fila)
+    if file_path and json_str is not None:
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(json_str)
+        except: pass
+
+    # 3. Salva na Nuvem
     if db:
         try:
+            if background is None: background = db.write_behind_enabled()
             start_time = time.time()
-            db.save_data(key_db, clean_data) # Tenta salvar
+            db.save_data(key_db, clean_data, background=background, sanitized=sanitized) # Tenta salvar
             duration = time.time() - start_time
-            print(f"☁️ [UPLOAD] '{key_db}' salvo! ({duration:.2f}s)")
+            if background:
+                print(f"📤 [QUEUE] '{key_db}' na fila de upload ({duration:.2f}s)")
+            else:
+                print(f"☁️ [UPLOAD] '{key_db}' salvo! ({duration:.2f}s)")
             sucesso_nuvem = True
         except Exception as e:
             # --- AQUI ESTÁ A MUDANÇA: MOSTRAR O ERRO REAL NA TELA ---
@@ -239,13 +292,6 @@ def save_data_universal(key_db, data, file_path=None):
             print(f"❌ [ERRO UPLOAD] '{key_db}': {erro_txt}")
             st.error(f"❌ Erro ao salvar '{key_db}' no Supabase: {erro_txt}") 
             # Isso vai imprimir o erro técnico (ex: 413, 500, timeout)
-            
-    # 3. Salva Local
-    if file_path:
-        try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(json_str)
-        except: pass
     
     return sucesso_nuvem
 
@@ -261,6 +307,7 @@ KEY_TEAM_ADV = "team_advanced"
 KEY_TEAM_OPP = "team_opponent"
 KEY_ODDS = "pinnacle_odds"
 KEY_LOGS = "real_game_logs"
+KEY_LOGS_META = "real_game_logs_meta" # último GAME_DATE ingerido (modo incremental)
 KEY_INJURIES = "injuries"
 KEY_NAME_OVERRIDES = "name_overrides"
 KEY_PLAYERS_MAP = "nba_players_map"
@@ -366,6 +413,7 @@ RotationCeilingEngine = None
 SinergyEngine = None
 AuditSystem = None
 PinnacleClient = None
+pinnacle_props_index = None
 MomentumEngine = None
 DesdobradorInteligente = None
 
@@ -464,14 +512,17 @@ try:
     if AuditSystem: AUDIT_AVAILABLE = True
 
     # Pinnacle
-    try:
-        from pinnacle_client import PinnacleClient
+    # (antes só tentava a raiz; o cliente mora em modules/new_modules)
+    PinnacleClient = safe_import("pinnacle_client", "PinnacleClient")
+    pinnacle_props_index = safe_import("pinnacle_client", "props_index")
+    if PinnacleClient and pinnacle_props_index:
         PINNACLE_AVAILABLE = True
-    except ImportError:
+    else:
         class PinnacleClient: 
             def __init__(self, *args, **kwargs): pass
             def get_nba_games(self): return []
-            def get_player_props(self, game_id): return []
+            def get_player_props(self, game_id, raise_errors=False): return []
+        pinnacle_props_index = None
 
     # ========================================================================
     # 6. ALIASES DE COMPATIBILIDADE (A CORREÇÃO DO SEU ERRO ESTÁ AQUI)
@@ -502,10 +553,180 @@ if 'scoreboard' not in st.session_state: st.session_state.scoreboard = []
 if 'use_advanced_features' not in st.session_state: st.session_state.use_advanced_features = False
 if 'advanced_features_config' not in st.session_state: st.session_state.advanced_features_config = FEATURE_CONFIG_DEFAULT
 
+# ============================================================================
+# JANELAS POR JOGADOR (VETORIZADO)
+# ============================================================================
+LOG_STAT_COLS = ['PTS', 'REB', 'AST', 'STL', 'BLK', 'FGA', 'FG3M', 'TOV', 'PF']
+
+def build_player_log_windows(df_all, window=30):
+    """
+    Monta {nome: {name, id, team, logs: {STAT: [...]}, updated_at}} com os
+    últimos `window` jogos de cada jogador a partir do LeagueGameLog inteiro.
+    Uma ordenação + cumcount, e cada coluna vira lista uma única vez
+    (antes era um filtro booleano na liga toda por jogador).
+    """
+    if df_all is None or df_all.empty: return {}
+    df = df_all.copy()
+
+    cols_int = [c for c in LOG_STAT_COLS if c in df.columns]
+    for c in cols_int:
+        df[c] = df[c].fillna(0).astype(int)
+
+    df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
+    df = df.sort_values(by=['PLAYER_ID', 'GAME_DATE'], ascending=[True, False])
+    df = df[df.groupby('PLAYER_ID', sort=False).cumcount() < window]
+
+    # Fronteiras de cada jogador no frame já ordenado
+    pids = df['PLAYER_ID'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, pids[1:] != pids[:-1]])
+    ends = np.r_[starts[1:], len(pids)]
+
+    def parse_min(x):
+        try: return float(x)
+        except: return 0.0
+
+    columns = {c: df[c].tolist() for c in cols_int}
+    if 'MIN' in df.columns:
+        columns['MIN'] = [parse_min(x) for x in df['MIN'].tolist()]
+
+    names = df['PLAYER_NAME'].tolist()
+    teams = df['TEAM_ABBREVIATION'].tolist()
+    dates = df['GAME_DATE'].dt.strftime("%Y-%m-%d").tolist()
+    game_ids = df['GAME_ID'].astype(str).tolist() if 'GAME_ID' in df.columns else None
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    results = {}
+    for a, b in zip(starts.tolist(), ends.tolist()):
+        p_name = names[a]
+        results[p_name] = {
+            "name": p_name,
+            "id": int(pids[a]),
+            "team": teams[a],
+            "logs": {c: vals[a:b] for c, vals in columns.items()},
+            "game_dates": dates[a:b],
+            "updated_at": today
+        }
+        # GAME_ID por jogo: é o que permite a ingestão incremental deduplicar
+        if game_ids is not None: results[p_name]["game_ids"] = game_ids[a:b]
+    return results
+
+
+def merge_new_games_into_windows(existing, fresh, window=30):
+    """
+    Encaixa os jogos novos (janelas de build_player_log_windows só com as
+    datas recentes) no início da janela de cada jogador, descartando GAME_IDs
+    já presentes e cortando em `window`. Retorna (merged, nomes_alterados).
+    """
+    merged = dict(existing)
+    changed = []
+    for p_name, new_entry in fresh.items():
+        old_entry = existing.get(p_name)
+        if not old_entry:
+            merged[p_name] = new_entry
+            changed.append(p_name)
+            continue
+
+        seen = set(old_entry.get('game_ids') or [])
+        keep = [i for i, gid in enumerate(new_entry.get('game_ids') or []) if gid not in seen]
+        if not keep: continue
+
+        old_logs = old_entry.get('logs', {})
+        logs = {}
+        for stat in set(old_logs) | set(new_entry['logs']):
+            new_vals = new_entry['logs'].get(stat)
+            head = [new_vals[i] for i in keep] if new_vals is not None else [0] * len(keep)
+            logs[stat] = (head + list(old_logs.get(stat, [])))[:window]
+
+        entry = dict(old_entry)
+        entry.update({
+            "id": new_entry["id"],
+            "team": new_entry["team"],  # troca de time: vale o jogo mais recente
+            "logs": logs,
+            "game_dates": ([new_entry['game_dates'][i] for i in keep] + list(old_entry.get('game_dates', [])))[:window],
+            "game_ids": ([new_entry['game_ids'][i] for i in keep] + list(old_entry.get('game_ids', [])))[:window],
+            "updated_at": new_entry["updated_at"]
+        })
+        merged[p_name] = entry
+        changed.append(p_name)
+    return merged, changed
+
+# Colunas do L5 derivado: STAT na tabela <- chaves aceitas no logs do jogador
+L5_STAT_SOURCES = {
+    'MIN': ['MIN'], 'PTS': ['PTS'], 'REB': ['REB'], 'AST': ['AST'],
+    'STL': ['STL'], 'BLK': ['BLK'], 'FG3M': ['FG3M', '3PM']
+}
+
+def derive_l5_from_game_logs(logs_store, window=5, long_window=10):
+    """
+    Monta o df_l5 (mesmo esquema do fetch_player_stats_safe: *_AVG, *_CV,
+    LAST_MIN, PRA_AVG, *_L5) direto do real_game_logs, sem API.
+    Cada stat vira uma matriz jogadores x jogos (NaN onde não há jogo) e as
+    médias/CVs saem em operações de coluna. Inclui também *_AVG_L10.
+    """
+    entries = [e for e in (logs_store or {}).values()
+               if isinstance(e, dict) and isinstance(e.get('logs'), dict) and e['logs']]
+    if not entries: return pd.DataFrame()
+    width = max(window, long_window)
+    n = len(entries)
+
+    def stat_matrix(sources):
+        lists = []
+        for e in entries:
+            vals = next((e['logs'][k] for k in sources if e['logs'].get(k)), None) or []
+            lists.append(vals[:width])
+        lens = np.fromiter((len(v) for v in lists), dtype=np.int64, count=n)
+        m = np.full((n, width), np.nan)
+        if lens.sum():
+            flat = np.array([x for v in lists for x in v], dtype=float)
+            rows = np.repeat(np.arange(n), lens)
+            cols = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+            m[rows, cols] = flat
+        return m
+
+    def mean_of(m):
+        cnt = np.sum(~np.isnan(m), axis=1)
+        return np.where(cnt > 0, np.nansum(m, axis=1) / np.maximum(cnt, 1), 0.0)
+
+    def cv_of(m):
+        cnt = np.sum(~np.isnan(m), axis=1)
+        mean = np.nansum(m, axis=1) / np.maximum(cnt, 1)
+        var = np.nansum((m - mean[:, None]) ** 2, axis=1) / np.maximum(cnt, 1)
+        safe_mean = np.where(mean == 0, 1.0, mean)
+        return np.where((cnt == 0) | (mean == 0), 1.0, np.sqrt(var) / safe_mean)
+
+    mats = {stat: stat_matrix(src) for stat, src in L5_STAT_SOURCES.items()}
+    mats['PRA'] = mats['PTS'] + mats['REB'] + mats['AST']
+
+    df = pd.DataFrame({
+        "PLAYER_ID": [int(e.get('id') or 0) for e in entries],
+        "PLAYER": [e.get('name') for e in entries],
+        "TEAM": [e.get('team') for e in entries],
+    })
+    for stat, m in mats.items():
+        df[f"{stat}_AVG"] = mean_of(m[:, :window])
+        df[f"{stat}_AVG_L10"] = mean_of(m[:, :long_window])
+    for stat in ['MIN', 'PTS', 'REB', 'AST']:
+        df[f"{stat}_CV"] = cv_of(mats[stat][:, :window])
+
+    last_min = mats['MIN'][:, 0]
+    df["LAST_MIN"] = np.where(np.isnan(last_min), df["MIN_AVG"], last_min)
+    df["3PM_AVG"] = df["FG3M_AVG"]
+    for stat in ['MIN', 'PTS', 'REB', 'AST', 'PRA']:
+        df[f"{stat.lower()}_L5"] = df[f"{stat}_AVG"]
+
+    # Sem nenhum jogo na janela não entra na tabela
+    return df[np.sum(~np.isnan(mats['PTS'][:, :window]), axis=1) > 0].reset_index(drop=True)
+
 # ============================================================================
 # FUNÇÃO LOGS: MODO TURBO v2 (COM TIMEOUT DE 120s)
 # ============================================================================
-def fetch_and_upload_real_game_logs(progress_ui=True):
+def fetch_and_upload_real_game_logs(progress_ui=True, incremental=False):
+    """
+    Baixa o LeagueGameLog e publica as janelas de 30 jogos em 'real_game_logs'.
+    incremental=True pede à API só as datas a partir do último GAME_DATE
+    ingerido (guardado em 'real_game_logs_meta') e encaixa os jogos novos nas
+    janelas existentes; cai no modo completo se não houver base compatível.
+    """
     from nba_api.stats.endpoints import leaguegamelog
     import pandas as pd
     import json
@@ -514,78 +735,81 @@ def fetch_and_upload_real_game_logs(progress_ui=True):
     SEASON_CURRENT = "2025-26"
     KEY_LOGS = "real_game_logs"
 
+    # --- MODO INCREMENTAL: precisa do meta + janelas com game_ids ---
+    existing, date_from = {}, None
+    if incremental:
+        meta = get_data_universal(KEY_LOGS_META) or {}
+        if meta.get("season") == SEASON_CURRENT and meta.get("last_game_date"):
+            existing = get_data_universal(KEY_LOGS) or {}
+            if existing and all(isinstance(v, dict) and 'game_ids' in v for v in existing.values()):
+                date_from = meta["last_game_date"]
+        if not date_from:
+            print("⚠️ [LOGS] Sem base incremental compatível. Rodando carga completa.")
+            existing = {}
+
     if progress_ui:
-        status_box = st.status("🚀 MODO TURBO: Baixando temporada inteira...", expanded=True)
+        label = f"⚡ INCREMENTAL: jogos desde {date_from}..." if date_from else "🚀 MODO TURBO: Baixando temporada inteira..."
+        status_box = st.status(label, expanded=True)
         status_box.write("📡 Conectando ao servidor da NBA (LeagueGameLog)...")
 
     try:
-        # --- CORREÇÃO: TIMEOUT AUMENTADO PARA 120 SEGUNDOS ---
-        logs_api = leaguegamelog.LeagueGameLog(
+        params = dict(
             season=SEASON_CURRENT,
             player_or_team_abbreviation='P', 
             direction='DESC', 
             sorter='DATE',
             timeout=120  # <--- AQUI ESTÁ A CORREÇÃO DO TIMEOUT
         )
-        df_all = logs_api.get_data_frames()[0]
+        if date_from:
+            # Inclui o próprio dia do último ingest (jogos que terminaram depois);
+            # duplicatas saem pelo GAME_ID no merge.
+            params["date_from_nullable"] = datetime.strptime(date_from, "%Y-%m-%d").strftime("%m/%d/%Y")
+
+        # --- CORREÇÃO: TIMEOUT AUMENTADO PARA 120 SEGUNDOS ---
+        df_all = nba_frame(leaguegamelog.LeagueGameLog, priority=PRIORITY_BACKGROUND, **params)
         
         if df_all.empty:
+            if date_from:
+                if progress_ui: status_box.update(label="✅ Nenhum jogo novo.", state="complete", expanded=False)
+                return existing
             if progress_ui: status_box.error("A API retornou vazio.")
             return {}
 
         if progress_ui: status_box.write(f"📦 Processando {len(df_all)} registros de jogos...")
 
-        # Processamento Local
-        cols_int = ['PTS', 'REB', 'AST', 'STL', 'BLK', 'FGA', 'FG3M', 'TOV', 'PF']
-        for c in cols_int:
-            if c in df_all.columns: df_all[c] = df_all[c].fillna(0).astype(int)
-
-        df_all['GAME_DATE'] = pd.to_datetime(df_all['GAME_DATE'])
-        df_all = df_all.sort_values(by=['PLAYER_ID', 'GAME_DATE'], ascending=[True, False])
-
-        results = {}
-        unique_players = df_all['PLAYER_ID'].unique()
-        total_p = len(unique_players)
-        processed_count = 0
-        bar = status_box.progress(0)
-        
-        for pid in unique_players:
-            player_games = df_all[df_all['PLAYER_ID'] == pid].head(30)
-            if player_games.empty: continue
-            
-            p_name = player_games.iloc[0]['PLAYER_NAME']
-            p_team = player_games.iloc[0]['TEAM_ABBREVIATION']
-            
-            clean_logs = {}
-            for col in cols_int:
-                if col in player_games.columns:
-                    clean_logs[col] = player_games[col].tolist()
-            
-            if 'MIN' in player_games.columns:
-                def parse_min(x):
-                    try: return float(x)
-                    except: return 0.0
-                clean_logs['MIN'] = player_games['MIN'].apply(parse_min).tolist()
-
-            results[p_name] = {
-                "name": p_name,
-                "id": int(pid),
-                "team": p_team,
-                "logs": clean_logs,
-                "updated_at": datetime.now().strftime("%Y-%m-%d")
-            }
-            
-            processed_count += 1
-            if progress_ui and processed_count % 100 == 0:
-                bar.progress(processed_count / total_p)
+        # Processamento Local (vetorizado: uma ordenação + um groupby)
+        fresh = build_player_log_windows(df_all, window=30)
+        if date_from:
+            results, changed = merge_new_games_into_windows(existing, fresh, window=30)
+            if progress_ui: status_box.write(f"🧮 {len(changed)} jogadores com jogos novos.")
+        else:
+            results, changed = fresh, list(fresh)
+            if progress_ui: status_box.write(f"🧮 {len(results)} jogadores processados.")
 
-        # Salva no Supabase
-        if results:
+        # Salva no Supabase (chave fatiada por time: só sobem os times alterados)
+        logs_saved = True
+        if results and changed:
             if progress_ui: status_box.write("☁️ Enviando pacote para Nuvem...")
-            save_data_universal(KEY_LOGS, results)
+            logs_saved = save_data_universal(KEY_LOGS, results)
+
+        # O meta só avança se os logs subiram: senão o próximo incremental leria
+        # a base antiga da nuvem e pularia os jogos entre as duas datas
+        if results and not logs_saved:
+            print("⚠️ [LOGS] Upload falhou: 'real_game_logs_meta' mantido na data anterior.")
+            if progress_ui:
+                status_box.update(label="⚠️ Logs processados, mas o envio para a nuvem falhou.", state="error", expanded=True)
+        elif results:
+            last_date = pd.to_datetime(df_all['GAME_DATE']).max().strftime("%Y-%m-%d")
+            if date_from and last_date < date_from: last_date = date_from
+            save_data_universal(KEY_LOGS_META, {
+                "season": SEASON_CURRENT,
+                "last_game_date": last_date,
+                "players": len(results),
+                "updated_at": datetime.now().isoformat()
+            })
             
             if progress_ui:
-                status_box.update(label=f"⚡ TURBO COMPLETO! {len(results)} jogadores atualizados.", state="complete", expanded=False)
+                status_box.update(label=f"⚡ TURBO COMPLETO! {len(changed)} jogadores atualizados.", state="complete", expanded=False)
         
         return results
 
@@ -598,7 +822,7 @@ def fetch_and_upload_real_game_logs(progress_ui=True):
 # ==============================================================================
 # FUNÇÃO PONTE (WRAPPER) PARA COMPATIBILIDADE
 # ==============================================================================
-def update_batch_cache(games_list, force_all=False):
+def update_batch_cache(games_list, force_all=False, incremental=False):
     """
     Função de compatibilidade. 
     O botão 'Reconstruir Cache' chama esta função.
@@ -606,13 +830,13 @@ def update_batch_cache(games_list, force_all=False):
     """
     import streamlit as st
     
-    # Ignoramos 'games_list' e 'force_all' porque o Turbo V3 baixa a liga inteira
-    # de uma vez só, o que é mais seguro e garante que temos todos os jogadores.
+    # 'games_list' é ignorado: o Turbo V3 trabalha com a liga inteira.
+    # Por padrão reconstrói a temporada; incremental=True (e sem force_all)
+    # pede só as datas novas desde o último ingest.
     
     st.toast("Iniciando Motor Turbo V3...", icon="🚀")
     
-    # Chama a função V3.0 (que você deve ter colado anteriormente)
-    return fetch_and_upload_real_game_logs(progress_ui=True)
+    return fetch_and_upload_real_game_logs(progress_ui=True, incremental=incremental and not force_all)
     
 
 # ==============================================================================
@@ -642,12 +866,13 @@ def fetch_real_time_team_stats():
     """Busca Pace e Stats Defensivos via NBA API"""
     try:
         from nba_api.stats.endpoints import leaguedashteamstats
-        stats = leaguedashteamstats.LeagueDashTeamStats(
+        df = nba_frame(
+            leaguedashteamstats.LeagueDashTeamStats,
+            priority=PRIORITY_BACKGROUND,
             measure_type_detailed_defense='Advanced',
             season=SEASON,
             per_mode_detailed='PerGame'
         )
-        df = stats.get_data_frames()[0]
         if df.empty: return None
 
         advanced_data = {}
@@ -717,89 +942,37 @@ def show_cloud_diagnostics():
 class OracleEngine:
     def __init__(self, logs_cache, injuries_data):
         self.logs = logs_cache
-        self.injuries_names = self._process_injuries(injuries_data)
-
-    def _process_injuries(self, raw_injuries):
-        """Cria uma 'Blocklist' de nomes normalizados de jogadores lesionados (OUT)."""
-        blacklist = set()
-        if not raw_injuries: return blacklist
-        
-        # Flattening da lista de lesões (Mesma lógica do Depto Médico)
-        flat_list = []
-        stack = [raw_injuries]
-        while stack:
-            curr = stack.pop()
-            if isinstance(curr, list):
-                if curr and isinstance(curr[0], dict) and ('player' in curr[0] or 'name' in curr[0]):
-                    flat_list.extend(curr)
-                else: stack.extend(curr)
-            elif isinstance(curr, dict):
-                for v in curr.values(): stack.append(v)
-        
-        for item in flat_list:
-            # Só bloqueia quem está OUT. GTD/Day-to-Day a gente projeta (com risco).
-            status = str(item.get('status', '')).upper()
-            if "OUT" in status:
-                name = item.get('player') or item.get('name')
-                if name:
-                    # Normaliza: "LeBron James" -> "LEBRONJAMES"
-                    clean = str(name).upper().replace(" ", "").replace(".", "").replace("'", "").strip()
-                    blacklist.add(clean)
-        return blacklist
+        # Índice de lesões compartilhado (só OUT bloqueia; GTD/Day-to-Day a gente projeta com risco)
+        self.injuries = get_injury_index(injuries_data)
 
     def generate_projections(self, limit=10):
         """
         Gera as projeções matemáticas ponderadas (50% L5, 30% L10, 20% L25).
         Retorna: Lista de dicionários ordenada pela maior projeção de Pontos (por enquanto).
         """
-        projections = []
-        
-        for player_name, data in self.logs.items():
-            # 1. Filtro de Lesão
-            clean_name = str(player_name).upper().replace(" ", "").replace(".", "").replace("'", "").strip()
-            if clean_name in self.injuries_names:
-                continue # Pula jogador lesionado
-
-            # 2. Dados Básicos
-            team = data.get('team')
-            logs = data.get('logs', {})
-            pts_log = logs.get('PTS', [])
-            
-            # Filtro Mínimo: Precisa ter jogado pelo menos 5 jogos recentes
-            if len(pts_log) < 5: continue
-            
-            # 3. Matemática do Oráculo (Weighted Average)
-            def calculate_oracle_stat(values_list):
-                if not values_list: return 0.0
-                # Garante janelas
-                l5 = values_list[:5]
-                l10 = values_list[:10]
-                l25 = values_list[:25] # Pega tudo se tiver menos que 25
-                
-                avg_l5 = sum(l5) / len(l5)
-                avg_l10 = sum(l10) / len(l10)
-                avg_l25 = sum(l25) / len(l25)
-                
-                # Fórmula: 50% Forma + 30% Médio Prazo + 20% Histórico
-                weighted = (avg_l5 * 0.50) + (avg_l10 * 0.30) + (avg_l25 * 0.20)
-                return weighted
-
-            proj_pts = calculate_oracle_stat(logs.get('PTS', []))
-            proj_reb = calculate_oracle_stat(logs.get('REB', []))
-            proj_ast = calculate_oracle_stat(logs.get('AST', []))
-            proj_3pm = calculate_oracle_stat(logs.get('3PM', [])) # Supondo que tenhamos 3PM, senão zerar
-
-            # Só mostra jogadores relevantes (Projeção > 15 PTS)
-            if proj_pts < 15: continue
-
-            projections.append({
-                "name": player_name,
-                "team": team,
-                "PTS": proj_pts,
-                "REB": proj_reb,
-                "AST": proj_ast,
-                "3PM": proj_3pm
-            })
+        store = get_log_store(self.logs)
+        if not store.size: return []
+
+        # 1. Filtro de Lesão + mínimo de 5 jogos recentes (uma máscara para a liga toda)
+        out = self.injuries.blocked("OUT")
+        keep = (store.count('PTS', store.max_games) >= 5) & np.array([player_key(n) not in out for n in store.names], dtype=bool)
+
+        # 2. Matemática do Oráculo (Weighted Average): 50% Forma + 30% Médio Prazo + 20% Histórico
+        def calculate_oracle_stat(stat):
+            return store.mean(stat, 5) * 0.50 + store.mean(stat, 10) * 0.30 + store.mean(stat, 25) * 0.20
+
+        proj = {stat: calculate_oracle_stat(stat) for stat in ('PTS', 'REB', 'AST', '3PM')}
+
+        # Só mostra jogadores relevantes (Projeção > 15 PTS)
+        keep &= proj['PTS'] >= 15
+        projections = [{
+            "name": store.names[i],
+            "team": store.teams[i],
+            "PTS": float(proj['PTS'][i]),
+            "REB": float(proj['REB'][i]),
+            "AST": float(proj['AST'][i]),
+            "3PM": float(proj['3PM'][i])
+        } for i in np.flatnonzero(keep)]
 
         # Ordena pelos maiores pontuadores (Estrelas do Show)
         # Futuramente podemos ordenar por "Value" se tivermos as lines das casas
@@ -816,7 +989,6 @@ class OracleEngine:
 # ============================================================================
 def show_oracle_page():
     import os
-    import pandas as pd
     import streamlit as st
     import re
     import unicodedata
@@ -824,7 +996,6 @@ def show_oracle_page():
     import matplotlib.patches as patches
     from matplotlib.offsetbox import OffsetImage, AnnotationBbox
     import io
-    from urllib.request import urlopen
     from PIL import Image
 
     # --- 1. CSS VISUAL ---
@@ -898,39 +1069,13 @@ def show_oracle_page():
     # --- 3. DADOS ---
     full_cache = get_data_universal("real_game_logs", os.path.join("cache", "real_game_logs.json"))
     injuries_data = get_data_universal('injuries') or get_data_universal('injuries_cache_v44')
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame()) 
     
     if not full_cache:
         st.warning("⚠️ Aguardando dados... Por favor, atualize o L5 na Config.")
         return
 
-    # --- 4. MAPA DE ROSTER (DYNAMIC) ---
-    roster_map = {}
-    if not df_l5.empty:
-        # Normaliza colunas
-        df_l5.columns = [str(c).upper().strip() for c in df_l5.columns]
-        # Remove duplicatas
-        df_l5 = df_l5.loc[:, ~df_l5.columns.duplicated()]
-
-        col_name = next((c for c in ['PLAYER_NAME', 'PLAYER', 'NAME', 'FULL_NAME'] if c in df_l5.columns), None)
-        col_id = next((c for c in ['PLAYER_ID', 'ID', 'PERSON_ID'] if c in df_l5.columns), None)
-        col_team = next((c for c in ['TEAM_ABBREVIATION', 'TEAM', 'TEAM_ID'] if c in df_l5.columns), None)
-        
-        if col_name and col_id:
-            for _, row in df_l5.iterrows():
-                try:
-                    k = clean_key(row[col_name])
-                    raw_id = row[col_id]
-                    if isinstance(raw_id, pd.Series): raw_id = raw_id.iloc[0]
-                    val_id = int(float(raw_id)) if pd.notnull(raw_id) else 0
-                    
-                    raw_team = row[col_team] if col_team else "UNK"
-                    if isinstance(raw_team, pd.Series): raw_team = raw_team.iloc[0]
-
-                    # Só salva se tiver ID válido
-                    if val_id > 0:
-                        roster_map[k] = {'id': val_id, 'team': str(raw_team).upper()}
-                except: continue
+    # --- 4. MAPA DE ROSTER (RESOLVER COMPARTILHADO: L5 + LOGS + MAPA LOCAL) ---
+    identity = get_identity(full_cache)
 
     # --- 5. BUNKER DE ESTRELAS (STATIC BACKUP) ---
     ELITE_DB_BACKUP = {
@@ -986,10 +1131,11 @@ def show_oracle_page():
         pid = 0
         real_team = "UNK"
         
-        # 1. Tenta Busca Dinâmica (L5)
-        if search_key in roster_map:
-            pid = roster_map[search_key]['id']
-            real_team = roster_map[search_key]['team']
+        # 1. Tenta Busca Dinâmica (L5 / logs / mapa)
+        meta = identity.resolve(raw_name)
+        if meta['id'] > 0:
+            pid = meta['id']
+            real_team = str(meta['team'] or "UNK").upper()
         
         # 2. Backup Manual
         if pid == 0:
@@ -1058,11 +1204,10 @@ def show_oracle_page():
         # Header
         try:
             logo_url = "https://i.ibb.co/TxfVPy49/Sem-t-tulo.png"
-            with urlopen(logo_url) as url:
-                logo_img = Image.open(url)
-                imagebox = OffsetImage(logo_img, zoom=0.15)
-                ab = AnnotationBbox(imagebox, (10, 95), frameon=False, box_alignment=(0, 0.5))
-                ax.add_artist(ab)
+            logo_img = Image.open(io.BytesIO(http_get(logo_url, timeout=5, max_age=86400).content))
+            imagebox = OffsetImage(logo_img, zoom=0.15)
+            ab = AnnotationBbox(imagebox, (10, 95), frameon=False, box_alignment=(0, 0.5))
+            ax.add_artist(ab)
         except: pass
 
         ax.text(20, 96, "ORACLE PROJECTIONS", color=COLOR_GOLD, fontsize=20, weight='bold', fontname='DejaVu Sans')
@@ -1153,35 +1298,14 @@ def show_props_odds_page():
                 st.error("Primeiro atualize os jogos do dia (Botão da esquerda)!")
             else:
                 games = st.session_state['pinnacle_games']
-                progress_bar = st.progress(0)
-                status_text = st.empty()
                 
                 try:
                     client = PinnacleClient("13e1dd2e12msh72d0553fca0e8aap16eeacjsn9d69ddb0d2bb")
-                    full_map = {}
-                    total = len(games)
-                    
-                    for i, game in enumerate(games):
-                        status_text.text(f"Processando {i+1}/{total}: {game['away_team']} @ {game['home_team']}")
-                        props = client.get_player_props(game['game_id'])
-                        for p in props:
-                            name = p['player']
-                            if name not in full_map:
-                                full_map[name] = {}
-                            
-                            # Salva a linha e a odd
-                            full_map[name][p['market']] = {
-                                "line": p['line'],
-                                "odds": p['odds']
-                            }
-                        progress_bar.progress((i + 1) / total)
-                    
-                    st.session_state['pinnacle_props_map'] = full_map
-                    progress_bar.empty()
-                    status_text.empty()
+                    full_map, sync_stats = sync_pinnacle_props(client, games)
                     
                     total_props = sum(len(v) for v in full_map.values())
                     st.success(f"✅ {len(full_map)} jogadores | {total_props} props sincronizados!")
+                    st.caption(f"{sync_stats['changed']} jogos com mudança · {sync_stats['unchanged']} iguais · {sync_stats['failed']} falhas")
                     
                 except Exception as e:
                     st.error(f"Erro ao buscar props: {e}")
@@ -1352,29 +1476,14 @@ def show_dvp_analysis():
         return TEAM_CORRECTION.get(raw, raw)
 
     # --- 4. FILTRO DE LESÕES ---
-    banned_players = set()
+    # Índice compartilhado (achatamento único do payload, consulta O(1) por jogador)
+    INJURY_EXCLUSION = ('out', 'doubt', 'surg', 'injur', 'protocol', 'day', 'dtd', 'quest')
     try:
-        fresh_inj = get_data_universal('injuries_cache_v44') or get_data_universal('injuries_data')
-        raw_inj = fresh_inj or []
-        flat_inj = []
-        if isinstance(raw_inj, dict):
-            for t in raw_inj.values(): 
-                if isinstance(t, list): flat_inj.extend(t)
-        elif isinstance(raw_inj, list): flat_inj = raw_inj
-        
-        EXCLUSION = ['OUT', 'DOUBT', 'SURG', 'INJUR', 'PROTOCOL', 'DAY', 'DTD', 'QUEST']
-        for item in flat_inj:
-            p_name = ""
-            status = ""
-            if isinstance(item, dict):
-                p_name = item.get('player') or item.get('name') or ""
-                status = str(item.get('status', '')).upper()
-            elif isinstance(item, str):
-                p_name = item.split('-')[0]
-                status = str(item).upper()
-            if p_name and any(x in status for x in EXCLUSION):
-                banned_players.add(normalize_str(p_name))
-    except: pass
+        injuries = get_injury_index(get_data_universal('injuries_cache_v44') or get_data_universal('injuries_data'))
+    except: injuries = get_injury_index(None)
+
+    def is_banned(name):
+        return injuries.is_blocked(name, policy=INJURY_EXCLUSION)
 
     # --- 5. ROSTER BUILDER ---
     
@@ -1430,7 +1539,7 @@ def show_dvp_analysis():
                     
                     if row_team == team_code:
                         nm = normalize_str(row.get(c_name, ''))
-                        if nm in banned_players: continue
+                        if is_banned(nm): continue
                         
                         try: mins = float(row.get(c_min, 0))
                         except: mins = 0
@@ -1454,7 +1563,7 @@ def show_dvp_analysis():
                 
                 if t == team_code:
                     nm = normalize_str(p_name)
-                    if nm in existing or nm in banned_players: continue
+                    if nm in existing or is_banned(nm): continue
                     
                     logs = p_data.get('logs', {})
                     mins = logs.get('MIN_AVG', 0)
@@ -1539,7 +1648,6 @@ def show_dvp_analysis():
 # ============================================================================
 def show_blowout_hunter_page():
     import json
-    import pandas as pd
     import re
     import time
     import numpy as np
@@ -1649,61 +1757,11 @@ def show_blowout_hunter_page():
     """, unsafe_allow_html=True)
 
     # --- 3. MOTOR DE FOTOS INTELIGENTE (SMART ID MAP) ---
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame())
-    NAME_TO_ID = {}
-    LASTNAME_TEAM_TO_ID = {}
-    
-    if not df_l5.empty:
-        try:
-            # Garante nomes de colunas
-            df_l5.columns = [str(c).upper().strip() for c in df_l5.columns]
-            
-            c_name = next((c for c in df_l5.columns if c in ['PLAYER_NAME', 'PLAYER', 'NAME']), 'PLAYER')
-            c_id = next((c for c in df_l5.columns if c in ['PLAYER_ID', 'ID', 'PERSON_ID']), 'PLAYER_ID')
-            c_team = next((c for c in df_l5.columns if c in ['TEAM', 'TEAM_ABBREVIATION', 'TEAM_CODE']), 'TEAM')
-
-            # Popula Mapas
-            for _, row in df_l5.iterrows():
-                try:
-                    pid = int(float(row.get(c_id, 0)))
-                    if pid == 0: continue
-                    
-                    full_name = normalize_str(str(row.get(c_name, '')))
-                    team_code = normalize_team_code(str(row.get(c_team, '')))
-                    
-                    # Mapa 1: Nome Completo -> ID
-                    NAME_TO_ID[full_name] = pid
-                    
-                    # Mapa 2: Sobrenome + Time -> ID (Para fallbacks)
-                    parts = full_name.split()
-                    if len(parts) > 0:
-                        lastname = parts[-1]
-                        key = f"{lastname}_{team_code}"
-                        LASTNAME_TEAM_TO_ID[key] = pid
-                except: continue
-        except: pass
+    identity = get_identity()
 
     # --- 4. MONITOR DE LESÕES ---
-    banned_players = set()
-    EXCLUSION_KEYWORDS = ['OUT', 'DOUBTFUL', 'SURGERY', 'INJURED', 'PROTOCOL', 'SUSPENDED', 'G LEAGUE', 'PERSONAL']
-    
-    raw_inj_source = get_data_universal('injuries') or st.session_state.get('injuries_data', [])
-    if raw_inj_source:
-        flat_inj = []
-        if isinstance(raw_inj_source, dict):
-            for t in raw_inj_source.values():
-                if isinstance(t, list): flat_inj.extend(t)
-        elif isinstance(raw_inj_source, list): flat_inj = raw_inj_source
-            
-        for item in flat_inj:
-            try:
-                p_name = item.get('player') or item.get('name') or ""
-                status = str(item.get('status', '')).upper()
-                if p_name:
-                    norm = normalize_str(p_name)
-                    if norm and any(x in status for x in EXCLUSION_KEYWORDS):
-                        banned_players.add(norm)
-            except: continue
+    # Índice compartilhado; política UNAVAILABLE = OUT/Doubtful/Surgery/Protocol/Suspended/G League/Personal
+    injuries = get_injury_index(get_data_universal('injuries') or st.session_state.get('injuries_data', []))
 
     # --- 5. ENGINE & LOOP ---
     DNA_DB = st.session_state.get('dna_final_v27', {})
@@ -1791,21 +1849,10 @@ def show_blowout_hunter_page():
                         valid_players = []
                         for p in data:
                             p_clean = normalize_str(p.get('clean_name') or p['name'])
-                            if p_clean in banned_players: continue 
+                            if injuries.is_blocked(p_clean, policy="UNAVAILABLE"): continue 
                             
-                            # --- BUSCA INTELIGENTE DE ID ---
-                            fresh_id = 0
-                            # 1. Tenta Nome Completo
-                            if p_clean in NAME_TO_ID:
-                                fresh_id = NAME_TO_ID[p_clean]
-                            else:
-                                # 2. Tenta Sobrenome + Time
-                                parts = p_clean.split()
-                                if len(parts) > 0:
-                                    lname = parts[-1]
-                                    key = f"{lname}_{t_clean_code}"
-                                    if key in LASTNAME_TEAM_TO_ID:
-                                        fresh_id = LASTNAME_TEAM_TO_ID[key]
+                            # --- BUSCA INTELIGENTE DE ID (nome -> sobrenome + time -> fuzzy) ---
+                            fresh_id = identity.player_id(p_clean, t_clean_code)
                             
                             # Atualiza ID se achou um melhor que o zero
                             if fresh_id != 0: p['id'] = fresh_id
@@ -2119,14 +2166,13 @@ def show_momentum_page():
 import math
 import json
 import os
-import unicodedata
 import streamlit as st 
 
 class NexusEngine:
     def __init__(self, logs_cache, games):
         self.logs = logs_cache
         self.games = games # Lista de jogos do dia (Scoreboard)
-        self.player_ids = self._load_photo_map()
+        self.identity = get_identity()
         
         # Módulos (com verificação segura)
         self.injury_monitor = InjuryMonitor() if 'InjuryMonitor' in globals() and InjuryMonitor else None
@@ -2168,24 +2214,8 @@ class NexusEngine:
         # Tenta mapear, se não der, pega os 3 primeiros caracteres
         return mapping.get(t, t[:3])
 
-    def _strip_accents(self, text):
-        try:
-            text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode("utf-8")
-            return str(text)
-        except: return str(text)
-
-    def _load_photo_map(self):
-        if os.path.exists("nba_players_map.json"):
-            try:
-                with open("nba_players_map.json", "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except: pass
-        return {}
-
     def get_photo(self, name):
-        pid = self.player_ids.get(name) or self.player_ids.get(self._strip_accents(name))
-        if pid: return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
-        return "https://cdn.nba.com/headshots/nba/latest/1040x760/fallback.png"
+        return self.identity.headshot(name)
 
     def get_team_logo(self, team_abbr):
         abbr = self._normalize_team(team_abbr).lower()
@@ -2398,13 +2428,15 @@ class NexusEngine:
 
     # --- AUXILIARES ---
     def _get_avg_stat(self, player, stat):
+        # Média L10 da liga inteira calculada uma vez por stat (store colunar)
         try:
-            player_data = self.logs.get(player)
-            if not player_data: return 0
-            vals = player_data.get('logs', {}).get(stat, [])
-            if not vals: return 0
-            limit = min(len(vals), 10)
-            return sum(vals[:limit])/limit
+            if not hasattr(self, '_avg_l10'):
+                self._store, self._avg_l10 = get_log_store(self.logs), {}
+            if stat not in self._avg_l10:
+                self._avg_l10[stat] = self._store.mean(stat, 10)
+            row = self._store.row.get(player)
+            if row is None: return 0
+            return float(self._avg_l10[stat][row])
         except: return 0
 
     def _get_opponent(self, team):
@@ -2431,10 +2463,7 @@ class NexusEngine:
 # ============================================================================
 def show_trinity_club_page():
     import os
-    import pandas as pd
     import streamlit as st
-    import re
-    import unicodedata
 
     # --- 1. CSS VISUAL (MANTIDO) ---
     st.markdown("""
@@ -2501,163 +2530,68 @@ def show_trinity_club_page():
     
     # 2. CARREGAMENTO DE DADOS
     full_cache = get_data_universal("real_game_logs", os.path.join("cache", "real_game_logs.json"))
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame()) 
     
     if not full_cache:
         st.warning("Aguardando sincronização de logs...")
         return
 
     # ==============================================================================
-    # 3. MOTOR NUCLEAR DE IDENTIFICAÇÃO (ID VAULT V2)
+    # 3. MOTOR NUCLEAR DE IDENTIFICAÇÃO (RESOLVER COMPARTILHADO)
     # ==============================================================================
-    
-    def nuclear_normalize(text):
-        """
-        Remove TUDO que não for letra ou número.
-        Ex: 'Luka Dončić' -> 'LUKADONCIC'
-        Ex: 'Shai Gilgeous-Alexander' -> 'SHAIGILGEOUSALEXANDER'
-        Ex: 'C.J. McCollum' -> 'CJMCCOLLUM'
-        """
-        if not text: return ""
-        try:
-            # Normaliza Unicode (remove acentos)
-            text = unicodedata.normalize('NFKD', str(text)).encode('ASCII', 'ignore').decode('utf-8')
-            text = text.upper()
-            # Remove sufixos comuns (Jr, Sr, etc) ANTES de limpar tudo
-            for suffix in [" JR", " SR", " III", " II", " IV"]:
-                if text.endswith(suffix):
-                    text = text.replace(suffix, "")
-            # Remove tudo que não é letra ou numero
-            text = re.sub(r'[^A-Z0-9]', '', text)
-            return text
-        except: return ""
-
-    ID_VAULT = {}
-    
-    if not df_l5.empty:
-        try:
-            # Padroniza Colunas
-            df_l5.columns = [str(c).upper().strip() for c in df_l5.columns]
-            
-            # Encontra colunas vitais
-            c_name = next((c for c in df_l5.columns if c in ['PLAYER_NAME', 'PLAYER', 'NAME']), 'PLAYER')
-            c_id = next((c for c in df_l5.columns if c in ['PLAYER_ID', 'ID', 'PERSON_ID']), 'PLAYER_ID')
-            c_team = next((c for c in df_l5.columns if c in ['TEAM', 'TEAM_ABBREVIATION', 'TEAM_CODE']), 'TEAM')
-
-            for _, row in df_l5.iterrows():
-                try:
-                    raw_id = row.get(c_id, 0)
-                    pid = int(float(raw_id))
-                    
-                    if pid > 0:
-                        raw_name = str(row.get(c_name, ''))
-                        raw_team = str(row.get(c_team, 'UNK')).upper().strip()
-                        
-                        # Chave 1: Nome Completo Nuclear (LUKADONCIC)
-                        k1 = nuclear_normalize(raw_name)
-                        ID_VAULT[k1] = pid
-                        
-                        # Chave 2: Sobrenome Nuclear + Time (DONCIC_DAL)
-                        parts = raw_name.split()
-                        if len(parts) > 1:
-                            lname = nuclear_normalize(parts[-1])
-                            k2 = f"{lname}_{raw_team}"
-                            ID_VAULT[k2] = pid
-                            
-                except: continue
-        except Exception as e: pass
+    identity = get_identity(full_cache)
 
     def resolve_player_id(player_name, team_abbr):
-        """Tenta encontrar o ID da NBA a todo custo."""
-        # 1. Tenta Nome Completo Limpo
-        k1 = nuclear_normalize(player_name)
-        if k1 in ID_VAULT: return ID_VAULT[k1]
-        
-        # 2. Tenta Sobrenome + Time
-        parts = player_name.split()
-        if len(parts) > 0:
-            lname = nuclear_normalize(parts[-1])
-            k2 = f"{lname}_{team_abbr}"
-            if k2 in ID_VAULT: return ID_VAULT[k2]
-        
-        # 3. Tenta Match Parcial (Lento, mas salva)
-        # Ex: "Nicolas Claxton" vs "Nic Claxton"
-        for vault_key, vault_id in ID_VAULT.items():
-            if k1 in vault_key or vault_key in k1:
-                # Verifica se o sobrenome bate para não dar falso positivo
-                if len(parts) > 1:
-                    lname = nuclear_normalize(parts[-1])
-                    if lname in vault_key:
-                        return vault_id
-
-        return 0
+        """ID da NBA: nome exato -> sobrenome + time -> prefixo/trigramas (memoizado)."""
+        return identity.player_id(player_name, team_abbr)
 
     # ==============================================================================
 
     # 4. ENGINE TRINITY
     class TrinityEngine:
-        def __init__(self, logs_cache, games):
+        def __init__(self, logs_cache, slate):
             self.logs = logs_cache
-            self.games_map = self._map_games(games)
-            
-        def _normalize_team(self, team_code):
-            mapping = {"NY": "NYK", "GS": "GSW", "PHO": "PHX", "NO": "NOP", "SA": "SAS", "WSH": "WAS", "UTAH": "UTA", "NOH": "NOP", "BRK": "BKN", "CHO": "CHA"}
-            return mapping.get(str(team_code).upper(), str(team_code).upper())
-
-        def _map_games(self, games):
-            mapping = {}
-            for g in games:
-                home = self._normalize_team(g.get('home'))
-                away = self._normalize_team(g.get('away'))
-                gid = g.get('game_id') or g.get('id') or "UNK"
-                if home and away:
-                    mapping[home] = {"opp": away, "is_home": True, "game_str": f"{away} @ {home}", "game_id": gid}
-                    mapping[away] = {"opp": home, "is_home": False, "game_str": f"{away} @ {home}", "game_id": gid}
-            return mapping
+            self.slate = get_game_slate(slate)
 
         def scan_market(self, window=10):
             candidates = []
             if not self.logs: return []
-
-            for player_name, data in self.logs.items():
-                raw_team = data.get('team')
-                if not raw_team: continue
-                team = self._normalize_team(raw_team)
-                if team not in self.games_map: continue
-                
-                logs = data.get('logs', {})
-                if not logs: continue
-                ctx = self.games_map[team]
-                
-                # Armazena ID do ESPN se existir no log (Fallback)
-                espn_id = data.get('id', 0)
-                
+            store = get_log_store(self.logs)
+
+            # Só quem joga hoje; janela inteira por stat de uma vez (piso = mínimo da janela)
+            rows = store.rows_for_teams(self.slate.teams, normalize=canonical_team)
+            if not len(rows): return []
+            per_stat = {}
+            for stat in ['PTS', 'REB', 'AST']:
+                full = store.count(stat, window, rows) >= window
+                floor_form = store.min(stat, window, rows)
+                safe_floor = np.where(full, np.trunc(np.nan_to_num(floor_form) * 0.95), -1)
+                min_req = 10 if stat == 'PTS' else 4
+                per_stat[stat] = (full & (safe_floor >= min_req), floor_form, safe_floor)
+
+            for k, r in enumerate(rows.tolist()):
+                player_name, raw_team = store.names[r], store.teams[r]
+                ctx = self.slate.context(raw_team)
+                team = ctx['team']
                 for stat in ['PTS', 'REB', 'AST']:
-                    values = logs.get(stat, [])
-                    if len(values) < window: continue 
-                    
-                    current_window_values = values[:window]
-                    floor_form = min(current_window_values)
-                    safe_floor = int(floor_form * 0.95) 
-                    
-                    min_req = 10 if stat == 'PTS' else 4
-                    if safe_floor >= min_req:
-                        candidates.append({
-                            "player": player_name,
-                            "team": team, # Time normalizado
-                            "raw_team": raw_team,
-                            "opp": ctx['opp'],
-                            "stat": stat,
-                            "line": safe_floor - 1,
-                            "floors": {"Form": floor_form, "Venue": floor_form, "H2H": int(floor_form*0.9)},
-                            "score": safe_floor,
-                            "game_str": ctx['game_str'],
-                            "espn_id": espn_id # Passamos o ID original caso precise
-                        })
+                    ok, floors, safe = per_stat[stat]
+                    if not ok[k]: continue
+                    floor_form, safe_floor = int(floors[k]), int(safe[k])
+                    candidates.append({
+                        "player": player_name,
+                        "team": team, # Time normalizado
+                        "raw_team": raw_team,
+                        "opp": ctx['opp'],
+                        "stat": stat,
+                        "line": safe_floor - 1,
+                        "floors": {"Form": floor_form, "Venue": floor_form, "H2H": int(floor_form*0.9)},
+                        "score": safe_floor,
+                        "game_str": ctx['game_str'],
+                        "espn_id": int(store.ids[r]) # Passamos o ID original caso precise
+                    })
                             
             return sorted(candidates, key=lambda x: x['score'], reverse=True)
 
-    engine = TrinityEngine(full_cache, st.session_state.get('scoreboard', []))
+    engine = TrinityEngine(full_cache, get_game_slate(st.session_state.get('scoreboard', [])))
     res_l5 = engine.scan_market(window=5)
     res_l10 = engine.scan_market(window=10)
     res_l15 = engine.scan_market(window=15)
@@ -2806,8 +2740,8 @@ def show_nexus_page():
     """, unsafe_allow_html=True)
 
     # 1. Carregar Dados
-    full_cache = get_data_universal("real_game_logs")
     scoreboard = get_data_universal("scoreboard")
+    full_cache = get_logs_for_slate(scoreboard or [])
 
     # Header Nativo
     st.markdown("<h1 style='text-align:center; margin-bottom:0;'>Sinergia & Vácuo</h1>", unsafe_allow_html=True)
@@ -2982,61 +2916,17 @@ def show_nexus_page():
 # ============================================================================
 import os
 import json
-import unicodedata
 
 class FiveSevenTenEngine:
-    def __init__(self, logs_cache, games):
+    def __init__(self, logs_cache, slate):
         self.logs = logs_cache
-        self.games_map = self._map_games(games)
+        self.slate = get_game_slate(slate)
         
-        # Carrega mapa de fotos
-        self.player_ids = {}
-        if os.path.exists("nba_players_map.json"):
-            try:
-                with open("nba_players_map.json", "r", encoding="utf-8") as f:
-                    raw_data = json.load(f)
-                    # Normaliza nomes
-                    self.player_ids = {self._normalize_name(k): v for k, v in raw_data.items()}
-            except: pass
-
-    def _normalize_name(self, name):
-        """Remove acentos: 'Luka Dončić' vira 'Luka Doncic'"""
-        if not name: return ""
-        return ''.join(c for c in unicodedata.normalize('NFD', name) if unicodedata.category(c) != 'Mn')
-
-    def _normalize_team(self, team_code):
-        """Padroniza siglas"""
-        mapping = {
-            "NY": "NYK", "GS": "GSW", "PHO": "PHX", "NO": "NOP", "SA": "SAS", 
-            "WSH": "WAS", "UTAH": "UTA", "NOH": "NOP", "BKN": "BRK"
-        }
-        return mapping.get(team_code, team_code)
-
-    def _map_games(self, games):
-        """Mapeia jogos de HOJE"""
-        mapping = {}
-        if not games: return {}
-        for g in games:
-            home = self._normalize_team(g.get('home'))
-            away = self._normalize_team(g.get('away'))
-            if home and away:
-                mapping[home] = {"opp": away, "venue": "CASA"}
-                mapping[away] = {"opp": home, "venue": "FORA"}
-        return mapping
+        # Fotos pelo resolver compartilhado (mapa local + L5 + logs)
+        self.identity = get_identity(logs_cache)
 
     def get_photo_url(self, player_name):
-        clean_name = self._normalize_name(player_name)
-        pid = self.player_ids.get(clean_name)
-        
-        # Fallback
-        if not pid:
-            parts = clean_name.split()
-            if len(parts) >= 2: 
-                pid = self.player_ids.get(f"{parts[0]} {parts[-1]}")
-        
-        if pid: 
-            return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
-        return "https://cdn.nba.com/headshots/nba/latest/1040x760/fallback.png"
+        return self.identity.headshot(player_name)
 
     def analyze_market(self):
         candidates = [] # Volta a ser uma lista simples (sem agrupamento)
@@ -3048,67 +2938,59 @@ class FiveSevenTenEngine:
         }
 
         if not self.logs: return [], diagnostics
-
-        for player_name, data in self.logs.items():
-            raw_team = data.get('team')
-            if not raw_team: continue
-            
-            team = self._normalize_team(raw_team)
-            if team not in self.games_map: continue
-            
-            diagnostics["playing_today"] += 1
-            logs = data.get('logs', {})
-            
-            # Detecta Estrela
-            avg_pts = 0
-            if 'PTS' in logs and len(logs['PTS']) > 0:
-                avg_pts = sum(logs['PTS'][:10]) / len(logs['PTS'][:10])
-            is_star = avg_pts >= 20
-
-            # Loop por Stats
+        store = get_log_store(self.logs)
+
+        # Jogadores de hoje; hit rates L25 de todos de uma vez
+        rows = store.rows_for_teams(self.slate.teams, normalize=canonical_team)
+        diagnostics["playing_today"] = sum(1 for d in self.logs.values()
+                                           if d.get('team') and d.get('team') in self.slate)
+        diagnostics["insufficient_data"] = 2 * (diagnostics["playing_today"] - len(rows))  # sem logs
+        if not len(rows): return [], diagnostics
+
+        # Detecta Estrela (média L10 de pontos)
+        is_star = store.mean('PTS', 10, rows) >= 20
+        min_safe = np.where(is_star, 40, 50)
+        per_stat = {}
+        for stat_type in ['AST', 'REB']:
+            enough = store.count(stat_type, 10, rows) >= 10
+            total = np.maximum(store.count(stat_type, 25, rows), 1)
+            pcts = [store.hits(stat_type, 25, k, rows) / total * 100 for k in (5, 7, 10)]
+            # Critérios (Mantendo a inteligência V4)
+            min_explosion = 5 if stat_type == 'AST' else 8
+            passed = enough & (pcts[0] >= min_safe) & (pcts[2] >= min_explosion)
+            diagnostics["insufficient_data"] += int((~enough).sum())
+            diagnostics["failed_criteria"] += int((enough & ~passed).sum())
+            per_stat[stat_type] = (passed, pcts)
+
+        for k, r in enumerate(rows.tolist()):
+            player_name, raw_team = store.names[r], store.teams[r]
+            ctx = self.slate.context(raw_team)
             for stat_type in ['AST', 'REB']:
-                values = logs.get(stat_type, [])
-                if len(values) < 10: 
-                    diagnostics["insufficient_data"] += 1
-                    continue
-
-                l25 = values[:25]
-                total = len(l25)
-                
-                # Cálculos
-                pct_5 = (sum(1 for x in l25 if x >= 5) / total) * 100
-                pct_7 = (sum(1 for x in l25 if x >= 7) / total) * 100
-                pct_10 = (sum(1 for x in l25 if x >= 10) / total) * 100
-
-                # Critérios (Mantendo a inteligência V4)
-                min_safe = 40 if is_star else 50
-                min_explosion = 5 if stat_type == 'AST' else 8
-
-                if pct_5 >= min_safe and pct_10 >= min_explosion:
-                    
-                    # Define Arquétipo
-                    arch = "GLUE GUY"
-                    if is_star: arch = "⭐ SUPERSTAR"
-                    elif pct_10 > 25: arch = "DYNAMITE 🧨"
-                    elif pct_5 > 85 and pct_10 < 15: arch = "RELOGINHO 🕰️"
-                    
-                    # FORMATO ANTIGO (FLAT) PARA COMPATIBILIDADE
-                    candidates.append({
-                        "player": player_name,
-                        "team": raw_team,
-                        "opp": self.games_map[team]['opp'],
-                        "venue": self.games_map[team]['venue'],
-                        "stat": stat_type,
-                        "photo": self.get_photo_url(player_name),
-                        "metrics": {
-                            "Safe_5": int(pct_5),
-                            "Target_7": int(pct_7),
-                            "Ceiling_10": int(pct_10)
-                        },
-                        "archetype": arch # A chave que estava faltando!
-                    })
-                else:
-                    diagnostics["failed_criteria"] += 1
+                passed, (pct_5, pct_7, pct_10) = per_stat[stat_type]
+                if not passed[k]: continue
+                pct_5, pct_7, pct_10 = float(pct_5[k]), float(pct_7[k]), float(pct_10[k])
+
+                # Define Arquétipo
+                arch = "GLUE GUY"
+                if is_star[k]: arch = "⭐ SUPERSTAR"
+                elif pct_10 > 25: arch = "DYNAMITE 🧨"
+                elif pct_5 > 85 and pct_10 < 15: arch = "RELOGINHO 🕰️"
+
+                # FORMATO ANTIGO (FLAT) PARA COMPATIBILIDADE
+                candidates.append({
+                    "player": player_name,
+                    "team": raw_team,
+                    "opp": ctx['opp'],
+                    "venue": ctx['venue'],
+                    "stat": stat_type,
+                    "photo": self.get_photo_url(player_name),
+                    "metrics": {
+                        "Safe_5": int(pct_5),
+                        "Target_7": int(pct_7),
+                        "Ceiling_10": int(pct_10)
+                    },
+                    "archetype": arch # A chave que estava faltando!
+                })
 
         # Ordena: Superstars primeiro, depois Teto de Explosão
         return sorted(candidates, key=lambda x: (x['archetype'] == "⭐ SUPERSTAR", x['metrics']['Ceiling_10']), reverse=True), diagnostics
@@ -3118,11 +3000,7 @@ class FiveSevenTenEngine:
 # ============================================================================
 def show_garimpo_page():
     import streamlit as st
-    import pandas as pd
     import numpy as np
-    import re
-    import unicodedata
-    import requests
     from collections import defaultdict
     
     # --- 1. CONFIGURAÇÃO & CSS ---
@@ -3212,34 +3090,21 @@ def show_garimpo_page():
         return
 
     # --- 4. ENGINE LOCAL ---
-    def nuclear_normalize(text):
-        if not text: return ""
-        try: return re.sub(r'[^A-Z0-9]', '', unicodedata.normalize('NFKD', str(text)).encode('ASCII', 'ignore').decode('utf-8').upper())
-        except: return ""
-
-    # Recupera ID map do L5 apenas para fotos (se disponível)
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame())
-    ID_VAULT = {}
-    if not df_l5.empty:
-        try:
-            for _, row in df_l5.iterrows():
-                if row.get('PLAYER_ID'): ID_VAULT[nuclear_normalize(row['PLAYER'])] = int(row['PLAYER_ID'])
-        except: pass
+    # Fotos pelo resolver compartilhado (L5 + logs + mapa local)
+    identity = get_identity(cache_logs)
 
     def get_photo(name, pid_direct=None):
-        if pid_direct: return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid_direct}.png"
-        pid = ID_VAULT.get(nuclear_normalize(name), 0)
-        return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png" if pid else "https://cdn.nba.com/headshots/nba/latest/1040x760/fallback.png"
+        return identity.headshot(name, pid=pid_direct)
 
     class LocalMonteCarlo:
         def __init__(self, sims=1000): self.sims = sims
         
-        def analyze_series(self, data_series, target):
-            """Analisa uma série real de dados (L25)"""
+        def analyze_series(self, data_series, target, hits=None):
+            """Analisa uma série real de dados (L25). `hits` já contado pelo índice do store."""
             if not data_series: return 0
             
             # Hit Rate Real (Quantas vezes bateu na amostra)
-            hits = sum(1 for x in data_series if x >= target)
+            if hits is None: hits = sum(1 for x in data_series if x >= target)
             hit_rate = (hits / len(data_series)) * 100
             
             # Monte Carlo Baseado na Distribuição Real
@@ -3256,28 +3121,17 @@ def show_garimpo_page():
             
             return min(99, max(1, final_prob)), hit_rate, len(data_series)
 
-    @st.cache_data(ttl=600)
     def scan_injuries_live(games):
-        blacklist = set()
-        active_rosters = {}
-        map_espn = {"UTA":"utah","NOP":"no","NYK":"ny","GSW":"gs","SAS":"sa","PHX":"pho","WAS":"wsh","BKN":"bkn"}
-        teams = set()
-        for g in games: teams.add(g['home']); teams.add(g['away'])
-        
-        for t in teams:
-            t_code = map_espn.get(t.upper(), t.lower())
-            try:
-                url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams/{t_code}/roster"
-                r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=2)
-                if r.status_code == 200:
-                    active_rosters[t] = []
-                    for ath in r.json().get('athletes', []):
-                        name = ath.get('fullName', '')
-                        status = ath.get('status', {}).get('type', {}).get('name', 'Active')
-                        active_rosters[t].append({'name': name, 'status': status, 'pos': ath.get('position',{}).get('abbreviation','F')})
-                        if status != 'Active': blacklist.add(nuclear_normalize(name))
-            except: pass
-        return blacklist, active_rosters
+        # Snapshot compartilhado (TTL 10 min no processo todo, não por sessão)
+        teams = []
+        for g in games: teams += [g['home'], g['away']]
+        loaded = roster_snapshot.refresh(teams, headers={"User-Agent": "Mozilla/5.0"}, timeout=2)
+        active_rosters = {
+            t: [{'name': p['name'], 'status': p['status'], 'pos': p['pos'] if p['pos'] != '-' else 'F'}
+                for p in roster_snapshot.team_players(t, refresh=False)]
+            for t in teams if t.upper() in loaded
+        }
+        return roster_snapshot.blocked(teams), active_rosters
 
     # --- 5. MINER ENGINE (L25 REAL DATA) ---
     class GoldMinerL25:
@@ -3288,15 +3142,6 @@ def show_garimpo_page():
             self.monte_carlo = LocalMonteCarlo(sims=800)
             self.vacuum = VacuumMatrixAnalyzer()
 
-        def _safe_parse_list(self, data_list, max_len=25):
-            clean = []
-            if not isinstance(data_list, list): return []
-            for x in data_list[:max_len]:
-                if x is None: continue
-                try: clean.append(float(str(x).replace(':', '.')))
-                except: pass
-            return clean
-
         def _smart_estimate_minutes(self, pts_avg, reb_avg, ast_avg):
             prod = pts_avg + (reb_avg * 1.2) + (ast_avg * 1.5)
             if prod >= 30: return 34.0
@@ -3306,31 +3151,33 @@ def show_garimpo_page():
 
         def mine_nuggets(self):
             best_nuggets = {} 
-            
-            for player_name, p_data in self.logs.items():
-                norm = nuclear_normalize(player_name)
+            if not self.logs: return []
+            store = get_log_store(self.logs)
+
+            # Pré-filtro da liga inteira (L25): amostra, médias e minutos em colunas
+            n_pts = np.sum(~np.isnan(store.window('PTS', 25)), axis=1)
+            n_min = np.sum(~np.isnan(store.window('MIN', 25)), axis=1)
+            avgs = {s: store.mean(s, 25) for s in ('PTS', 'REB', 'AST', 'MIN')}
+            candidates = np.flatnonzero((n_pts >= 3) & (avgs['PTS'] + avgs['REB'] + avgs['AST'] >= 10))
+
+            for r in candidates.tolist():
+                player_name = store.names[r]
+                norm = player_key(player_name)
                 if norm in self.blacklist: continue
-                
-                raw_logs = p_data.get('logs', {})
-                if not raw_logs: continue
-                
+                p_data = self.logs.get(player_name, {})
+
                 # Extrai Séries Reais (Até 25 jogos)
-                s_pts = self._safe_parse_list(raw_logs.get('PTS', []), 25)
-                s_reb = self._safe_parse_list(raw_logs.get('REB', []), 25)
-                s_ast = self._safe_parse_list(raw_logs.get('AST', []), 25)
-                s_min = self._safe_parse_list(raw_logs.get('MIN', []), 25)
-                
-                if len(s_pts) < 3: continue 
-                
+                s_pts = store.series(r, 'PTS', 25)
+                s_reb = store.series(r, 'REB', 25)
+                s_ast = store.series(r, 'AST', 25)
+
                 # Médias
-                avg_pts = np.mean(s_pts)
-                avg_reb = np.mean(s_reb)
-                avg_ast = np.mean(s_ast)
+                avg_pts, avg_reb, avg_ast = avgs['PTS'][r], avgs['REB'][r], avgs['AST'][r]
                 
                 # Minutos
                 min_source = "L25"
-                if len(s_min) >= 3:
-                    avg_min = np.mean(s_min)
+                if n_min[r] >= 3:
+                    avg_min = avgs['MIN'][r]
                 else:
                     avg_min = self._smart_estimate_minutes(avg_pts, avg_reb, avg_ast)
                     min_source = "EST"
@@ -3360,9 +3207,9 @@ def show_garimpo_page():
                     
                     if proj_pts < r_pts or proj_reb < r_reb or proj_ast < r_ast: continue
                     
-                    prob_pts, hit_pts, _ = self.monte_carlo.analyze_series(s_pts, r_pts)
-                    prob_reb, hit_reb, _ = self.monte_carlo.analyze_series(s_reb, r_reb)
-                    prob_ast, hit_ast, _ = self.monte_carlo.analyze_series(s_ast, r_ast)
+                    prob_pts, hit_pts, _ = self.monte_carlo.analyze_series(s_pts, r_pts, store.hit_rate(r, 'PTS', 25, r_pts)[0])
+                    prob_reb, hit_reb, _ = self.monte_carlo.analyze_series(s_reb, r_reb, store.hit_rate(r, 'REB', 25, r_reb)[0])
+                    prob_ast, hit_ast, _ = self.monte_carlo.analyze_series(s_ast, r_ast, store.hit_rate(r, 'AST', 25, r_ast)[0])
                     
                     min_prob = min(prob_pts, prob_reb, prob_ast)
                     avg_prob = (prob_pts + prob_reb + prob_ast) / 3
@@ -3515,15 +3362,7 @@ def show_hit_prop_page():
 
     # --- 2. HELPER GLOBAL ---
     def normalize_team_signature(abbr):
-        if not abbr: return "UNK"
-        abbr = str(abbr).upper().strip()
-        mapping = {
-            "GS": "GSW", "PHX": "PHX", "PHO": "PHX", "NO": "NOP", "NOP": "NOP",
-            "NY": "NYK", "NYK": "NYK", "SA": "SAS", "SAS": "SAS", "UTAH": "UTA",
-            "UTA": "UTA", "WSH": "WAS", "WAS": "WAS", "BK": "BKN", "BKN": "BKN",
-            "CHA": "CHA", "CHO": "CHA"
-        }
-        return mapping.get(abbr, abbr)
+        return canonical_team(abbr)
 
     def get_stat_color(stat):
         s = stat.upper()
@@ -3535,32 +3374,10 @@ def show_hit_prop_page():
         return "#e2e8f0"
 
     # --- HELPER FOTOS ---
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame())
-    ID_VAULT = {}
-    if not df_l5.empty:
-        try:
-            cols = df_l5.columns
-            id_col = next((c for c in cols if str(c).upper() in ['PLAYER_ID', 'PERSON_ID', 'ID']), None)
-            name_col = next((c for c in cols if str(c).upper() in ['PLAYER_NAME', 'PLAYER', 'NAME']), None)
-            
-            if id_col and name_col:
-                for _, row in df_l5.iterrows():
-                    try:
-                        nm = str(row[name_col]).upper().replace('.','').strip()
-                        pid = int(float(row[id_col]))
-                        if pid > 0:
-                            ID_VAULT[nm] = pid
-                            if len(nm.split()) > 1: ID_VAULT[nm.split()[-1]] = pid
-                    except: pass
-        except: pass
+    identity = get_identity()
 
     def get_photo(name, pid=0):
-        if pid > 0: return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
-        clean = str(name).upper().replace('.','').strip()
-        pid = ID_VAULT.get(clean, 0)
-        if pid == 0 and len(clean.split()) > 1: pid = ID_VAULT.get(clean.split()[-1], 0)
-        if pid > 0: return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
-        return "https://cdn.nba.com/headshots/nba/latest/1040x760/fallback.png"
+        return identity.headshot(name, pid=pid)
 
     # --- 3. FETCHING & CACHE ---
     def normalize_cache_keys(cache_data):
@@ -3575,73 +3392,57 @@ def show_hit_prop_page():
         return cache_data
 
     # --- 4. ENGINES (COM FILTRO DE LESÃO APLICADO) ---
-    def generate_atomic_props(cache_data, games):
+    def generate_atomic_props(cache_data, slate):
         atomic_props = []
-        game_info_map = {}
-        
-        # Mapeamento dos Jogos
-        if games:
-            for g in games:
-                try:
-                    h = normalize_team_signature(g.get('home') or g.get('home_abbr'))
-                    a = normalize_team_signature(g.get('away') or g.get('away_abbr'))
-                    gid = str(g.get('game_id') or g.get('id') or 'UNK')
-                    info = {"game_id": gid, "game_str": f"{a} @ {h}", "home": h, "away": a, "opp_map": {h: a, a: h}}
-                    if h != "UNK": game_info_map[h] = info
-                    if a != "UNK": game_info_map[a] = info
-                except: continue
-
-        teams_active = set(game_info_map.keys())
         min_thresholds = {"PTS": 10, "REB": 4, "AST": 3, "3PM": 1, "STL": 1, "BLK": 1}
         
-        for name, data in cache_data.items():
-            if not isinstance(data, dict): continue
-            raw_team = data.get('team', 'UNK')
-            team = normalize_team_signature(raw_team)
+        if not cache_data: return []
+        store = get_log_store(cache_data)
+
+        # Piso 80% (3º menor das L10) e acertos de todas as linhas por stat, de uma vez
+        per_stat = {}
+        for stat, min_req in min_thresholds.items():
+            floor = store.kth(stat, 10, 2)
+            hits = store.hits(stat, 10, np.nan_to_num(floor, nan=np.inf))
+            ok = (store.count(stat, 10) >= 10) & (floor >= min_req) & (hits >= 8)
+            per_stat[stat] = (ok, floor, hits)
+        any_ok = np.logical_or.reduce([ok for ok, _, _ in per_stat.values()])
+
+        for r in np.flatnonzero(any_ok).tolist():
+            name = store.names[r]
+            team = normalize_team_signature(store.teams[r] or 'UNK')
             
             # [CRITICAL FIX] FILTRO DE LESÃO
             # Se o monitor estiver ativo e o jogador estiver bloqueado, pula imediatamente.
             if monitor and monitor.is_player_blocked(name, team):
                 continue
             
-            is_active = team in teams_active
-            opp = "UNK"
+            g_info = slate.game_of(team)
+            is_active = g_info is not None
             if is_active:
-                g_info = game_info_map.get(team)
-                g_str = g_info.get('game_str')
-                g_id = g_info.get('game_id')
-                opp = g_info.get('opp_map', {}).get(team, "UNK")
+                g_str, g_id, opp = g_info['game_str'], g_info['game_id'], slate.opponent(team)
             else:
-                g_info = {}; g_str = "OFF"; g_id = "0"
+                g_info = {}; g_str = "OFF"; g_id = "0"; opp = "UNK"
 
-            logs = data.get('logs', {})
-            pid = data.get('id', 0)
+            pid = cache_data[name].get('id', 0)
             
-            for stat, min_req in min_thresholds.items():
-                vals = logs.get(stat, [])
-                if not vals: continue
+            for stat in min_thresholds:
+                ok, floors, all_hits = per_stat[stat]
+                if not ok[r]: continue
+                adjusted_floor, hits = floors[r], int(all_hits[r])
+                tag = "💎" if hits == 10 else "🔥"
+                role_score = 3 if stat == 'PTS' else (2 if stat in ['AST', 'REB'] else 1)
                 
-                if len(vals) >= 10:
-                    cut = vals[:10]
-                    sorted_cut = sorted(cut)
-                    adjusted_floor = sorted_cut[2] # Piso 80%
-                    
-                    if adjusted_floor >= min_req:
-                        hits = sum(1 for x in cut if x >= adjusted_floor)
-                        if hits >= 8:
-                            tag = "💎" if hits == 10 else "🔥"
-                            role_score = 3 if stat == 'PTS' else (2 if stat in ['AST', 'REB'] else 1)
-                            
-                            atomic_props.append({
-                                "player": name, "team": team, "stat": stat, "opp": opp,
-                                "line": int(adjusted_floor),
-                                "record_str": f"{hits}/10",
-                                "hits": hits,
-                                "tag": tag, "score": role_score * hits,
-                                "game_display": g_str, 
-                                "game_info": g_info,
-                                "game_id": g_id, "player_id": pid, "active": is_active
-                            })
+                atomic_props.append({
+                    "player": name, "team": team, "stat": stat, "opp": opp,
+                    "line": int(adjusted_floor),
+                    "record_str": f"{hits}/10",
+                    "hits": hits,
+                    "tag": tag, "score": role_score * hits,
+                    "game_display": g_str, 
+                    "game_info": g_info,
+                    "game_id": g_id, "player_id": pid, "active": is_active
+                })
                             
         return sorted(atomic_props, key=lambda x: (x['active'], x['score'], x['line']), reverse=True)
 
@@ -3729,42 +3530,37 @@ def show_hit_prop_page():
                         })
             return tickets
 
-    def generate_specialties(cache_data, games):
+    def generate_specialties(cache_data, slate):
         specs_3pm = []
         specs_def = []
-        active_teams = set()
-        game_info_map = {}
-        for g in games:
-            h = normalize_team_signature(g.get('home') or g.get('home_abbr'))
-            a = normalize_team_signature(g.get('away') or g.get('away_abbr'))
-            active_teams.add(h); active_teams.add(a)
-            game_info_map[h] = a; game_info_map[a] = h
-            
-        for name, data in cache_data.items():
-            if not isinstance(data, dict): continue
-            raw_team = data.get('team', 'UNK')
-            team = normalize_team_signature(raw_team)
+        if not cache_data: return {"3PM": [], "DEF": []}
+        store = get_log_store(cache_data)
+        rows = store.rows_for_teams(slate.teams, normalize=canonical_team)
+        if not len(rows): return {"3PM": [], "DEF": []}
+
+        # Pisos L5 (mínimo das 5 últimas) só dos times ativos
+        floors = {s: np.where(store.count(s, 5, rows) >= 5, store.min(s, 5, rows), np.nan)
+                  for s in ('3PM', 'STL', 'BLK')}
+
+        for k, r in enumerate(rows.tolist()):
+            name = store.names[r]
+            team = normalize_team_signature(store.teams[r])
+            if not any(floors['3PM'][k] >= 2 or floors[s][k] >= 1 for s in ('STL', 'BLK')): continue
             
             # Filtro de Lesão também aqui, por segurança
             if monitor and monitor.is_player_blocked(name, team): continue
             
-            if team not in active_teams: continue
+            pid = cache_data[name].get('id', 0)
             
-            logs = data.get('logs', {})
-            pid = data.get('id', 0)
-            
-            threes = logs.get('3PM', [])
-            if len(threes) >= 5:
-                floor = min(threes[:5])
-                if floor >= 2:
-                    specs_3pm.append({
-                        "player": name, "team": team, "id": pid, "stat": "3PM",
-                        "line": max(2, int(floor)), "sub_text": "High Vol"
-                    })
+            floor = floors['3PM'][k]
+            if floor >= 2:
+                specs_3pm.append({
+                    "player": name, "team": team, "id": pid, "stat": "3PM",
+                    "line": max(2, int(floor)), "sub_text": "High Vol"
+                })
 
             for stat in ['STL', 'BLK']:
-                vals = logs.get(stat, [])
-                if len(vals) >= 5 and min(vals[:5]) >= 1:
+                if floors[stat][k] >= 1:
                     specs_def.append({
                         "player": name, "team": team, "id": pid, "stat": stat,
                         "line": 1, "sub_text": "🔒 100% L5"
@@ -3798,9 +3594,10 @@ def show_hit_prop_page():
     cache_raw = get_data_universal("real_game_logs") or {}
     cache_data = normalize_cache_keys(cache_raw)
     
-    atomic_props = generate_atomic_props(cache_data, games)
+    slate = get_game_slate(games)
+    atomic_props = generate_atomic_props(cache_data, slate)
     sgp_data = organize_sgp_lab(atomic_props)
-    specs = generate_specialties(cache_data, games)
+    specs = generate_specialties(cache_data, slate)
     
     sq_engine = SquadronEngineV2()
     combo_tickets = sq_engine.generate_combos(sgp_data)
@@ -3948,6 +3745,33 @@ def save_pickle(path, obj):
     except Exception:
         return False
 
+def sync_pinnacle_props(client, games, progress_ui=True):
+    """
+    Props de todos os jogos em paralelo, mescladas no índice do processo
+    (PropsIndex). Atualiza session_state['pinnacle_props_map'] e devolve
+    (mapa, contadores do sync).
+    """
+    if pinnacle_props_index is None:
+        return st.session_state.get('pinnacle_props_map', {}), {"fetched": 0, "changed": 0, "unchanged": 0, "failed": len(games or [])}
+
+    if progress_ui:
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+
+    def on_progress(done, total, game):
+        if progress_ui:
+            status_text.text(f"Props: {done}/{total} - {game.get('away_team')} @ {game.get('home_team')}")
+            progress_bar.progress(done / total)
+
+    sync_stats = pinnacle_props_index.sync(client, games, on_progress=on_progress)
+    full_map = pinnacle_props_index.props_map()
+    st.session_state['pinnacle_props_map'] = full_map
+
+    if progress_ui:
+        progress_bar.empty()
+        status_text.empty()
+    return full_map, sync_stats
+
 def load_pinnacle_data_auto():
     """Carrega jogos e props da Pinnacle automaticamente na inicialização"""
     if 'pinnacle_last_update' in st.session_state:
@@ -3967,32 +3791,11 @@ def load_pinnacle_data_auto():
                 st.session_state['pinnacle_games'] = games
                 st.success(f"✅ {len(games)} jogos carregados da Pinnacle")
             
-            # 2. Props de todos os jogos (com barra de progresso)
+            # 2. Props de todos os jogos (paralelo, com barra de progresso)
             if games:
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                full_map = {}
-                total = len(games)
-                
-                for i, game in enumerate(games):
-                    status_text.text(f"Props: {i+1}/{total} - {game['away_team']} @ {game['home_team']}")
-                    props = client.get_player_props(game['game_id'])
-                    for p in props:
-                        name = p['player']
-                        if name not in full_map:
-                            full_map[name] = {}
-                        full_map[name][p['market']] = {
-                            "line": p['line'],
-                            "odds": p['odds']
-                        }
-                    progress_bar.progress((i + 1) / total)
-                
-                st.session_state['pinnacle_props_map'] = full_map
+                full_map, _ = sync_pinnacle_props(client, games)
                 total_props = sum(len(v) for v in full_map.values())
                 st.success(f"🎯 {len(full_map)} jogadores | {total_props} props sincronizados!")
-                
-                progress_bar.empty()
-                status_text.empty()
             
             # Marca timestamp
             st.session_state['pinnacle_last_update'] = datetime.now()
@@ -4207,11 +4010,12 @@ class FeatureStore:
             return self.data[cache_key]
         
         # Construir features (simplificado)
-        game_ctx = build_game_context(away_abbr, home_abbr, odds_map, team_advanced, team_opponent)
+        slate = get_game_slate(st.session_state.get('scoreboard', []))
+        game_ctx = build_game_context(away_abbr, home_abbr, odds_map, team_advanced, team_opponent, slate=slate)
         
         # Adicionar features avançadas
-        home_pace = TEAM_PACE_DATA.get(home_abbr, 100.0)
-        away_pace = TEAM_PACE_DATA.get(away_abbr, 100.0)
+        home_pace = slate.team_pace(home_abbr)
+        away_pace = slate.team_pace(away_abbr)
         game_pace = (home_pace + away_pace) / 2.0
         
         result = {
@@ -4435,7 +4239,6 @@ def get_scoreboard_data():
     """
     from datetime import datetime, timedelta
     import pandas as pd
-    import requests
     import pytz # Obrigatório para corrigir o erro de data
 
     # --- 1. LÓGICA DE DATA (FUSO SÃO PAULO) ---
@@ -4477,7 +4280,7 @@ def get_scoreboard_data():
     }
 
     try:
-        r = requests.get(url, params=params, headers=headers, timeout=5)
+        r = http_get(url, params=params, headers=headers, timeout=5)
         if r.status_code != 200: return pd.DataFrame()
         
         data = r.json()
@@ -4516,28 +4319,31 @@ def get_scoreboard_data():
         print(f"⚠️ Erro no Scoreboard ESPN: {e}")
         return pd.DataFrame()
         
+def fetch_team_rosters(teams, progress_ui=True):
+    """
+    Elencos de vários times via roster_snapshot (TTL único, baixa só os
+    vencidos). O roster_{time}.json local vira só fallback offline.
+    Retorna {time: json}.
+    """
+    if progress_ui:
+        st.info(f"Buscando roster para {', '.join(map(str, teams))}...")
+    fetched = roster_snapshot.refresh(teams, timeout=10)
+
+    out = {}
+    for t in teams:
+        cache_path = os.path.join(CACHE_DIR, f"roster_{t}.json")
+        jr = fetched.get(str(t).upper())
+        if jr:
+            save_json(cache_path, jr)
+            out[t] = jr
+        else:
+            out[t] = load_json(cache_path) or {}
+            if not out[t] and progress_ui:
+                st.warning(f"Falha ao buscar roster para {t}")
+    return out
+
 def fetch_team_roster(team_abbr_or_id, progress_ui=True):
-    cache_path = os.path.join(CACHE_DIR, f"roster_{team_abbr_or_id}.json")
-    cached = load_json(cache_path)
-    if cached:
-        return cached
-    
-    espn_code = ESPN_TEAM_CODES.get(team_abbr_or_id, team_abbr_or_id.lower())
-    url = ESPN_TEAM_ROSTER_TEMPLATE.format(team=espn_code)
-    
-    try:
-        if progress_ui:
-            st.info(f"Buscando roster para {team_abbr_or_id}...")
-        
-        r = requests.get(url, timeout=10, headers=HEADERS)
-        r.raise_for_status()
-        jr = r.json()
-        save_json(cache_path, jr)
-        return jr
-    except Exception as e:
-        if progress_ui:
-            st.warning(f"Falha ao buscar roster para {team_abbr_or_id}: {e}")
-        return {}
+    return fetch_team_rosters([team_abbr_or_id], progress_ui=progress_ui).get(team_abbr_or_id, {})
 
 # ==============================================================================
 # 2. PARSE ODDS (CONSUMIDOR: Transforma Texto em Números)
@@ -4626,10 +4432,10 @@ def fetch_player_stats_safe(pid, name):
     try:
         from nba_api.stats.endpoints import commonplayerinfo, playergamelog
         
-        info_df = commonplayerinfo.CommonPlayerInfo(player_id=pid).get_data_frames()[0]
+        info_df = nba_frame(commonplayerinfo.CommonPlayerInfo, player_id=pid)
         team = info_df["TEAM_ABBREVIATION"].iloc[0] if "TEAM_ABBREVIATION" in info_df.columns else None
         exp = int(info_df["SEASON_EXP"].iloc[0]) if "SEASON_EXP" in info_df.columns else 0
-        logs = playergamelog.PlayerGameLog(player_id=pid, season=SEASON).get_data_frames()[0]
+        logs = nba_frame(playergamelog.PlayerGameLog, player_id=pid, season=SEASON)
         if logs is None or logs.empty: return None
         logs = logs.head(10)
         for c in ["PTS","REB","AST","MIN"]:
@@ -4662,27 +4468,23 @@ def fetch_player_stats_safe(pid, name):
         return None
 
 def try_fetch_with_retry(pid, name, tries=3, delay=0.6):
-    for attempt in range(tries):
-        res = fetch_player_stats_safe(pid, name)
-        if res: return res
-        time.sleep(delay*(attempt+1))
-    return None
+    # Retry/backoff agora vivem no nba_scheduler (adaptativo, compartilhado
+    # entre todos os chamadores); tries/delay ficam só por compatibilidade.
+    return fetch_player_stats_safe(pid, name)
 
 # ============================================================================
 # FUNÇÃO L5: FOCADA NO SUPABASE (CORRIGIDA - DEDUPLICAÇÃO DE COLUNAS)
 # ============================================================================
 def get_players_l5(progress_ui=True, force_update=False, incremental=False):
-    from nba_api.stats.static import players
-    from nba_api.stats.endpoints import playergamelog, scoreboardv2
-    import concurrent.futures
-    import time
+    """
+    Tabela L5 (médias, CVs, LAST_MIN, PRA, L10) para as páginas.
+    Deriva do real_game_logs; a API jogador a jogador é só fallback.
+    """
     import json
     import pandas as pd
-    from datetime import datetime, timedelta
+    from datetime import datetime
     
     # CONSTANTES
-    SEASON_CURRENT = "2025-26" 
-    MAX_WORKERS = 8 
     KEY_L5 = "l5_stats" # Nome exato da chave no Supabase
 
     # --- 1. TENTA CARREGAR DO SUPABASE ---
@@ -4713,7 +4515,72 @@ def get_players_l5(progress_ui=True, force_update=False, incremental=False):
     if not df_cached.empty and not force_update and not incremental:
         return df_cached
 
-    # --- 2. SE PRECISAR BAIXAR (FORCE OU VAZIO) ---
+    # --- 2. DERIVA DO real_game_logs (1 request da liga inteira, não ~500) ---
+    logs_store = None
+    if force_update:
+        # Atualiza os logs antes (incremental: só as datas novas)
+        logs_store = fetch_and_upload_real_game_logs(progress_ui=progress_ui, incremental=True)
+    if not logs_store:
+        logs_store = get_data_universal(KEY_LOGS, LOGS_CACHE_FILE)
+    df_final = derive_l5_from_game_logs(logs_store)
+
+    if not df_final.empty:
+        print(f"⚡ [L5] Derivado dos game logs: {len(df_final)} jogadores.")
+    else:
+        # Fallback lento: uma chamada PlayerGameLog por jogador
+        df_final = fetch_l5_via_player_api(df_cached, progress_ui, force_update, incremental)
+        if df_final is None: return df_cached
+
+    status_box = st.status("💾 Publicando L5...", expanded=False) if progress_ui else None
+
+    # --- 3. SALVA NO SUPABASE (COM A CORREÇÃO DE DUPLICATAS) ---
+    if not df_final.empty:
+        # 1. Normaliza para Maiúsculo
+        df_final.columns = [str(c).upper().strip() for c in df_final.columns]
+        
+        # 2. REMOVE DUPLICATAS DE COLUNA (FIX DO ERRO)
+        # Isso remove colunas como "TEAM_ID" se ela aparecer 2 vezes
+        df_final = df_final.loc[:, ~df_final.columns.duplicated()]
+        
+        # 3. Converte para JSON puro
+        try:
+            records = json.loads(df_final.to_json(orient="records", date_format="iso"))
+            payload = {
+                "records": records,
+                "count": len(records),
+                "last_update": datetime.now().isoformat()
+            }
+            
+            if status_box: status_box.write("💾 Enviando para Supabase...")
+            save_data_universal(KEY_L5, payload)
+            
+            if status_box:
+                status_box.update(label=f"✅ Sucesso! {len(df_final)} jogadores salvos.", state="complete", expanded=False)
+        except Exception as e:
+            print(f"❌ Erro ao converter JSON L5: {e}")
+            if status_box: status_box.error(f"Erro JSON: {e}")
+            
+    return df_final
+
+
+def fetch_l5_via_player_api(df_cached, progress_ui=True, force_update=False, incremental=False):
+    """
+    Caminho antigo (fallback): PlayerGameLog jogador a jogador num pool de 8.
+    Só roda quando não há real_game_logs para derivar o L5.
+    Retorna None se não houver nada pendente.
+    """
+    from nba_api.stats.static import players
+    from nba_api.stats.endpoints import playergamelog, scoreboardv2
+    import concurrent.futures
+    import time
+    import pandas as pd
+    from datetime import datetime
+
+    SEASON_CURRENT = "2025-26" 
+    MAX_WORKERS = 8 
+    CHECKPOINT_EVERY = 50            # jogadores entre checkpoints
+    CHECKPOINT_MAX_AGE = 12 * 3600   # segundos
+
     if progress_ui: st.toast("Iniciando download da NBA API...", icon="🏀")
 
     act_players = players.get_active_players()
@@ -4726,7 +4593,7 @@ def get_players_l5(progress_ui=True, force_update=False, incremental=False):
         target_team_ids = set()
         for d in dates_to_check:
             try:
-                board = scoreboardv2.ScoreboardV2(game_date=d).get_data_frames()[0]
+                board = nba_frame(scoreboardv2.ScoreboardV2, priority=PRIORITY_BACKGROUND, game_date=d)
                 if not board.empty:
                     target_team_ids.update(board['HOME_TEAM_ID'].tolist() + board['VISITOR_TEAM_ID'].tolist())
             except: pass
@@ -4734,9 +4601,24 @@ def get_players_l5(progress_ui=True, force_update=False, incremental=False):
         existing_ids = set(df_cached["PLAYER_ID"].unique()) if 'PLAYER_ID' in df_cached.columns else set()
         pending_players = [p for p in act_players if p['id'] not in existing_ids]
 
+    # Retomada: aproveita o checkpoint de uma execução interrompida (mesma temporada, < 12h)
+    records, done_ids = [], set()
+    ckpt = load_json(L5_CHECKPOINT_FILE) or {}
+    if ckpt.get("season") == SEASON_CURRENT and time.time() - ckpt.get("saved_at", 0) < CHECKPOINT_MAX_AGE:
+        records = ckpt.get("records") or []
+        done_ids = set(ckpt.get("done_ids") or [])
+        pending_players = [p for p in pending_players if p['id'] not in done_ids]
+        if done_ids: print(f"♻️ [L5] Retomando checkpoint: {len(done_ids)} jogadores já baixados.")
+
+    def save_checkpoint():
+        save_json(L5_CHECKPOINT_FILE, {
+            "season": SEASON_CURRENT, "saved_at": time.time(),
+            "done_ids": sorted(done_ids), "records": records
+        })
+
     total_needed = len(pending_players)
-    if total_needed == 0:
-        return df_cached
+    if total_needed == 0 and not records:
+        return None
 
     # UI
     if progress_ui:
@@ -4748,9 +4630,9 @@ def get_players_l5(progress_ui=True, force_update=False, incremental=False):
         pid = player_info['id']
         pname = player_info['full_name']
         try:
-            time.sleep(0.1)
-            log = playergamelog.PlayerGameLog(player_id=pid, season=SEASON_CURRENT, timeout=10)
-            df = log.get_data_frames()[0]
+            # Ritmo controlado pelo nba_scheduler (sem sleep por jogador)
+            df = nba_frame(playergamelog.PlayerGameLog, priority=PRIORITY_BACKGROUND,
+                           player_id=pid, season=SEASON_CURRENT, timeout=10)
             if not df.empty:
                 df_l5 = df.head(5).copy()
                 int_cols = ['PTS', 'REB', 'AST', 'STL', 'BLK', 'TOV']
@@ -4767,17 +4649,40 @@ def get_players_l5(progress_ui=True, force_update=False, incremental=False):
         except: return None
         return None
 
-    # Execução Paralela
-    df_new_batch = pd.DataFrame()
+    # Execução Paralela: resultados viram registros num buffer (sem concat a cada jogador)
     count = 0
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    future_to_p, collected = {}, set()
+
+    def collect(future):
+        collected.add(future)
+        res = future.result()
+        if res is not None:
+            records.extend(res.to_dict("records"))
+            done_ids.add(int(future_to_p[future]['id']))
+
+    # Sem 'with': o __exit__ esperaria a fila inteira (shutdown(wait=True)) antes do checkpoint
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
         future_to_p = {executor.submit(fetch_one_player, p): p for p in pending_players}
         for future in concurrent.futures.as_completed(future_to_p):
-            res = future.result()
-            if res is not None:
-                df_new_batch = pd.concat([df_new_batch, res], ignore_index=True)
+            collect(future)
             count += 1
+            if count % CHECKPOINT_EVERY == 0: save_checkpoint()
             if progress_ui: p_bar.progress(count / total_needed)
+    except BaseException:
+        # Rerun/stop do Streamlit no meio do download: cancela a fila, guarda o
+        # que já terminou (inclusive o que o loop ainda não tinha recolhido) e sai
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in future_to_p:
+            if future not in collected and future.done() and not future.cancelled():
+                try: collect(future)
+                except Exception: pass
+        save_checkpoint()
+        raise
+    executor.shutdown(wait=True)
+
+    # Concatenação única no final
+    df_new_batch = pd.DataFrame.from_records(records)
 
     # Merge Final
     if not df_new_batch.empty:
@@ -4790,33 +4695,13 @@ def get_players_l5(progress_ui=True, force_update=False, incremental=False):
     else:
         df_final = df_cached
 
-    # --- 3. SALVA NO SUPABASE (COM A CORREÇÃO DE DUPLICATAS) ---
-    if not df_final.empty:
-        # 1. Normaliza para Maiúsculo
-        df_final.columns = [str(c).upper().strip() for c in df_final.columns]
-        
-        # 2. REMOVE DUPLICATAS DE COLUNA (FIX DO ERRO)
-        # Isso remove colunas como "TEAM_ID" se ela aparecer 2 vezes
-        df_final = df_final.loc[:, ~df_final.columns.duplicated()]
-        
-        # 3. Converte para JSON puro
-        try:
-            records = json.loads(df_final.to_json(orient="records", date_format="iso"))
-            payload = {
-                "records": records,
-                "count": len(records),
-                "last_update": datetime.now().isoformat()
-            }
-            
-            if progress_ui: status_box.write("💾 Enviando para Supabase...")
-            save_data_universal(KEY_L5, payload)
-            
-            if progress_ui:
-                status_box.update(label=f"✅ Sucesso! {len(df_final)} jogadores salvos.", state="complete", expanded=False)
-        except Exception as e:
-            print(f"❌ Erro ao converter JSON L5: {e}")
-            if progress_ui: status_box.error(f"Erro JSON: {e}")
-            
+    # Terminou: o checkpoint não serve mais
+    try:
+        if os.path.exists(L5_CHECKPOINT_FILE): os.remove(L5_CHECKPOINT_FILE)
+    except Exception: pass
+
+    if progress_ui:
+        status_box.update(label=f"✅ {len(df_new_batch)} linhas baixadas da API.", state="complete", expanded=False)
     return df_final
 # ============================================================================
 # FUNÇÃO PARA CALCULAR RISCO DE BLOWOUT (ADICIONE ESTA FUNÇÃO)
@@ -4926,7 +4811,6 @@ def show_config_page():
     st.session_state.use_advanced_features = True
     import os
     import time
-    import requests
     from datetime import datetime
     
     st.header("⚙️ PAINEL DE CONTROLE (CLOUD NATIVE)")
@@ -4966,6 +4850,64 @@ def show_config_page():
     render_mini_status(c2, "Jogos Hoje", sb_ok, f"({sb_len})")
     render_mini_status(c3, "Cloud: Props", props_ok)
     render_mini_status(c4, "Cloud: Lesões", inj_ok)
+
+    # Cache de leitura do Supabase (compartilhado pelo processo)
+    if db:
+        cs = db.cache_stats()
+        st.caption(
+            f"🧠 Cache Supabase: {cs['hits']} hits · {cs['revalidated']} revalidados · "
+            f"{cs['misses']} downloads · {cs['errors']} erros · {cs['keys']} chaves "
+            f"({cs['hit_rate']:.0%} sem download)"
+        )
+
+        # Fila de upload em segundo plano (write-behind)
+        wq = db.write_queue_stats()
+        c_wb1, c_wb2, c_wb3, c_wb4 = st.columns([2, 1, 1, 1])
+        with c_wb1:
+            wb_on = st.toggle("📤 Upload em segundo plano (write-behind)", value=wq["enabled"])
+            if wb_on != wq["enabled"]:
+                db.set_write_behind(wb_on)
+        c_wb2.metric("Fila", wq["pending"] + (1 if wq["in_flight"] else 0))
+        c_wb3.metric("Enviados", wq["uploaded"], delta=f"{wq['coalesced']} fundidos", delta_color="off")
+        c_wb4.metric("Falhas", wq["failed"])
+        if wq["last_error"]:
+            st.caption(f"⚠️ Último erro de upload: {wq['last_error']}")
+        if wq["pending"] or wq["in_flight"]:
+            if st.button("⏫ DRENAR FILA DE UPLOAD", use_container_width=True):
+                with st.spinner("Enviando pendências..."):
+                    if db.flush_writes(timeout=60): st.success("✅ Fila drenada!")
+                    else: st.warning("⏳ Ainda há uploads pendentes.")
+
+    # Fila de chamadas ao stats.nba.com (nba_scheduler)
+    ns = nba_scheduler.get_stats()
+    st.caption(
+        f"🏀 NBA API: {ns['calls']} chamadas · {ns['deduped']} deduplicadas · "
+        f"{ns['retries']} retries · {ns['throttled']} throttles · taxa {ns['rate']} req/s"
+        + (f" · pausa {ns['cooldown']}s" if ns['cooldown'] else "")
+    )
+    hs = http_client.get_stats()
+    st.caption(
+        f"🌐 HTTP (ESPN/CBS/Pinnacle): {hs['requests']} requisições · {hs['not_modified']} 304 · "
+        f"{hs['fresh_hits']} do disco · {hs['errors']} erros"
+    )
+    rs = roster_snapshot.get_stats()
+    st.caption(
+        f"📋 Elencos ESPN (snapshot): {rs['teams']} times · {rs['players']} jogadores · "
+        f"{rs['fetches']} downloads · {rs['hits']} reaproveitados"
+    )
+
+    # Worker de ingestão (python ingest_worker.py): saúde publicada no store
+    health = get_data_universal(KEY_INGEST_HEALTH, INGEST_HEALTH_FILE) or {}
+    if health.get("jobs"):
+        w = health.get("worker", {})
+        with st.expander(f"🛰️ Worker de ingestão · {w.get('host', '?')} · heartbeat {str(w.get('heartbeat', '-'))[:19]}"):
+            icons = {"ok": "🟢", "error": "🔴", "blocked": "⛔", "running": "🔄", "busy": "⏳"}
+            st.dataframe(pd.DataFrame([
+                {"Job": name, "Status": f"{icons.get(j.get('status'), '⚪')} {j.get('status')}",
+                 "Resumo": j.get("error") or j.get("summary", ""), "Duração (s)": j.get("duration"),
+                 "Último OK": str(j.get("last_ok") or "-")[:19], "Próximo": str(j.get("next_run") or "-")[:19]}
+                for name, j in health["jobs"].items()
+            ]), hide_index=True, use_container_width=True)
     st.markdown("---")
 
     # ==============================================================================
@@ -4979,8 +4921,11 @@ def show_config_page():
         
         # A. JOGOS (SCOREBOARD) - NOVO BOTÃO CRÍTICO
         if st.button("🏀 ATUALIZAR JOGOS DE HOJE (SCOREBOARD)", use_container_width=True):
-            games = fetch_espn_scoreboard(progress_ui=True)
-            if games:
+            with job_lock("scoreboard") as locked:
+                games = fetch_espn_scoreboard(progress_ui=True) if locked else None
+            if not locked:
+                st.warning("⏳ Scoreboard já está sendo atualizado (worker ou outra sessão).")
+            elif games:
                 st.success(f"✅ {len(games)} Jogos encontrados!")
                 time.sleep(1); st.rerun()
             else:
@@ -4993,24 +4938,46 @@ def show_config_page():
 
         # BOTÃO 1: RECONSTRUIR (Agora força a atualização dos jogos antes)
         if st.button("🔄 RECONSTRUIR CACHE DE PROPS", type="primary", use_container_width=True):
+            lock = job_lock("logs")
             try:
-                # 1. FORÇA ATUALIZAÇÃO DO SCOREBOARD PRIMEIRO
-                st.toast("Atualizando lista de jogos...", icon="🏀")
-                games = fetch_espn_scoreboard()
-                
-                if not games:
-                    st.error("❌ Não foi possível encontrar jogos hoje. O cache será atualizado, mas as abas ficarão vazias até haver jogos.")
-                
-                # 2. Roda o Update V65 (Master Roster)
-                # Passamos force_all=True para baixar a liga toda
-                update_batch_cache(games, force_all=True)
-                
-                st.success("✅ Cache Recalibrado com Sucesso!")
-                time.sleep(1)
-                st.rerun()
+                if not lock.acquire():
+                    st.warning("⏳ Logs já estão sendo atualizados (worker ou outra sessão).")
+                else:
+                    # 1. FORÇA ATUALIZAÇÃO DO SCOREBOARD PRIMEIRO
+                    st.toast("Atualizando lista de jogos...", icon="🏀")
+                    games = fetch_espn_scoreboard()
+                    
+                    if not games:
+                        st.error("❌ Não foi possível encontrar jogos hoje. O cache será atualizado, mas as abas ficarão vazias até haver jogos.")
                     
+                    # 2. Roda o Update V65 (Master Roster)
+                    # Passamos force_all=True para baixar a liga toda
+                    update_batch_cache(games, force_all=True)
+                    
+                    st.success("✅ Cache Recalibrado com Sucesso!")
+                    time.sleep(1)
+                    st.rerun()
+                    
+            except Exception as e:
+                st.error(f"Erro crítico: {e}")
+            finally:
+                lock.release()
+
+        # BOTÃO 1B: INCREMENTAL (só as datas novas desde o último ingest)
+        if st.button("⚡ ATUALIZAR LOGS (SÓ JOGOS NOVOS)", use_container_width=True):
+            lock = job_lock("logs")
+            try:
+                if not lock.acquire():
+                    st.warning("⏳ Logs já estão sendo atualizados (worker ou outra sessão).")
+                else:
+                    update_batch_cache(st.session_state.get('scoreboard', []), incremental=True)
+                    st.success("✅ Logs atualizados!")
+                    time.sleep(1)
+                    st.rerun()
             except Exception as e:
                 st.error(f"Erro crítico: {e}")
+            finally:
+                lock.release()
 
         # BOTÃO 2: HARD RESET
         if st.button("🧨 APAGAR CACHE DE PROPS (HARD RESET)", use_container_width=True):
@@ -5032,18 +4999,24 @@ def show_config_page():
         with c_l5_1:
             if st.button("⚡ UPDATE L5", use_container_width=True):
                 try:
-                    with st.spinner("Atualizando L5..."):
-                        new_l5 = get_players_l5(progress_ui=True, incremental=True)
-                        st.session_state.df_l5 = new_l5
-                        st.success("OK!")
+                    with job_lock("l5") as locked, st.spinner("Atualizando L5..."):
+                        if not locked:
+                            st.warning("⏳ L5 em atualização.")
+                        else:
+                            new_l5 = get_players_l5(progress_ui=True, incremental=True)
+                            st.session_state.df_l5 = new_l5
+                            st.success("OK!")
                 except: pass
         with c_l5_2:
             if st.button("🐢 RESET L5", use_container_width=True):
                 try:
-                    with st.spinner("Baixando L5 Zero..."):
-                        new_l5 = get_players_l5(progress_ui=True, force_update=True)
-                        st.session_state.df_l5 = new_l5
-                        st.success("OK!")
+                    with job_lock("l5") as locked, st.spinner("Baixando L5 Zero..."):
+                        if not locked:
+                            st.warning("⏳ L5 em atualização.")
+                        else:
+                            new_l5 = get_players_l5(progress_ui=True, force_update=True)
+                            st.session_state.df_l5 = new_l5
+                            st.success("OK!")
                 except: pass
 
         st.divider()
@@ -5051,6 +5024,7 @@ def show_config_page():
         if st.button("🗑️ LIMPAR MEMÓRIA (RAM)", use_container_width=True):
             st.cache_data.clear()
             st.cache_resource.clear()
+            if db: db.invalidate_cache()
             st.success("✅ Memória Cache limpa!")
             time.sleep(1); st.rerun()
 
@@ -5065,22 +5039,26 @@ def show_config_page():
                 st.info("Cloud Mode Ativo.")
         
         if st.button("🚑 ATUALIZAR LESÕES", use_container_width=True):
-            with st.spinner("Consultando Depto. Médico..."):
-                try:
-                    from injuries import InjuryMonitor
-                    monitor = InjuryMonitor() 
-                    ALL_TEAMS = ["ATL","BOS","BKN","CHA","CHI","CLE","DAL","DEN","DET","GSW","HOU","IND","LAC","LAL","MEM","MIA","MIL","MIN","NOP","NYK","OKC","ORL","PHI","PHX","POR","SAC","SAS","TOR","UTA","WAS"]
-                    p = st.progress(0)
-                    for i, team in enumerate(ALL_TEAMS):
-                        monitor.fetch_injuries_for_team(team)
-                        p.progress((i+1)/len(ALL_TEAMS))
-                    p.empty()
-                    fresh_data = monitor.get_all_injuries()
-                    if fresh_data:
-                        save_data_universal("injuries", {"teams": fresh_data, "updated_at": datetime.now().isoformat()})
-                        st.session_state.injuries_data = fresh_data 
-                        st.success("✅ Lesões Atualizadas!")
-                except Exception as e: st.error(f"Erro: {e}")
+            with job_lock("injuries") as locked, st.spinner("Consultando Depto. Médico..."):
+                if not locked:
+                    st.warning("⏳ Lesões já estão sendo atualizadas (worker ou outra sessão).")
+                else:
+                    try:
+                        from injuries import InjuryMonitor
+                        monitor = InjuryMonitor() 
+                        ALL_TEAMS = ["ATL","BOS","BKN","CHA","CHI","CLE","DAL","DEN","DET","GSW","HOU","IND","LAC","LAL","MEM","MIA","MIL","MIN","NOP","NYK","OKC","ORL","PHI","PHX","POR","SAC","SAS","TOR","UTA","WAS"]
+                        p = st.progress(0)
+                        roster_snapshot.refresh(ALL_TEAMS, force=True)  # 30 elencos em paralelo
+                        for i, team in enumerate(ALL_TEAMS):
+                            monitor.fetch_injuries_for_team(team)
+                            p.progress((i+1)/len(ALL_TEAMS))
+                        p.empty()
+                        fresh_data = monitor.get_all_injuries()
+                        if fresh_data:
+                            save_data_universal("injuries", {"teams": fresh_data, "updated_at": datetime.now().isoformat()})
+                            st.session_state.injuries_data = fresh_data 
+                            st.success("✅ Lesões Atualizadas!")
+                    except Exception as e: st.error(f"Erro: {e}")
 
     # ==============================================================================
     # 3. DASHBOARD DE VOLUMETRIA
@@ -5530,10 +5508,12 @@ def display_player_theses(player_ctx, game_ctx, thesis_engine=None):
 # GAME CONTEXT
 # ============================================================================
 
-def build_game_context(away_abbr, home_abbr, odds_map, team_advanced, team_opponent):
+def build_game_context(away_abbr, home_abbr, odds_map, team_advanced, team_opponent, slate=None):
     """
     Constrói o contexto do jogo usando dados gratuitos da ESPN (via odds_map convertido).
+    Sem odds no mapa, usa o spread/total já parseados do GameSlate do dia.
     """
+    if slate is None: slate = get_game_slate(st.session_state.get('scoreboard', []))
     away_full = TEAM_ABBR_TO_ODDS.get(away_abbr, away_abbr)
     home_full = TEAM_ABBR_TO_ODDS.get(home_abbr, home_abbr)
     
@@ -5550,9 +5530,11 @@ def build_game_context(away_abbr, home_abbr, odds_map, team_advanced, team_oppon
                 odds = odds_map[k]
                 break
     
-    # Se não achou no map, tenta valores default ou zerados
-    spread = odds.get("spread", 0.0)
-    total = odds.get("total", 225.0)
+    # Se não achou no map, tenta o slate (mesmo jogo) ou valores default
+    slate_ctx = slate.context(home_abbr)
+    if slate_ctx and slate_ctx['opp'] != canonical_team(away_abbr): slate_ctx = None
+    spread = odds.get("spread", slate_ctx['spread'] if slate_ctx else 0.0)
+    total = odds.get("total", slate_ctx['total'] if slate_ctx and slate_ctx['total'] else 225.0)
     
     # Pace
     adv_home = team_advanced.get(home_abbr, {}) if team_advanced else {}
@@ -5561,9 +5543,9 @@ def build_game_context(away_abbr, home_abbr, odds_map, team_advanced, team_oppon
     pace_home = adv_home.get("pace")
     pace_away = adv_away.get("pace")
     
-    # Se não tiver dados avançados, usa a constante TEAM_PACE_DATA (fallback seguro)
-    if not pace_home: pace_home = TEAM_PACE_DATA.get(home_abbr, 100.0)
-    if not pace_away: pace_away = TEAM_PACE_DATA.get(away_abbr, 100.0)
+    # Se não tiver dados avançados, usa a tabela de pace do slate (fallback seguro)
+    if not pace_home: pace_home = slate.team_pace(home_abbr)
+    if not pace_away: pace_away = slate.team_pace(away_abbr)
     
     pace_expected = (float(pace_home) + float(pace_away)) / 2.0
     
@@ -5597,12 +5579,9 @@ def fetch_espn_boxscore(game_id):
     Returns:
         Dicionário com as estatísticas do jogo, ou None se não encontrado.
     """
-    params = {"event": game_id}
-    
     try:
-        response = requests.get(ESPN_BOXSCORE_URL, params=params, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        # Jogo final: lido do boxscore_store (gravado uma vez, nunca rebaixado)
+        return boxscore_store.espn_summary(game_id, timeout=10)
     except Exception as e:
         st.error(f"Erro ao buscar boxscore da ESPN: {e}")
         return None
@@ -5800,39 +5779,14 @@ def fetch_espn_boxscore(game_id):
             Dicionário com as estatísticas ou None se não encontrado
         """
         try:
-            # A estrutura do boxscore da ESPN varia
-            # Vamos procurar em diferentes locais
-            players_data = []
-            
-            # Tentar obter jogadores do boxscore
-            if "boxscore" in boxscore:
-                teams = boxscore["boxscore"].get("teams", [])
-                for team in teams:
-                    team_players = team.get("statistics", [])
-                    for player in team_players:
-                        athlete = player.get("athlete", {})
-                        name = athlete.get("displayName", "")
-                        if normalize_name(name) == normalize_name(player_name):
-                            # Extrair estatísticas
-                            stats = {}
-                            for stat in player.get("stats", []):
-                                if "name" in stat and "value" in stat:
-                                    stats[stat["name"].lower()] = float(stat["value"])
-                            
-                            # Mapear nomes comuns
-                            mapped_stats = {
-                                "points": stats.get("points", 0),
-                                "rebounds": stats.get("rebounds", stats.get("reb", 0)),
-                                "assists": stats.get("assists", stats.get("ast", 0)),
-                                "minutes": stats.get("minutes", stats.get("min", 0)),
-                                "steals": stats.get("steals", stats.get("stl", 0)),
-                                "blocks": stats.get("blocks", stats.get("blk", 0)),
-                                "turnovers": stats.get("turnovers", stats.get("to", 0)),
-                                "three_pointers": stats.get("3pt", stats.get("three_pointers", 0))
-                            }
-                            return mapped_stats
-            
-            return None
+            row = PlayerIndex(parse_espn_players(boxscore)).find(player_name, team=team_abbr)
+            if row is None:
+                return None
+            return {
+                "points": row["PTS"], "rebounds": row["REB"], "assists": row["AST"],
+                "minutes": row["MIN"], "steals": row["STL"], "blocks": row["BLK"],
+                "turnovers": row["TOV"], "three_pointers": row["3PM"]
+            }
         except Exception:
             return None
     
@@ -5957,24 +5911,21 @@ def show_audit_page():
             if c_batch_1.button(f"🔄 VALIDAR TODOS ({pending_count})", type="primary", use_container_width=True):
                 progress_bar = st.progress(0)
                 status_text = st.empty()
-                
-                updated_count = 0
-                errors = 0
-                
-                for i, ticket in enumerate(pending_list):
-                    t_id = ticket.get('id')
-                    # Atualiza UI
-                    pct = int(((i + 1) / pending_count) * 100)
-                    progress_bar.progress(pct)
-                    status_text.caption(f"Validando bilhete {i+1}/{pending_count}: {t_id}...")
-                    
-                    # Chama validação inteligente
-                    try:
-                        success, msg = audit.smart_validate_ticket(t_id)
-                        if success and "Atualizado" in msg:
-                            updated_count += 1
-                    except Exception as e:
-                        errors += 1
+
+                def on_progress(phase, done, total):
+                    if phase == "boxscores":
+                        status_text.caption(f"Baixando {total} boxscores em paralelo...")
+                    else:
+                        progress_bar.progress(done / max(total, 1))
+                        status_text.caption(f"Validando bilhete {done}/{total}...")
+
+                # Pipeline em lote: 1 boxscore por jogo + 1 upload no final
+                try:
+                    rep = audit.validate_all_pending(on_progress=on_progress)
+                    updated_count, errors = rep["updated_tickets"], 0
+                except Exception as e:
+                    updated_count, errors = 0, 1
+                    st.error(f"Erro na validação em lote: {e}")
                 
                 progress_bar.progress(100)
                 status_text.empty()
@@ -6574,48 +6525,14 @@ def show_desdobramentos_inteligentes():
 
     # --- 2. HELPERS & FOTOS (LÓGICA SUPERBILHETE) ---
     
-    # Carrega DataFrame para popular o Vault de IDs
+    # L5 da sessão (ou da nuvem) alimenta o resolver compartilhado de IDs
     df_l5 = st.session_state.get('df_l5', pd.DataFrame())
     if df_l5.empty: df_l5 = get_data_universal('df_l5')
+    identity = get_player_identity(df_l5=df_l5 if isinstance(df_l5, pd.DataFrame) else None)
 
-    ID_VAULT = {}
-    if isinstance(df_l5, pd.DataFrame) and not df_l5.empty:
-        # Normalização simplificada para bater com o get_photo do usuário
-        cols = df_l5.columns
-        id_col = next((c for c in cols if str(c).upper() in ['PLAYER_ID', 'PERSON_ID', 'ID']), None)
-        name_col = next((c for c in cols if str(c).upper() in ['PLAYER_NAME', 'PLAYER', 'NAME']), None)
-        
-        if id_col and name_col:
-            for _, row in df_l5.iterrows():
-                try:
-                    # Normalização: Upper e sem pontos (ex: C.J. -> CJ)
-                    p_name = str(row[name_col]).upper().replace('.', '').strip()
-                    p_id = int(float(row[id_col]))
-                    ID_VAULT[p_name] = p_id
-                    
-                    # Salva também só pelo sobrenome para fallback
-                    parts = p_name.split()
-                    if len(parts) > 1:
-                        ID_VAULT[parts[-1]] = p_id
-                except: pass
-
-    # A função exata solicitada
     def get_photo(name, pid=0):
-        # Tenta usar o PID passado se for válido
-        if pid > 0: return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
-        
-        # Limpeza do nome
-        clean = str(name).upper().replace('.', '').strip()
-        
-        # Tenta achar no Vault pelo nome completo
-        pid = ID_VAULT.get(clean, 0)
-        
-        # Fallback: Se não achou, tenta pelo último nome
-        if pid == 0 and len(clean.split()) > 1: 
-            pid = ID_VAULT.get(clean.split()[-1], 0)
-        
-        if pid > 0: return f"https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
-        return "https://cdn.nba.com/headshots/nba/latest/1040x760/fallback.png"
+        # PID passado (se válido) -> nome completo -> sobrenome/fuzzy
+        return identity.headshot(name, pid=pid)
 
     # --- 3. CSS (VISUAL LIMPO) ---
     st.markdown("""
@@ -6920,10 +6837,6 @@ def show_desdobramentos_inteligentes():
 def show_escalacoes():
     import streamlit as st
     import html
-    import pandas as pd
-    import requests
-    import re
-    import unicodedata
 
     # --- 1. CSS VISUAL (MANTIDO) ---
     st.markdown("""
@@ -6990,90 +6903,30 @@ def show_escalacoes():
         st.warning("⚠️ Scoreboard vazio. Atualize os jogos na aba Config.")
         return
 
-    # Helper Nuclear
-    def nuclear_normalize(text):
-        if not text: return ""
-        try:
-            text = unicodedata.normalize('NFKD', str(text)).encode('ASCII', 'ignore').decode('utf-8')
-            text = text.upper()
-            text = re.sub(r'[^A-Z0-9]', '', text)
-            return text
-        except: return ""
-
-    # PREPARAÇÃO DO MAPA DE MINUTOS E IDs
+    # PREPARAÇÃO DE MINUTOS E IDs (resolver compartilhado: L5 + mapa local)
     # (Isso é crucial para saber que LeBron joga 35 min e Bronny joga 10 min)
-    ID_VAULT = {}
-    MINS_VAULT = {} # Mapa de Minutos
-    
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame())
-    
-    if not df_l5.empty:
-        try:
-            df_l5.columns = [str(c).upper().strip() for c in df_l5.columns]
-            c_name = next((c for c in df_l5.columns if 'PLAYER' in c), 'PLAYER')
-            c_id = next((c for c in df_l5.columns if 'ID' in c and 'TEAM' not in c), 'PLAYER_ID')
-            c_team = next((c for c in df_l5.columns if 'TEAM' in c and 'ID' not in c), 'TEAM')
-            c_min = next((c for c in df_l5.columns if c in ['MIN_AVG', 'MIN', 'MINUTES']), None)
-            
-            for _, row in df_l5.iterrows():
-                try:
-                    pid = int(float(row.get(c_id, 0)))
-                    nm = str(row.get(c_name, ''))
-                    tm = str(row.get(c_team, 'UNK')).upper()
-                    mins = float(row.get(c_min, 0)) if c_min else 0.0
-                    
-                    key = nuclear_normalize(nm)
-                    
-                    # Salva ID e Minutos
-                    if pid > 0: ID_VAULT[key] = pid
-                    MINS_VAULT[key] = mins
-                    
-                    # Fallback Sobrenome
-                    parts = nm.split()
-                    if len(parts) > 1: 
-                        k2 = f"{nuclear_normalize(parts[-1])}_{tm}"
-                        if pid > 0: ID_VAULT[k2] = pid
-                        MINS_VAULT[k2] = mins
-                except: continue
-        except: pass
+    identity = get_identity()
 
     def resolve_meta(name, team):
         """Retorna (ID, Minutos)"""
-        k1 = nuclear_normalize(name)
-        id_val = ID_VAULT.get(k1, 0)
-        min_val = MINS_VAULT.get(k1, 0.0)
-        
-        if id_val == 0 or min_val == 0:
-            parts = name.split()
-            if len(parts) > 0:
-                k2 = f"{nuclear_normalize(parts[-1])}_{team}"
-                if id_val == 0: id_val = ID_VAULT.get(k2, 0)
-                if min_val == 0: min_val = MINS_VAULT.get(k2, 0.0)
-                
-        return id_val, min_val
-
-    # FETCHER EMBUTIDO
-    def fetch_roster_internal(team_abbr):
-        map_espn = {"UTA": "utah", "NOP": "no", "NYK": "ny", "GSW": "gs", "SAS": "sa", "PHX": "pho", "WAS": "wsh", "BKN": "bkn"}
-        t_code = map_espn.get(team_abbr.upper(), team_abbr.lower())
-        url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams/{t_code}/roster"
-        try:
-            r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=3)
-            if r.status_code == 200:
-                return r.json().get('athletes', [])
-        except: pass
-        return []
+        meta = identity.resolve(name, team)
+        return meta['id'], float(meta['min'] or 0.0)
 
     # --- 3. PROCESSAMENTO DOS JOGOS ---
     games = st.session_state.scoreboard
     progress_bar = st.progress(0)
+
+    # Elencos de todo o slate num disparo só (antes: 2 requisições em série por jogo)
+    slate = []
+    for game in games: slate += [game.get('home', 'UNK'), game.get('away', 'UNK')]
+    roster_snapshot.refresh(slate, headers={"User-Agent": "Mozilla/5.0"}, timeout=3)
     
     for idx, game in enumerate(games):
         away = game.get('away', 'UNK')
         home = game.get('home', 'UNK')
         
-        r_home = fetch_roster_internal(home)
-        r_away = fetch_roster_internal(away)
+        r_home = roster_snapshot.team_players(home, refresh=False)
+        r_away = roster_snapshot.team_players(away, refresh=False)
         
         # --- PROCESSAMENTO COM ORDENAÇÃO POR MINUTOS ---
         def process_team(roster, team_abbr):
@@ -7081,31 +6934,18 @@ def show_escalacoes():
             if not roster: return []
             
             for p in roster:
-                if not isinstance(p, dict): continue
-                
-                name = p.get('fullName', p.get('displayName', 'Unknown'))
-                
-                pos_obj = p.get('position')
-                if not isinstance(pos_obj, dict): pos_obj = {}
-                pos = pos_obj.get('abbreviation', '-')
-                
-                status_obj = p.get('status')
-                status_text = 'Active'
-                if isinstance(status_obj, dict):
-                    type_obj = status_obj.get('type')
-                    if isinstance(type_obj, dict):
-                        status_text = type_obj.get('name', 'Active')
+                name = p['name']
                 
                 # Busca Metadata (ID e Minutos)
                 pid_nba, mins_avg = resolve_meta(name, team_abbr)
                 
                 # Se não achou na NBA, usa ID ESPN
-                final_id = pid_nba if pid_nba > 0 else p.get('id', 0)
+                final_id = pid_nba if pid_nba > 0 else p['espn_id']
                 
                 processed.append({
                     "name": name, 
-                    "pos": pos, 
-                    "status": status_text, 
+                    "pos": p['pos'], 
+                    "status": p['status'], 
                     "id": final_id,
                     "minutes": mins_avg # O Segredo está aqui!
                 })
@@ -7181,9 +7021,6 @@ def show_escalacoes():
 # ============================================================================
 def show_depto_medico():
     import streamlit as st
-    import pandas as pd
-    import unicodedata
-    import re
     from datetime import datetime, timedelta
     
     # --- CORREÇÃO DO IMPORT ---
@@ -7272,12 +7109,8 @@ def show_depto_medico():
             with st.spinner(f"⏳ Atualizando Depto Médico com CBS & ESPN (Última: {time_diff_str})..."):
                 # Busca lista de times ativos hoje para priorizar
                 games = st.session_state.get('scoreboard', [])
-                priority_teams = []
-                if games:
-                    for g in games:
-                        priority_teams.append(g.get('home_abbr', g.get('home')))
-                        priority_teams.append(g.get('away_abbr', g.get('away')))
-                else:
+                priority_teams = slate_teams(games)
+                if not priority_teams:
                     priority_teams = ["LAL", "GSW", "BOS", "PHI", "MIL", "DEN", "PHX", "DAL"]
 
                 monitor_instance.update_all_teams(priority_teams)
@@ -7303,28 +7136,7 @@ def show_depto_medico():
                 injuries_flat.append(p)
 
     # --- 4. MOTOR DE FOTOS (ID RECOVERY) ---
-    df_l5 = st.session_state.get('df_l5', pd.DataFrame())
-    
-    def normalize_name_simple(n):
-        if not n: return ""
-        n = str(n).lower()
-        n = unicodedata.normalize("NFKD", n).encode("ascii", "ignore").decode("ascii")
-        return "".join(e for e in n if e.isalnum())
-
-    NAME_TO_ID = {}
-    if not df_l5.empty:
-        try:
-            df_l5.columns = [str(c).upper().strip() for c in df_l5.columns]
-            c_name = next((c for c in df_l5.columns if c in ['PLAYER_NAME', 'PLAYER', 'NAME']), 'PLAYER')
-            c_id = next((c for c in df_l5.columns if c in ['PLAYER_ID', 'ID', 'PERSON_ID']), 'PLAYER_ID')
-            c_min = next((c for c in df_l5.columns if c in ['MIN_AVG', 'MIN']), None)
-
-            for _, row in df_l5.iterrows():
-                pid = int(float(row.get(c_id, 0)))
-                if pid == 0: continue
-                name_norm = normalize_name_simple(str(row.get(c_name, '')))
-                NAME_TO_ID[name_norm] = {'id': pid, 'min': row.get(c_min, 0) if c_min else 0}
-        except: pass
+    identity = get_identity()
 
     # --- 5. CLASSIFICAÇÃO (VIP vs GERAL) ---
     vip_ward = []
@@ -7332,7 +7144,6 @@ def show_depto_medico():
 
     for p in injuries_flat:
         raw_name = p.get('name') or "Unknown"
-        norm_name = normalize_name_simple(raw_name)
         status = str(p.get('status', '')).upper()
         details = p.get('details', 'Sem detalhes reportados.')
         source = p.get('source', 'ESPN')
@@ -7340,10 +7151,10 @@ def show_depto_medico():
         # Ignora disponíveis
         if "AVAILABLE" in status and "NOT" not in status: continue
 
-        # Recupera ID
-        player_stats = NAME_TO_ID.get(norm_name, {'id': 0, 'min': 0})
+        # Recupera ID (e minutos do L5)
+        player_stats = identity.resolve(raw_name, p.get('team'))
         pid = player_stats['id']
-        minutes = float(player_stats['min'])
+        minutes = float(player_stats['min'] or 0)
         
         # Define Cores
         is_out = any(x in status for x in ['OUT', 'SURG', 'INJURED'])
@@ -7531,9 +7342,17 @@ def safe_load_initial_data():
     # 2. DADOS DINÂMICOS (AUTO-HEALING: NUVEM -> API -> SAVE)
     # ------------------------------------------------------------------------
 
+    # Pré-busca em lote: uma única ida ao Supabase para tudo que falta na sessão
+    pending_keys = []
+    if not st.session_state.scoreboard: pending_keys.append(KEY_SCOREBOARD)
+    if not st.session_state.team_advanced: pending_keys.append(KEY_TEAM_ADV)
+    if not st.session_state.odds: pending_keys.append(KEY_ODDS)
+    if st.session_state.df_l5.empty: pending_keys.append(KEY_L5)
+    cloud_batch = get_many_universal(pending_keys) if pending_keys else {}
+
     # A. Scoreboard (Jogos de Hoje)
     if not st.session_state.scoreboard:
-        data = get_data_universal(KEY_SCOREBOARD)
+        data = cloud_batch.get(KEY_SCOREBOARD)
         if data:
             st.session_state.scoreboard = data
         else:
@@ -7547,7 +7366,7 @@ def safe_load_initial_data():
 
     # B. Stats Avançados de Times
     if not st.session_state.team_advanced:
-        data = get_data_universal(KEY_TEAM_ADV)
+        data = cloud_batch.get(KEY_TEAM_ADV)
         if data:
             st.session_state.team_advanced = data
         else:
@@ -7560,7 +7379,7 @@ def safe_load_initial_data():
 
     # C. Odds
     if not st.session_state.odds:
-        data = get_data_universal(KEY_ODDS)
+        data = cloud_batch.get(KEY_ODDS)
         if data:
             st.session_state.odds = data
         else:
@@ -7575,7 +7394,7 @@ def safe_load_initial_data():
     # D. Dados L5 (Estatísticas de Jogadores) - CORREÇÃO DE LEITURA JSON
     if st.session_state.df_l5.empty:
         # 1. Tenta Nuvem (Formato JSON Records)
-        cloud_l5 = get_data_universal(KEY_L5)
+        cloud_l5 = cloud_batch.get(KEY_L5)
         if cloud_l5 and "records" in cloud_l5:
             try:
                 st.session_state.df_l5 = pd.DataFrame.from_records(cloud_l5["records"])
@@ -7600,8 +7419,15 @@ def safe_load_initial_data():
         KEY_DVP: "cache/dvp_data_v4_static.json"
     }
 
+    # Checagem de existência só por metadados (não baixa os valores)
+    # (se a sonda falhar, não migra nada para não sobrescrever a nuvem às cegas)
+    existing_static = None
+    if db:
+        try: existing_static = db.get_metadata(list(static_files_map))
+        except Exception as e: print(f"⚠️ Erro metadados estáticos: {e}")
+
     for key_db, local_path in static_files_map.items():
-        if not get_data_universal(key_db): 
+        if existing_static is not None and key_db not in existing_static: 
             if os.path.exists(local_path):
                 try:
                     with open(local_path, "r", encoding="utf-8") as f:
@@ -7909,6 +7735,8 @@ def show_narrative_lab():
             st.info(f"📡 Calculando anomalias H2H para {len(games)} jogos... (Isso é feito uma vez por dia)")
             prog = st.progress(0)
             scan_results = []
+            # Tabela jogador x oponente da liga inteira: montada uma vez, cada jogador vira consulta O(1)
+            h2h_table.ensure()
             
             for i, game in enumerate(games):
                 try:
@@ -0,0 +1,274 @@
+# ============================================================================
+# BOXSCORE STORE (IMUTÁVEL, POR game_id)
+# ============================================================================
+# Boxscore final não muda, mas era baixado de novo a cada auditoria e a cada
+# geração de DNA (RotationForensics). Aqui cada jogo final é gravado uma vez:
+#
+#   cache/boxscores/objects/ab/<sha256>.json.gz   JSON cru comprimido
+#                                                 (endereçado pelo conteúdo)
+#   cache/boxscores/refs/<fonte>_<game_id>.json   {sha, final, players}
+#
+# `players` é a tabela por jogador já parseada (PTS/REB/AST/...), então a
+# auditoria nem precisa abrir o JSON cru; PlayerIndex resolve cada perna
+# em O(1). Jogo em andamento passa direto pela rede e não é gravado.
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from http_client import http_get
+from roster_loader import espn_team_code, name_tokens
+
+BOXSCORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "boxscores")
+ESPN_SUMMARY_URL = "https://site.api.espn.com/apis/site/v2/sports/basketball/nba/summary"
+ESPN_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Referer": "https://www.espn.com/",
+    "Origin": "https://www.espn.com"
+}
+INVALID_GAME_IDS = {"", "MULTI", "MIX", "UNK", "None"}
+
+
+def _to_float(v):
+    try: return float(v)
+    except (TypeError, ValueError): return 0.0
+
+
+def _made(v):
+    # "2-5" -> 2.0 (formato FGM-FGA da ESPN)
+    s = str(v)
+    return _to_float(s.split("-")[0]) if "-" in s else _to_float(s)
+
+
+def espn_is_final(summary):
+    try:
+        return bool(summary["header"]["competitions"][0]["status"]["type"].get("completed", False))
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return False
+
+
+def parse_espn_players(summary):
+    """Tabela por jogador a partir do summary da ESPN (labels dinâmicos)."""
+    rows = []
+    bs = (summary or {}).get("boxscore", {})
+    teams = bs.get("players", []) or bs.get("teams", [])
+    for team in teams:
+        stats_block = team.get("statistics", [])
+        if not stats_block: continue
+        team_abbr = (team.get("team") or {}).get("abbreviation", "")
+        labels = stats_block[0].get("labels", [])
+        idx = {label: i for i, label in enumerate(labels)}
+        i3 = idx.get("3PT", idx.get("3PM", -1))
+
+        for ath in stats_block[0].get("athletes", []):
+            info = ath.get("athlete", {}) or {}
+            stats = ath.get("stats", []) or []
+
+            def get(label, _stats=stats):
+                i = idx.get(label, -1)
+                return _to_float(_stats[i]) if 0 <= i < len(_stats) else 0.0
+
+            rows.append({
+                "name": info.get("displayName", ""),
+                "espn_id": info.get("id"),
+                "team": team_abbr,
+                "played": bool(stats),
+                "MIN": get("MIN"), "PTS": get("PTS"), "REB": get("REB"), "AST": get("AST"),
+                "STL": get("STL"), "BLK": get("BLK"), "TOV": get("TO"),
+                "3PM": _made(stats[i3]) if 0 <= i3 < len(stats) else 0.0,
+            })
+    return rows
+
+
+class PlayerIndex:
+    """
+    Índice dos jogadores de um boxscore (montado uma vez por jogo).
+    find(): id ESPN exato -> nome normalizado exato -> fuzzy restrito
+    (mesmo sobrenome e um primeiro nome prefixo do outro: 'Nic'/'Nicolas',
+    nunca 'Jalen'/'Jaylin'). Fuzzy só vale se o candidato for único.
+    """
+    def __init__(self, rows):
+        self.rows = rows or []
+        self.by_id = {}
+        self.by_key = {}
+        self.by_last = {}
+        for row in self.rows:
+            tokens = name_tokens(row.get("name"))
+            if row.get("espn_id") is not None: self.by_id[str(row["espn_id"])] = row
+            if not tokens: continue
+            self.by_key.setdefault("".join(tokens), row)
+            self.by_last.setdefault(" ".join(tokens[1:]), []).append((tokens[0], row))
+
+    def find(self, name, espn_id=None, team=None):
+        if espn_id is not None and str(espn_id) in self.by_id:
+            return self.by_id[str(espn_id)]
+        tokens = name_tokens(name)
+        if not tokens: return None
+        row = self.by_key.get("".join(tokens))
+        if row is not None: return row
+
+        first = tokens[0]
+        # Boxscore da ESPN usa as siglas dela ('GS', 'NY'); a perna pode vir com 'GSW'/'NYK'
+        teams = {str(team).upper(), espn_team_code(team).upper()} if team and team != "?" else None
+        candidates = [r for f, r in self.by_last.get(" ".join(tokens[1:]), [])
+                      if min(len(f), len(first)) >= 3 and (f.startswith(first) or first.startswith(f))
+                      and (not teams or not r.get("team") or str(r["team"]).upper() in teams)]
+        return candidates[0] if len(candidates) == 1 else None
+
+
+class BoxscoreStore:
+    def __init__(self, root=BOXSCORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._refs = {}   # memória: chave -> ref (só jogos finais)
+        self._indexes = {}  # memória: chave -> PlayerIndex (só jogos finais)
+        self.stats = {"hits": 0, "fetches": 0, "stored": 0}
+
+    # ------------------------------------------------------------------
+    # Blobs (conteúdo) e refs (game_id -> sha)
+    # ------------------------------------------------------------------
+    def _blob_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.json.gz")
+
+    def _ref_path(self, key):
+        return os.path.join(self.root, "refs", f"{key}.json")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _put_blob(self, obj):
+        raw = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        sha = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(sha)
+        if not os.path.exists(path):
+            self._write_atomic(path, gzip.compress(raw))
+        return sha
+
+    def _get_blob(self, sha):
+        try:
+            with open(self._blob_path(sha), "rb") as f:
+                raw = gzip.decompress(f.read())
+        except (OSError, EOFError):
+            return None
+        if hashlib.sha256(raw).hexdigest() != sha:
+            return None  # blob corrompido: tratado como ausente
+        return json.loads(raw)
+
+    def _get_ref(self, key):
+        with self._lock:
+            ref = self._refs.get(key)
+        if ref: return ref
+        try:
+            with open(self._ref_path(key), "r", encoding="utf-8") as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._blob_path(ref.get("sha", ""))):
+            return None
+        with self._lock:
+            self._refs[key] = ref
+        return ref
+
+    def _put(self, key, obj, players):
+        ref = {"sha": self._put_blob(obj), "final": True, "players": players, "stored_at": time.time()}
+        self._write_atomic(self._ref_path(key), json.dumps(ref, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._refs[key] = ref
+            self.stats["stored"] += 1
+        return ref
+
+    def _bump(self, field):
+        with self._lock:
+            self.stats[field] += 1
+
+    # ------------------------------------------------------------------
+    # ESPN (summary) - auditoria
+    # ------------------------------------------------------------------
+    def _fetch_espn(self, game_id, timeout):
+        self._bump("fetches")
+        r = http_get(ESPN_SUMMARY_URL, params={"event": str(game_id)}, headers=ESPN_HEADERS, timeout=timeout, cache=False)
+        if r.status_code != 200: return None
+        summary = r.json()
+        if espn_is_final(summary):
+            self._put(f"espn_{game_id}", summary, parse_espn_players(summary))
+        return summary
+
+    def espn_summary(self, game_id, timeout=10):
+        """JSON cru do summary (do disco se o jogo já terminou)."""
+        if str(game_id) in INVALID_GAME_IDS or game_id is None: return None
+        ref = self._get_ref(f"espn_{game_id}")
+        if ref:
+            data = self._get_blob(ref["sha"])
+            if data is not None:
+                self._bump("hits")
+                return data
+        return self._fetch_espn(game_id, timeout)
+
+    def espn_index(self, game_id, timeout=10):
+        """(final, PlayerIndex) ou (False, None). O índice de jogo final fica em memória."""
+        key = f"espn_{game_id}"
+        with self._lock:
+            idx = self._indexes.get(key)
+        if idx is not None:
+            self._bump("hits")
+            return True, idx
+        final, rows = self.espn_players(game_id, timeout=timeout)
+        if rows is None: return False, None
+        idx = PlayerIndex(rows)
+        if final:
+            with self._lock:
+                self._indexes[key] = idx
+        return final, idx
+
+    def espn_players(self, game_id, timeout=10):
+        """(final, tabela por jogador) ou (False, None) se a ESPN falhar."""
+        if str(game_id) in INVALID_GAME_IDS or game_id is None: return False, None
+        ref = self._get_ref(f"espn_{game_id}")
+        if ref and ref.get("players") is not None:
+            self._bump("hits")
+            return True, ref["players"]
+        summary = self._fetch_espn(game_id, timeout)
+        if summary is None: return False, None
+        return espn_is_final(summary), parse_espn_players(summary)
+
+    # ------------------------------------------------------------------
+    # NBA Stats (BoxScoreTraditionalV2) - forensics
+    # ------------------------------------------------------------------
+    def nba_traditional(self, game_id, final=True):
+        """
+        DataFrame de jogadores do BoxScoreTraditionalV2. `final=True` quando o
+        chamador sabe que o jogo acabou (ex.: veio do TeamGameLogs) -> grava.
+        """
+        import pandas as pd
+        key = f"nba_{game_id}"
+        ref = self._get_ref(key)
+        if ref:
+            rows = self._get_blob(ref["sha"])
+            if rows is not None:
+                self._bump("hits")
+                return pd.DataFrame.from_records(rows)
+
+        from nba_api.stats.endpoints import boxscoretraditionalv2
+        from nba_scheduler import nba_frame, PRIORITY_BACKGROUND
+        self._bump("fetches")
+        df = nba_frame(boxscoretraditionalv2.BoxScoreTraditionalV2, priority=PRIORITY_BACKGROUND, game_id=game_id)
+        if final and df is not None and not df.empty:
+            rows = json.loads(df.to_json(orient="records"))  # NaN -> null
+            self._put(key, rows, None)
+        return df
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, games=len(self._refs))
+
+
+# Instância única do processo
+boxscore_store = BoxscoreStore()
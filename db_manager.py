@@ -2,10 +2,366 @@
 # DB MANAGER (VERSÃO BLINDADA CONTRA ERRO 400)
 # ============================================================================
 import streamlit as st
-from supabase import create_client, Client
-from datetime import datetime
+try:
+    from supabase import create_client, Client
+except ImportError:
+    # Sem o pacote supabase ainda dá para rodar com o backend SQLite
+    create_client, Client = None, object
+from datetime import datetime, date
+from decimal import Decimal
 import json
 import math
+import os
+import sqlite3
+import atexit
+import base64
+import copy
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# SANITIZAÇÃO JSON (PASSADA ÚNICA)
+# ============================================================================
+# Substitui o antigo dumps(default=str) -> replace("NaN") -> loads, que
+# serializava tudo duas vezes e corrompia textos contendo "NaN"/"Infinity".
+# Uma única caminhada converte tipos Numpy/Pandas/datas e troca float
+# não-finito por None; o resultado já é JSONB válido para o Supabase.
+
+
+def sanitize_for_json(value):
+    """Devolve uma cópia JSON-nativa de `value` (NaN/Infinity -> None)."""
+    t = type(value)
+    if t is str or t is int or t is bool or value is None:
+        return value
+    if t is float:
+        return value if math.isfinite(value) else None
+    if t is dict:
+        return {
+            (k if type(k) is str else _json_key(k)): sanitize_for_json(v)
+            for k, v in value.items()
+        }
+    if t is list or t is tuple:
+        return [sanitize_for_json(v) for v in value]
+    return _sanitize_other(value)
+
+
+def _json_key(k):
+    # Mesmo comportamento do json.dumps para chaves não-string
+    if k is None: return "null"
+    if isinstance(k, (bool, np.bool_)): return "true" if k else "false"
+    if isinstance(k, (float, np.floating)):
+        k = float(k)
+        return repr(k) if math.isfinite(k) else "null"
+    if isinstance(k, np.integer): return str(int(k))
+    return str(k)
+
+
+def _sanitize_other(value):
+    """Tipos menos comuns (subclasses, Numpy, Pandas, datas)."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating, Decimal)):
+        value = float(value)
+        return value if math.isfinite(value) else None
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, dict):
+        return {(k if type(k) is str else _json_key(k)): sanitize_for_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [sanitize_for_json(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return sanitize_for_json(value.tolist())
+    if isinstance(value, pd.DataFrame):
+        return sanitize_for_json(value.to_dict("records"))
+    if isinstance(value, pd.Series):
+        return sanitize_for_json(value.to_dict())
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return sanitize_for_json(value.item())
+    # Último recurso: mesmo comportamento do antigo default=str
+    return str(value)
+
+
+def dumps_clean(value):
+    """Sanitiza e serializa numa tacada: (valor_limpo, json_str)."""
+    clean_value = sanitize_for_json(value)
+    return clean_value, json.dumps(clean_value, ensure_ascii=False, allow_nan=False)
+
+# ============================================================================
+# ARMAZENAMENTO FATIADO (SHARDS) PARA CHAVES GIGANTES
+# ============================================================================
+# Blobs como 'real_game_logs' estouram o limite do PostgREST (413/timeout).
+# Essas chaves viram um MANIFESTO na linha original + N linhas "<key>::<shard>",
+# cada uma com seu sha256 e (opcionalmente) zlib+base64. Só os shards cujo
+# checksum mudou sobem de novo, e a leitura pode pedir só os shards necessários
+# (ex: apenas os times do slate de hoje).
+#   group_by -> shard pelo campo do item (ex: 'team');  buckets -> hash da chave
+#   records  -> o payload é {records: [...], ...} e o fatiamento é da lista
+SHARDED_KEYS = {
+    "real_game_logs": {"group_by": "team", "compress": True},
+    "l5_stats": {"records": "records", "bucket_field": "PLAYER_ID", "buckets": 8, "compress": True},
+    "narrative_cache": {"buckets": 16, "compress": True},
+}
+SHARD_SEP = "::"
+SHARD_SHA_PREFIX = 12  # linhas de shard endereçadas por conteúdo: key::sid@sha[:12]
+SHARD_BATCH_BYTES = 512 * 1024  # teto por requisição de upsert
+
+
+def _is_manifest(value):
+    return isinstance(value, dict) and value.get("__sharded__") == 1
+
+
+def _bucket_of(item_key, buckets):
+    return f"b{zlib.crc32(str(item_key).encode('utf-8')) % buckets:02d}"
+
+
+def _shard_id(spec, item_key, item):
+    """Em qual shard cai um item (entrada do dict ou registro da lista)."""
+    if "group_by" in spec:
+        group = item.get(spec["group_by"]) if isinstance(item, dict) else None
+        return str(group).upper() if group not in (None, "") else "_"
+    if "bucket_field" in spec and isinstance(item, dict):
+        item_key = item.get(spec["bucket_field"], item_key)
+    return _bucket_of(item_key, spec.get("buckets", 8))
+
+
+def _split_shards(spec, value):
+    """Divide o valor em {shard_id: parte}. None se o formato não permite."""
+    parts = {}
+    if "records" in spec:
+        if not isinstance(value, dict) or not isinstance(value.get(spec["records"]), list):
+            return None
+        for i, rec in enumerate(value[spec["records"]]):
+            parts.setdefault(_shard_id(spec, i, rec), []).append(rec)
+        return parts
+    if not isinstance(value, dict):
+        return None
+    for k, v in value.items():
+        parts.setdefault(_shard_id(spec, k, v), {})[k] = v
+    return parts
+
+
+def _encode_shard(part, compress):
+    blob = json.dumps(part, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    row = {"sha256": hashlib.sha256(blob).hexdigest()}
+    if compress:
+        row["z"] = base64.b64encode(zlib.compress(blob, 6)).decode("ascii")
+    else:
+        row["data"] = part
+    return row, len(blob)
+
+
+def _shard_row_key(key, sid, entry):
+    """
+    Chave da linha do shard descrito no manifesto. Manifestos novos guardam
+    'row' (key::sid@sha[:12]); os antigos apontam para a linha fixa key::sid.
+    """
+    return (entry or {}).get("row") or f"{key}{SHARD_SEP}{sid}"
+
+
+def _decode_shard(row, expected_sha):
+    if "z" in row:
+        blob = zlib.decompress(base64.b64decode(row["z"]))
+        part = json.loads(blob)
+    else:
+        part = row.get("data")
+        blob = json.dumps(part, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if hashlib.sha256(blob).hexdigest() != expected_sha:
+        raise ValueError("checksum do shard não confere (escrita concorrente ou dado corrompido)")
+    return part
+
+
+def _merge_shards(manifest, parts):
+    """Remonta o valor original a partir das partes (ordem estável por shard)."""
+    records_field = manifest.get("records")
+    if records_field:
+        merged = dict(manifest.get("meta") or {})
+        merged[records_field] = [rec for sid in sorted(parts) for rec in parts[sid]]
+        return merged
+    merged = {}
+    for sid in sorted(parts):
+        merged.update(parts[sid])
+    return merged
+
+# ============================================================================
+# READ-THROUGH CACHE (COMPARTILHADO PELO PROCESSO INTEIRO)
+# ============================================================================
+# O Streamlit re-executa o script a cada clique, mas este módulo fica em
+# sys.modules: o cache abaixo sobrevive aos reruns e é comum a todas as sessões.
+# Dentro do TTL a leitura não toca no Supabase; vencido o TTL, uma sonda barata
+# na coluna 'last_updated' decide se o 'value' precisa ser baixado de novo.
+CACHE_TTL = {
+    "scoreboard": 60,
+    "pinnacle_odds": 120,
+    "odds": 120,
+    "audit_trixies": 30,
+    "injuries": 300,
+    "narrative_cache": 600,
+    "real_game_logs": 900,
+    "l5_stats": 900,
+    "team_advanced": 3600,
+    "team_opponent": 3600,
+    "dvp_stats": 3600,
+    "rotation_dna_v27": 3600,
+}
+DEFAULT_CACHE_TTL = 300
+
+_CACHE_LOCK = threading.Lock()
+_READ_CACHE = {}  # key -> {"frozen": ..., "version": last_updated, "checked_at": epoch}
+_CACHE_STATS = {"hits": 0, "revalidated": 0, "misses": 0, "errors": 0}
+
+
+def _bump(counter):
+    with _CACHE_LOCK:
+        _CACHE_STATS[counter] += 1
+
+
+def _freeze(value):
+    """
+    Forma imutável do valor em cache: JSON serializado (deepcopy se não for
+    JSON). Cada leitura decodifica uma cópia nova, então quem altera o
+    retorno do get_data não contamina o cache do processo nem outra sessão.
+    """
+    if value is None: return None
+    try: return ("json", json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+    except (TypeError, ValueError): return ("obj", copy.deepcopy(value))
+
+
+def _thaw(frozen):
+    if frozen is None: return None
+    kind, data = frozen
+    return json.loads(data) if kind == "json" else copy.deepcopy(data)
+
+
+def _remember(key, value, version):
+    frozen = _freeze(value)
+    with _CACHE_LOCK:
+        _READ_CACHE[key] = {"frozen": frozen, "version": version, "checked_at": time.time()}
+
+
+# ============================================================================
+# WRITE-BEHIND (UPLOAD EM SEGUNDO PLANO)
+# ============================================================================
+# Opcional: liga por st.secrets["WRITE_BEHIND"] ou pelo painel de Config.
+# O save_data limpa o payload na hora (snapshot) e só o upload vai para a fila.
+# Escritas repetidas na mesma chave se fundem: sobe apenas o valor mais novo.
+class WriteBehindQueue:
+    def __init__(self, max_pending=64, max_retries=3, base_delay=1.0):
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._pending = OrderedDict()  # key -> (handler, clean_value)
+        self._in_flight = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self.stats = {"uploaded": 0, "coalesced": 0, "retries": 0, "failed": 0,
+                      "rejected": 0, "last_error": None, "last_upload": None}
+
+    def submit(self, handler, key, clean_value):
+        """Enfileira o upload. False = fila cheia (o chamador sobe síncrono)."""
+        with self._cond:
+            if key in self._pending:
+                self._pending[key] = (handler, clean_value)
+                self.stats["coalesced"] += 1
+                return True
+            if len(self._pending) >= self.max_pending:
+                self.stats["rejected"] += 1
+                return False
+            self._pending[key] = (handler, clean_value)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return True
+
+    def is_pending(self, key):
+        with self._cond:
+            return key in self._pending or self._in_flight == key
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending) + (1 if self._in_flight else 0)
+
+    def flush(self, timeout=30):
+        """Espera a fila esvaziar. True se drenou dentro do timeout."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = deadline - time.time()
+                if remaining <= 0: return False
+                self._cond.wait(remaining)
+        return True
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+            stats["in_flight"] = self._in_flight
+            stats["pending_keys"] = list(self._pending)
+        return stats
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key, (handler, clean_value) = self._pending.popitem(last=False)
+                self._in_flight = key
+
+            version, error, superseded = None, None, False
+            for attempt in range(self.max_retries):
+                try:
+                    version = handler._upsert(key, clean_value)
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    with self._cond:
+                        # Chegou valor mais novo: esse retry não vale mais a pena
+                        superseded = key in self._pending
+                        if not superseded and attempt < self.max_retries - 1:
+                            self.stats["retries"] += 1
+                    if superseded: break
+                    if attempt < self.max_retries - 1:
+                        time.sleep(self.base_delay * (2 ** attempt))
+
+            with self._cond:
+                self._in_flight = None
+                if error is None:
+                    self.stats["uploaded"] += 1
+                    self.stats["last_upload"] = datetime.now().isoformat()
+                    # Só atualiza a versão se não houver valor mais novo na fila
+                    if key not in self._pending:
+                        _remember(key, clean_value, version)
+                    print(f"☁️ [WRITE-BEHIND] '{key}' enviado.")
+                elif not superseded:
+                    self.stats["failed"] += 1
+                    self.stats["last_error"] = f"{key}: {error}"
+                    print(f"❌ [WRITE-BEHIND] '{key}' falhou após {self.max_retries} tentativas: {error}")
+                self._cond.notify_all()
+
+
+_WRITE_QUEUE = WriteBehindQueue()
+_WRITE_BEHIND = {"enabled": False}
+try:
+    _WRITE_BEHIND["enabled"] = bool(st.secrets.get("WRITE_BEHIND", False))
+except Exception:
+    pass
+
+# Na saída do processo, tenta não perder o que ficou na fila
+atexit.register(lambda: _WRITE_QUEUE.flush(timeout=15))
+
 
 class DatabaseHandler:
     def __init__(self):
@@ -24,6 +380,9 @@ class DatabaseHandler:
             else:
                 print("⚠️ Secrets do Supabase NÃO encontradas.")
                 return
+            if create_client is None:
+                print("⚠️ Pacote 'supabase' não instalado.")
+                return
 
             self.client: Client = create_client(url, key)
             self.connected = True
@@ -33,54 +392,471 @@ class DatabaseHandler:
             print(f"❌ Erro Crítico Conexão: {e}")
             self.connected = False
 
-    def get_data(self, key):
-        """Busca o valor JSON dentro da tabela app_cache"""
+    def get_data(self, key, use_cache=True):
+        """
+        Busca o valor JSON dentro da tabela app_cache (read-through cache).
+        Cada chamada devolve uma cópia própria: alterar o retorno não muda o
+        cache (para persistir, salve com save_data).
+        """
         if not self.connected: return None
+        if not use_cache:
+            try:
+                return self._fetch_row(key)[0]
+            except Exception as e:
+                print(f"⚠️ Erro GET '{key}': {e}")
+                return None
+
+        entry = _READ_CACHE.get(key)
+        if entry is not None:
+            # 1. Dentro do TTL (ou upload pendente na fila): nem consulta a nuvem
+            if (time.time() - entry["checked_at"] < CACHE_TTL.get(key, DEFAULT_CACHE_TTL)
+                    or _WRITE_QUEUE.is_pending(key)):
+                _bump("hits")
+                return _thaw(entry["frozen"])
+
+            # 2. TTL vencido: pergunta só o 'last_updated'
+            try:
+                if self._probe_version(key) == entry["version"]:
+                    entry["checked_at"] = time.time()
+                    _bump("revalidated")
+                    return _thaw(entry["frozen"])
+            except Exception as e:
+                # Nuvem instável: melhor servir o dado antigo do que nada
+                print(f"⚠️ Erro PROBE '{key}' (servindo cache): {e}")
+                _bump("errors")
+                return _thaw(entry["frozen"])
+
+        # 3. Miss (ou versão nova): baixa o valor completo
         try:
-            response = self.client.table("app_cache").select("value").eq("key", key).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]['value']
-            return None
+            value, version = self._fetch_row(key)
         except Exception as e:
             print(f"⚠️ Erro GET '{key}': {e}")
+            _bump("errors")
             return None
+        _bump("misses")
+        _remember(key, value, version)
+        return value
 
-    def save_data(self, key, value):
-        """Salva (Upsert) com tratamento de JSON inválido (NaN/Dates)"""
+    def get_many(self, keys, use_cache=True):
+        """
+        Busca várias chaves do app_cache de uma vez: {key: value}.
+        Chaves frescas saem da memória; as vencidas passam por UMA sonda em lote
+        e só as novas/alteradas são baixadas numa única query in_().
+        Chaves inexistentes voltam como None.
+        """
+        keys = list(dict.fromkeys(keys))
+        result = {k: None for k in keys}
+        if not self.connected or not keys: return result
+
+        now = time.time()
+        to_fetch, to_probe = [], []
+        for k in keys:
+            entry = _READ_CACHE.get(k) if use_cache else None
+            if entry is None:
+                to_fetch.append(k)
+            elif now - entry["checked_at"] < CACHE_TTL.get(k, DEFAULT_CACHE_TTL) or _WRITE_QUEUE.is_pending(k):
+                _bump("hits")
+                result[k] = _thaw(entry["frozen"])
+            else:
+                to_probe.append(k)
+
+        if to_probe:
+            try:
+                versions = self.get_metadata(to_probe)
+                for k in to_probe:
+                    entry = _READ_CACHE[k]
+                    if versions.get(k) == entry["version"]:
+                        entry["checked_at"] = time.time()
+                        _bump("revalidated")
+                        result[k] = _thaw(entry["frozen"])
+                    else:
+                        to_fetch.append(k)
+            except Exception as e:
+                print(f"⚠️ Erro PROBE lote {to_probe} (servindo cache): {e}")
+                _bump("errors")
+                for k in to_probe: result[k] = _thaw(_READ_CACHE[k]["frozen"])
+
+        if to_fetch:
+            try:
+                rows = self._fetch_rows(to_fetch)
+            except Exception as e:
+                print(f"⚠️ Erro GET lote {to_fetch}: {e}")
+                _bump("errors")
+                return result
+            for k in to_fetch:
+                row = rows.get(k) or {}
+                value = row.get('value')
+                if _is_manifest(value):
+                    try:
+                        value = self._load_sharded(k, value)
+                    except Exception as e:
+                        print(f"⚠️ Erro SHARDS '{k}': {e}")
+                        _bump("errors")
+                        continue
+                _bump("misses")
+                _remember(k, value, row.get('last_updated'))
+                result[k] = value
+        return result
+
+    def get_metadata(self, keys):
+        """
+        Sonda só de metadados (sem baixar o 'value'): {key: last_updated}
+        apenas para as chaves que existem na tabela.
+        """
+        if not self.connected or not keys: return {}
+        response = self.client.table("app_cache").select("key, last_updated").in_("key", list(keys)).execute()
+        return {row['key']: row.get('last_updated') for row in (response.data or [])}
+
+    def exists(self, key):
+        """True se a chave existe no app_cache (consulta só metadados)."""
+        try:
+            return key in self.get_metadata([key])
+        except Exception as e:
+            print(f"⚠️ Erro EXISTS '{key}': {e}")
+            return False
+
+    def _fetch_rows(self, keys):
+        """Uma query in_() para várias chaves: {key: {'value', 'last_updated'}}."""
+        response = self.client.table("app_cache").select("key, value, last_updated").in_("key", list(keys)).execute()
+        return {row['key']: row for row in (response.data or [])}
+
+    def _fetch_row(self, key):
+        """Baixa (value, last_updated). Chave inexistente -> (None, None)."""
+        response = self.client.table("app_cache").select("value, last_updated").eq("key", key).execute()
+        if response.data and len(response.data) > 0:
+            row = response.data[0]
+            value = row.get('value')
+            if _is_manifest(value):
+                value = self._load_sharded(key, value)
+            return value, row.get('last_updated')
+        return None, None
+
+    # --- SHARDS ---
+    def get_shards(self, key, groups):
+        """
+        Leitura parcial de uma chave fatiada: só os shards de `groups`
+        (ex: ['LAL', 'BOS'] para real_game_logs). Chaves não fatiadas
+        são filtradas em memória com a mesma regra.
+        """
+        spec = SHARDED_KEYS.get(key)
+        if not self.connected or not spec: return self.get_data(key)
+        wanted = {str(g).upper() for g in groups}
+
+        # Valor completo já fresco na memória? Filtra sem ir à nuvem.
+        entry = _READ_CACHE.get(key)
+        if entry is not None and entry["frozen"] is not None and (
+                time.time() - entry["checked_at"] < CACHE_TTL.get(key, DEFAULT_CACHE_TTL)
+                or _WRITE_QUEUE.is_pending(key)):
+            _bump("hits")
+            return self._filter_groups(spec, _thaw(entry["frozen"]), wanted)
+
+        try:
+            response = self.client.table("app_cache").select("value").eq("key", key).execute()
+            value = response.data[0].get('value') if response.data else None
+            if _is_manifest(value):
+                return self._load_sharded(key, value, shard_ids=wanted)
+            _bump("misses")
+            return self._filter_groups(spec, value, wanted)
+        except Exception as e:
+            print(f"⚠️ Erro GET SHARDS '{key}' {sorted(wanted)}: {e}")
+            _bump("errors")
+            return None
+
+    def _filter_groups(self, spec, value, wanted):
+        parts = _split_shards(spec, value) if value is not None else None
+        if parts is None: return value
+        parts = {sid: part for sid, part in parts.items() if sid in wanted}
+        meta = {k: v for k, v in value.items() if k != spec.get("records")} if "records" in spec else None
+        return _merge_shards({"records": spec.get("records"), "meta": meta}, parts)
+
+    def _load_sharded(self, key, manifest, shard_ids=None):
+        """
+        Baixa os shards do manifesto numa única query in_(). Shards já em
+        memória com o mesmo sha256 não são baixados de novo.
+        """
+        shards = manifest.get("shards") or {}
+        wanted = [sid for sid in sorted(shards) if shard_ids is None or sid in shard_ids]
+        parts, missing = {}, []
+        for sid in wanted:
+            cached = _READ_CACHE.get(_shard_row_key(key, sid, shards[sid]))
+            if cached is not None and cached["version"] == shards[sid]["sha256"]:
+                parts[sid] = _thaw(cached["frozen"])
+            else:
+                missing.append(sid)
+
+        if missing:
+            shard_keys = [_shard_row_key(key, sid, shards[sid]) for sid in missing]
+            response = self.client.table("app_cache").select("key, value").in_("key", shard_keys).execute()
+            rows = {row['key']: row.get('value') or {} for row in (response.data or [])}
+            for sid, shard_key in zip(missing, shard_keys):
+                if shard_key not in rows:
+                    raise ValueError(f"shard '{shard_key}' ausente")
+                sha = shards[sid]["sha256"]
+                parts[sid] = _decode_shard(rows[shard_key], sha)
+                _remember(shard_key, parts[sid], sha)
+        return _merge_shards(manifest, parts)
+
+    def _upsert_sharded(self, key, spec, parts, clean_value):
+        """
+        Sobe só os shards alterados, depois o manifesto, e apaga os órfãos.
+        Shard alterado vai para uma linha nova (key::sid@sha[:12]): quem ainda
+        segura o manifesto antigo continua lendo as linhas antigas, que só
+        somem depois que o manifesto novo foi gravado.
+        """
+        now = datetime.now().isoformat()
+
+        # Manifesto atual (só o mapa de shards, sem baixar os dados)
+        response = self.client.table("app_cache").select("shards:value->shards").eq("key", key).execute()
+        old_shards = (response.data[0].get("shards") if response.data else None) or {}
+
+        new_shards, batch, batch_bytes = {}, [], 0
+        for sid in sorted(parts):
+            row, size = _encode_shard(parts[sid], spec.get("compress", False))
+            old = old_shards.get(sid) or {}
+            if old.get("sha256") == row["sha256"]:
+                # Mesmo conteúdo: reaproveita a linha que já existe (inclusive a fixa antiga)
+                new_shards[sid] = {"sha256": row["sha256"], "items": len(parts[sid]), "bytes": size,
+                                   "row": _shard_row_key(key, sid, old)}
+                continue
+            row_key = f"{key}{SHARD_SEP}{sid}@{row['sha256'][:SHARD_SHA_PREFIX]}"
+            new_shards[sid] = {"sha256": row["sha256"], "items": len(parts[sid]), "bytes": size, "row": row_key}
+            row_bytes = len(row.get("z", "")) or size
+            if batch and batch_bytes + row_bytes > SHARD_BATCH_BYTES:
+                self.client.table("app_cache").upsert(batch).execute()
+                batch, batch_bytes = [], 0
+            batch.append({"key": row_key, "value": row, "last_updated": now})
+            batch_bytes += row_bytes
+        if batch:
+            self.client.table("app_cache").upsert(batch).execute()
+        changed = sum(1 for sid in new_shards if (old_shards.get(sid) or {}).get("sha256") != new_shards[sid]["sha256"])
+
+        manifest = {"__sharded__": 1, "shards": new_shards, "updated_at": now}
+        if "records" in spec:
+            manifest["records"] = spec["records"]
+            manifest["meta"] = {k: v for k, v in clean_value.items() if k != spec["records"]}
+        response = self.client.table("app_cache").upsert({"key": key, "value": manifest, "last_updated": now}).execute()
+
+        live = {entry["row"] for entry in new_shards.values()}
+        orphans = sorted({_shard_row_key(key, sid, entry) for sid, entry in old_shards.items()} - live)
+        if orphans:
+            self.client.table("app_cache").delete().in_("key", orphans).execute()
+
+        for sid, part in parts.items():
+            _remember(new_shards[sid]["row"], part, new_shards[sid]["sha256"])
+        print(f"🧩 '{key}': {changed}/{len(new_shards)} shards enviados, {len(orphans)} removidos.")
+
+        if getattr(response, "data", None):
+            return response.data[0].get("last_updated", now)
+        return now
+
+    def _probe_version(self, key):
+        """Sonda de frescor: lê só a coluna 'last_updated', sem o 'value'."""
+        response = self.client.table("app_cache").select("last_updated").eq("key", key).execute()
+        if response.data and len(response.data) > 0:
+            return response.data[0].get('last_updated')
+        return None
+
+    def invalidate_cache(self, key=None):
+        """Descarta uma chave (ou o cache inteiro) para forçar o próximo download."""
+        # Chaves com upload pendente ficam: a nuvem ainda tem o valor antigo
+        keys = list(_READ_CACHE) if key is None else [key]
+        keys = [k for k in keys if not _WRITE_QUEUE.is_pending(k)]
+        with _CACHE_LOCK:
+            for k in keys:
+                _READ_CACHE.pop(k, None)
+
+    def cache_stats(self):
+        """Contadores de hit/miss e chaves em memória (para o painel de Config)."""
+        with _CACHE_LOCK:
+            stats = dict(_CACHE_STATS)
+            stats["keys"] = len(_READ_CACHE)
+        total = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["revalidated"]) / total if total else 0.0
+        return stats
+
+    def save_data(self, key, value, background=None, sanitized=False):
+        """
+        Salva (Upsert) com tratamento de JSON inválido (NaN/Dates).
+        background=True enfileira o upload (write-behind); None segue o modo global.
+        sanitized=True pula a limpeza (valor já veio de sanitize_for_json).
+        """
         if not self.connected: return False
+        if background is None: background = _WRITE_BEHIND["enabled"]
         try:
             # --- TRATAMENTO DE DADOS (CRÍTICO PARA EVITAR ERRO 400) ---
             # O Supabase rejeita NaN (Not a Number) e objetos datetime puros dentro do JSONB
-            
-            # 1. Converter para string JSON usando um encoder inteligente
-            # Isso limpa NaNs, datas e tipos estranhos do Pandas/Numpy
-            clean_json_str = json.dumps(value, default=str).replace("NaN", "null").replace("Infinity", "null")
-            
-            # 2. Carregar de volta para dict limpo
-            clean_value = json.loads(clean_json_str)
-
-            # Prepara o payload
-            payload = {
-                "key": key,
-                "value": clean_value, # Envia o dict já limpo
-                "last_updated": datetime.now().isoformat()
-            }
-            
-            # UPSERT (on_conflict na coluna 'key')
-            # O Supabase client ja entende upsert pela PK, mas garantir dados limpos é o segredo
-            self.client.table("app_cache").upsert(payload).execute()
-            
+            clean_value = value if sanitized else sanitize_for_json(value)
+        except Exception as e:
+            print(f"❌ Erro SAVE '{key}' (Provável JSON Inválido): {e}")
+            raise e
+
+        # Write-behind: leitores já enxergam o valor novo enquanto ele sobe
+        if background:
+            _remember(key, clean_value, None)
+            if _WRITE_QUEUE.submit(self, key, clean_value):
+                print(f"📤 Enfileirado para upload: {key}")
+                return True
+            print(f"⚠️ Fila de upload cheia, salvando '{key}' direto.")
+
+        try:
+            version = self._upsert(key, clean_value)
+            # Write-through: o próximo get_data já sai da memória
+            _remember(key, clean_value, version)
             print(f"✅ Salvo com sucesso: {key}")
             return True
             
         except Exception as e:
             # Mostra o erro real para debug
-            print(f"❌ Erro SAVE '{key}' (Provável JSON Inválido): {e}")
+            print(f"❌ Erro SAVE '{key}': {e}")
             raise e
 
+    def _upsert(self, key, clean_value):
+        """Upload de um valor já limpo. Retorna o 'last_updated' gravado."""
+        spec = SHARDED_KEYS.get(key)
+        if spec:
+            parts = _split_shards(spec, clean_value)
+            if parts is not None:
+                return self._upsert_sharded(key, spec, parts, clean_value)
+
+        # Prepara o payload
+        payload = {
+            "key": key,
+            "value": clean_value, # Envia o dict já limpo
+            "last_updated": datetime.now().isoformat()
+        }
+        
+        # UPSERT (on_conflict na coluna 'key')
+        # O Supabase client ja entende upsert pela PK, mas garantir dados limpos é o segredo
+        response = self.client.table("app_cache").upsert(payload).execute()
+        if getattr(response, "data", None):
+            return response.data[0].get("last_updated", payload["last_updated"])
+        return payload["last_updated"]
+
+    # --- Controle do write-behind (compartilhado pelo processo) ---
+    def set_write_behind(self, enabled):
+        _WRITE_BEHIND["enabled"] = bool(enabled)
+
+    def write_behind_enabled(self):
+        return _WRITE_BEHIND["enabled"]
+
+    def flush_writes(self, timeout=30):
+        """Drena a fila de uploads. True se tudo subiu dentro do timeout."""
+        return _WRITE_QUEUE.flush(timeout=timeout)
+
+    def write_queue_stats(self):
+        """Profundidade e contadores da fila (para o painel de Config)."""
+        stats = _WRITE_QUEUE.get_stats()
+        stats["enabled"] = _WRITE_BEHIND["enabled"]
+        return stats
+
+# ============================================================================
+# BACKEND LOCAL (SQLITE) - MESMO CONTRATO DO DatabaseHandler
+# ============================================================================
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "app_cache.sqlite3")
+
+
+class SQLiteDatabaseHandler(DatabaseHandler):
+    """
+    Backend offline: mesma API (get_data/save_data/get_many/...) gravando num
+    arquivo SQLite local em modo WAL. Herda o cache de leitura e o write-behind;
+    não fatia chaves (não existe limite de payload local).
+    """
+
+    def __init__(self, path=None):
+        self.client = None
+        self.connected = False
+        self.path = path or DEFAULT_SQLITE_PATH
+        self._local = threading.local()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = self._conn()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS app_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " last_updated TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_app_cache_updated ON app_cache(last_updated)")
+            conn.commit()
+            self.connected = True
+            print(f"🗄️ SQLite Conectado! ({self.path})")
+        except Exception as e:
+            print(f"❌ Erro Crítico SQLite: {e}")
+
+    def _conn(self):
+        """Uma conexão por thread (Streamlit + thread do write-behind)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _fetch_rows(self, keys):
+        keys = list(keys)
+        marks = ",".join("?" * len(keys))
+        cur = self._conn().execute(
+            f"SELECT key, value, last_updated FROM app_cache WHERE key IN ({marks})", keys)
+        return {k: {"key": k, "value": json.loads(v), "last_updated": ts} for k, v, ts in cur.fetchall()}
+
+    def _fetch_row(self, key):
+        row = self._fetch_rows([key]).get(key)
+        if row is None: return None, None
+        return row["value"], row["last_updated"]
+
+    def _probe_version(self, key):
+        return self.get_metadata([key]).get(key)
+
+    def get_metadata(self, keys):
+        if not self.connected or not keys: return {}
+        keys = list(keys)
+        marks = ",".join("?" * len(keys))
+        cur = self._conn().execute(
+            f"SELECT key, last_updated FROM app_cache WHERE key IN ({marks})", keys)
+        return dict(cur.fetchall())
+
+    def get_shards(self, key, groups):
+        """Sem shards no SQLite: lê o valor (cacheado) e filtra em memória."""
+        spec = SHARDED_KEYS.get(key)
+        value = self.get_data(key)
+        if not spec: return value
+        return self._filter_groups(spec, value, {str(g).upper() for g in groups})
+
+    def _upsert(self, key, clean_value):
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO app_cache (key, value, last_updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_updated = excluded.last_updated",
+            (key, json.dumps(clean_value, ensure_ascii=False, allow_nan=False), now),
+        )
+        conn.commit()
+        return now
+
+
+def create_database_handler(backend=None):
+    """
+    Fábrica do backend: 'supabase' (padrão) ou 'sqlite'.
+    Escolha via argumento, st.secrets["DB_BACKEND"] ou env SUITENAS_DB_BACKEND;
+    o caminho do SQLite vem de SQLITE_PATH (secrets/env).
+    """
+    if backend is None:
+        try: backend = st.secrets.get("DB_BACKEND")
+        except Exception: backend = None
+        backend = backend or os.environ.get("SUITENAS_DB_BACKEND", "supabase")
+    backend = str(backend).lower().strip()
+
+    if backend == "sqlite":
+        try: path = st.secrets.get("SQLITE_PATH")
+        except Exception: path = None
+        return SQLiteDatabaseHandler(path or os.environ.get("SQLITE_PATH"))
+    return DatabaseHandler()
+
+
 # Instância única
 try:
-    db = DatabaseHandler()
+    db = create_database_handler()
     if not db.connected:
         print("⚠️ Aviso: DatabaseHandler falhou na inicialização.")
         db = None
@@ -0,0 +1,214 @@
+# ============================================================================
+# GAME SLATE (CONTEXTO DOS JOGOS DO DIA, IMUTÁVEL, POR VERSÃO DO SCOREBOARD)
+# ============================================================================
+# Trinity, 5/7/10, Hit Prop Hunter (atomic props / especialidades), o
+# Desdobrador e o build_game_context montavam cada um o seu mapa
+# time -> adversário/mando/game_id a partir do st.session_state.scoreboard,
+# cada um com a sua normalização de siglas (o 5/7/10 chegava a trocar BKN
+# por BRK e nunca achava os Nets). Aqui o scoreboard vira, uma vez por
+# versão:
+#
+#   colunas por jogo     game_ids / home / away / spread / total / pace / risco
+#   team_index[TIME]     -> (jogo, lado)   consulta O(1)
+#
+# com siglas canônicas NBA (BKN, GSW, NOP, NYK, PHX, SAS, UTA, WAS, CHA).
+# O spread é guardado do ponto de vista do mandante ('BOS -5.5' com BOS em
+# casa -> -5.5) e devolvido do ponto de vista de quem pergunta.
+#
+# Uso:
+#   from game_slate import get_game_slate
+#   slate = get_game_slate(st.session_state.scoreboard)
+#   ctx = slate.context('BRK')   # {'team': 'BKN', 'opp', 'venue', 'spread', ...}
+import hashlib
+import threading
+
+import numpy as np
+
+try:
+    from modules.new_modules.pace_adjuster import DEFAULT_PACE_DATA, LEAGUE_AVERAGE_PACE
+except ImportError:
+    DEFAULT_PACE_DATA, LEAGUE_AVERAGE_PACE = {}, 99.5
+
+# Siglas ESPN / antigas / nomes -> sigla canônica NBA
+TEAM_ALIASES = {
+    "GS": "GSW", "GOLDEN STATE": "GSW", "WARRIORS": "GSW",
+    "NO": "NOP", "NOH": "NOP", "NEW ORLEANS": "NOP", "PELICANS": "NOP",
+    "NY": "NYK", "NEW YORK": "NYK", "KNICKS": "NYK",
+    "SA": "SAS", "SAN ANTONIO": "SAS", "SPURS": "SAS",
+    "PHO": "PHX", "PHOENIX": "PHX", "SUNS": "PHX",
+    "UTAH": "UTA", "UT": "UTA", "JAZZ": "UTA",
+    "WSH": "WAS", "WASHINGTON": "WAS", "WIZARDS": "WAS",
+    "BRK": "BKN", "BK": "BKN", "BROOKLYN": "BKN", "NETS": "BKN",
+    "CHO": "CHA", "CHARLOTTE": "CHA", "HORNETS": "CHA",
+}
+HIGH_PACE, LOW_PACE = 101.5, 98.5          # mesmos cortes do build_game_context
+BLOWOUT_SPREAD = 12.0                      # |spread| >= 12 -> risco de blowout
+RISK_HIGH, RISK_MEDIUM = 12.0, 8.0         # rótulos ALTO/MEDIO/BAIXO do Desdobrador
+SLATE_CACHE_SIZE = 4
+
+
+def canonical_team(code):
+    """'BRK' / 'GS' / 'Phoenix' -> 'BKN' / 'GSW' / 'PHX' ('UNK' se vazio)."""
+    if not code: return "UNK"
+    code = str(code).upper().strip()
+    return TEAM_ALIASES.get(code, code)
+
+
+def _to_float(v, default=0.0):
+    try: return float(v)
+    except (TypeError, ValueError): return default
+
+
+def parse_spread(spread, home, away):
+    """
+    Spread do ponto de vista do mandante. Aceita número ou o texto da ESPN
+    ('BOS -5.5', 'EVEN', 'PK', 'N/A'); o time do texto decide o sinal.
+    """
+    if spread is None: return 0.0
+    if isinstance(spread, (int, float)): return float(spread)
+    text = str(spread).strip().upper()
+    if not text or text in ("N/A", "EVEN", "PK", "PICK"): return 0.0
+    parts = text.split()
+    value = _to_float(parts[-1])
+    if len(parts) < 2: return value
+    fav = canonical_team(parts[0])
+    return value if fav == home else (-value if fav == away else value)
+
+
+def risk_label(spread):
+    spread = abs(spread)
+    return "ALTO" if spread > RISK_HIGH else ("MEDIO" if spread > RISK_MEDIUM else "BAIXO")
+
+
+def _readonly(values, dtype):
+    arr = np.asarray(values, dtype=dtype)
+    arr.setflags(write=False)
+    return arr
+
+
+class GameSlate:
+    def __init__(self, games, team_pace=None):
+        pace_table = {canonical_team(t): _to_float(p, LEAGUE_AVERAGE_PACE)
+                      for t, p in dict(DEFAULT_PACE_DATA, **(team_pace or {})).items()}
+        self.pace_table = pace_table
+        homes, aways, ids, spreads, totals, paces, statuses = [], [], [], [], [], [], []
+        for g in games or []:
+            if not isinstance(g, dict): continue
+            home = canonical_team(g.get('home') or g.get('home_abbr'))
+            away = canonical_team(g.get('away') or g.get('away_abbr'))
+            if home == "UNK" or away == "UNK": continue
+            raw_spread = g.get('spread') if g.get('spread') not in (None, "") else g.get('odds_spread')
+            raw_total = g.get('total') if g.get('total') not in (None, "") else g.get('odds_total')
+            homes.append(home)
+            aways.append(away)
+            ids.append(str(g.get('game_id') or g.get('gameId') or g.get('id') or f"{away} @ {home}"))
+            spreads.append(parse_spread(raw_spread, home, away))
+            totals.append(_to_float(raw_total))
+            paces.append((pace_table.get(home, LEAGUE_AVERAGE_PACE) + pace_table.get(away, LEAGUE_AVERAGE_PACE)) / 2.0)
+            statuses.append(str(g.get('status') or ""))
+
+        self.home, self.away = tuple(homes), tuple(aways)
+        self.game_ids, self.status = tuple(ids), tuple(statuses)
+        self.spread = _readonly(spreads, np.float64)   # ponto de vista do mandante
+        self.total = _readonly(totals, np.float64)
+        self.pace = _readonly(paces, np.float64)
+        self.blowout = _readonly(np.abs(self.spread) >= BLOWOUT_SPREAD, bool)
+        self.risk = tuple(risk_label(s) for s in spreads)
+        index = {}
+        for i, (h, a) in enumerate(zip(homes, aways)):
+            index.setdefault(h, (i, True))
+            index.setdefault(a, (i, False))
+        self.team_index = index
+        self.teams = frozenset(index)
+
+    # ------------------------------------------------------------------
+    # Consultas por time (O(1))
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self.game_ids)
+
+    def __contains__(self, team):
+        return canonical_team(team) in self.team_index
+
+    def __iter__(self):
+        """Jogos como dicts (formato games_ctx), para quem ainda itera lista."""
+        return (self.game(i) for i in range(len(self)))
+
+    def _lookup(self, team):
+        return self.team_index.get(canonical_team(team))
+
+    def opponent(self, team):
+        hit = self._lookup(team)
+        if hit is None: return None
+        i, is_home = hit
+        return self.away[i] if is_home else self.home[i]
+
+    def game_id(self, team):
+        hit = self._lookup(team)
+        return self.game_ids[hit[0]] if hit else None
+
+    def team_pace(self, team):
+        """Pace do time (tabela do slate; média da liga se desconhecido)."""
+        return self.pace_table.get(canonical_team(team), LEAGUE_AVERAGE_PACE)
+
+    def game(self, i):
+        home, away = self.home[i], self.away[i]
+        return {
+            "game_id": self.game_ids[i], "home": home, "away": away,
+            "game_str": f"{away} @ {home}", "status": self.status[i],
+            "spread": float(self.spread[i]), "total": float(self.total[i]),
+            "pace": float(self.pace[i]), "blowout_risk": self.risk[i],
+            "is_blowout_risk": bool(self.blowout[i]),
+        }
+
+    def game_of(self, team):
+        hit = self._lookup(team)
+        return self.game(hit[0]) if hit else None
+
+    def context(self, team):
+        """Contexto do jogo do `team` (spread do ponto de vista dele) ou None."""
+        hit = self._lookup(team)
+        if hit is None: return None
+        i, is_home = hit
+        ctx = self.game(i)
+        ctx.update({
+            "team": self.home[i] if is_home else self.away[i],
+            "opp": self.away[i] if is_home else self.home[i],
+            "is_home": is_home, "venue": "CASA" if is_home else "FORA",
+            "spread": float(self.spread[i]) if is_home else -float(self.spread[i]),
+            "is_high_pace": bool(self.pace[i] >= HIGH_PACE),
+            "is_low_pace": bool(self.pace[i] <= LOW_PACE),
+        })
+        return ctx
+
+
+# ============================================================================
+# CACHE POR VERSÃO DO SCOREBOARD
+# ============================================================================
+_SLATE_LOCK = threading.Lock()
+_SLATE_CACHE = {}
+
+
+def slate_version(games, team_pace=None):
+    h = hashlib.sha1()
+    for g in games or []:
+        if not isinstance(g, dict): continue
+        h.update(repr(sorted((str(k), str(v)) for k, v in g.items())).encode("utf-8"))
+    for t, p in sorted((team_pace or {}).items()):
+        h.update(f"{t}={p};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_game_slate(games, team_pace=None):
+    """GameSlate do scoreboard (lista de jogos ou DataFrame), um por versão."""
+    if isinstance(games, GameSlate): return games
+    if hasattr(games, "to_dict"): games = games.to_dict("records")
+    version = slate_version(games, team_pace)
+    with _SLATE_LOCK:
+        slate = _SLATE_CACHE.pop(version, None)
+        if slate is None:
+            slate = GameSlate(games, team_pace)
+        _SLATE_CACHE[version] = slate
+        while len(_SLATE_CACHE) > SLATE_CACHE_SIZE:
+            _SLATE_CACHE.pop(next(iter(_SLATE_CACHE)))
+    return slate
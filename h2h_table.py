@@ -0,0 +1,232 @@
+# ============================================================================
+# H2H TABLE (JOGADOR x OPONENTE, LIGA INTEIRA, VETORIZADO)
+# ============================================================================
+# MatchupHistoryFetcher e NarrativeIntelligence faziam um PlayerGameLog por
+# jogador (mais o sleep) e regravavam o cache inteiro depois de cada um; o
+# Lab Narrativas fazia isso para 20 jogadores por jogo. Aqui:
+#
+#   - 2 chamadas LeagueGameLog (temporada atual + anterior) para a liga toda
+#   - OPP sai do MATCHUP ('BOS vs. LAL' / 'BOS @ LAL' -> 'LAL')
+#   - um groupby jogador x oponente calcula médias, baselines e as
+#     classificações HOT/COLD (fetcher) e KILLER/COLD (narrativa) de todos
+#     os pares de uma vez
+#   - o resultado fica num dict (PLAYER_ID, OPP) -> linha: consulta O(1)
+#   - gravado em cache/h2h_table.pkl e reconstruído uma vez por dia
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+CURRENT_SEASON = "2025-26"
+PREV_SEASON = "2024-25"
+H2H_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "h2h_table.pkl")
+H2H_RETRY_AFTER = 300  # segundos sem tentar de novo depois de uma falha na API
+
+# Siglas ESPN/antigas -> NBA Stats (o MATCHUP usa as da NBA)
+NBA_TEAM_ALIASES = {
+    "SA": "SAS", "NY": "NYK", "NO": "NOP", "UTAH": "UTA",
+    "GS": "GSW", "WSH": "WAS", "PHO": "PHX", "BRK": "BKN"
+}
+
+# Limiares (os mesmos das engines antigas)
+HOT_RATIO, COLD_RATIO = 1.15, 0.85     # fetcher: PRA H2H / PRA da temporada
+KILLER_PCT, TRAUMA_PCT = 15.0, -15.0   # narrativa: PTS H2H vs PTS da temporada
+NARRATIVE_MIN_GAMES = 2
+
+
+def nba_team(abbr):
+    abbr = str(abbr or "").upper().strip()
+    return NBA_TEAM_ALIASES.get(abbr, abbr)
+
+
+def opponent_from_matchup(matchup):
+    """Série MATCHUP -> sigla do oponente (último token)."""
+    return matchup.astype(str).str.split().str[-1].str.upper()
+
+
+def build_h2h_table(df_curr, df_prev=None):
+    """
+    DataFrame indexado por (PLAYER_ID, OPP) a partir dos LeagueGameLog.
+    Colunas *_CUR = só temporada atual; *_ALL = atual + anterior.
+    """
+    frames = []
+    for df, is_curr in ((df_curr, True), (df_prev, False)):
+        if df is None or df.empty: continue
+        part = df[["PLAYER_ID", "MATCHUP", "PTS", "REB", "AST", "FG3M"]].copy()
+        part["CUR"] = is_curr
+        frames.append(part)
+    if not frames: return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    for c in ("PTS", "REB", "AST", "FG3M"):
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+    df["PLAYER_ID"] = df["PLAYER_ID"].astype(int)
+    df["PRA"] = df["PTS"] + df["REB"] + df["AST"]
+    df["OPP"] = opponent_from_matchup(df["MATCHUP"])
+
+    stats = ["PTS", "REB", "AST", "FG3M", "PRA"]
+    cur = df[df["CUR"]]
+    h2h_cur = cur.groupby(["PLAYER_ID", "OPP"])[stats].mean().add_suffix("_CUR")
+    h2h_cur["G_CUR"] = cur.groupby(["PLAYER_ID", "OPP"]).size()
+    h2h_all = df.groupby(["PLAYER_ID", "OPP"])[["PTS", "REB", "AST"]].mean().add_suffix("_ALL")
+    h2h_all["G_ALL"] = df.groupby(["PLAYER_ID", "OPP"]).size()
+    table = h2h_all.join(h2h_cur, how="left")
+    table["G_CUR"] = table["G_CUR"].fillna(0).astype(int)
+
+    # Baselines por jogador (temporada atual; sem jogo nela -> as duas)
+    season_cur = cur.groupby("PLAYER_ID")[["PTS", "PRA"]].mean()
+    season_all = df.groupby("PLAYER_ID")["PTS"].mean()
+    pids = table.index.get_level_values("PLAYER_ID")
+    season_pra = season_cur["PRA"].reindex(pids).to_numpy()
+    season_pts = season_cur["PTS"].reindex(pids).to_numpy()
+    season_pts = np.where(np.isnan(season_pts), season_all.reindex(pids).to_numpy(), season_pts)
+    table["SEASON_PRA"] = season_pra
+    table["SEASON_PTS"] = season_pts
+
+    # Fetcher: PRA no confronto (temporada atual) / PRA da temporada
+    pra_cur = table["PRA_CUR"].round(1).to_numpy()
+    ratio = np.where(season_pra > 0, pra_cur / np.where(season_pra > 0, season_pra, 1.0), 1.0)
+    table["RATIO"] = ratio
+    table["STATUS"] = np.select([ratio >= HOT_RATIO, ratio <= COLD_RATIO], ["HOT", "COLD"], "NEUTRAL")
+
+    # Narrativa: PTS no confronto (2 temporadas) vs PTS da temporada
+    pts_all = table["PTS_ALL"].to_numpy()
+    diff = np.where(season_pts > 0, (pts_all - season_pts) / np.where(season_pts > 0, season_pts, 1.0) * 100, 0.0)
+    table["DIFF_PCT"] = diff
+    table["NARRATIVE"] = np.select([diff >= KILLER_PCT, diff <= TRAUMA_PCT], ["Killer", "Cold"], "Neutro")
+    return table
+
+
+class H2HTable:
+    def __init__(self, cache_file=H2H_CACHE_FILE, seasons=(CURRENT_SEASON, PREV_SEASON)):
+        self.cache_file = cache_file
+        self.seasons = tuple(seasons)
+        self._lock = threading.Lock()
+        self._date = None
+        self._rows = {}          # (PLAYER_ID, OPP) -> dict da linha
+        self._failed_at = 0.0
+        self.stats = {"builds": 0, "lookups": 0, "pairs": 0}
+
+    # ------------------------------------------------------------------
+    # Construção (uma vez por dia)
+    # ------------------------------------------------------------------
+    def _fetch_season(self, season):
+        from nba_api.stats.endpoints import leaguegamelog
+        from nba_scheduler import nba_frame, PRIORITY_BACKGROUND
+        return nba_frame(leaguegamelog.LeagueGameLog, priority=PRIORITY_BACKGROUND,
+                         season=season, player_or_team_abbreviation='P', timeout=120)
+
+    def _load_disk(self, today):
+        try:
+            with open(self.cache_file, "rb") as f:
+                data = pickle.load(f)
+            if data.get("date") == today and tuple(data.get("seasons", ())) == self.seasons:
+                return data["rows"]
+        except Exception:
+            pass
+        return None
+
+    def _save_disk(self, today, rows):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp = self.cache_file + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"date": today, "seasons": self.seasons, "rows": rows}, f)
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            print(f"⚠️ [H2H] Erro ao gravar cache: {e}")
+
+    def ensure(self, force=False):
+        """Garante a tabela do dia (disco -> API). True se há tabela carregada."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            if not force and self._date == today: return True
+            if not force:
+                rows = self._load_disk(today)
+                if rows is not None:
+                    self._rows, self._date = rows, today
+                    self.stats["pairs"] = len(rows)
+                    return True
+                if time.time() - self._failed_at < H2H_RETRY_AFTER:
+                    return bool(self._rows)
+
+            try:
+                df_curr = self._fetch_season(self.seasons[0])
+                df_prev = None
+                for season in self.seasons[1:]:
+                    try: df_prev = self._fetch_season(season)
+                    except Exception as e: print(f"⚠️ [H2H] Temporada {season} indisponível: {e}")
+                table = build_h2h_table(df_curr, df_prev)
+            except Exception as e:
+                self._failed_at = time.time()
+                print(f"❌ [H2H] Falha ao montar a tabela: {e}")
+                return bool(self._rows)
+
+            rows = table.to_dict("index")
+            self._rows, self._date = rows, today
+            self.stats["builds"] += 1
+            self.stats["pairs"] = len(rows)
+            print(f"✅ [H2H] Tabela montada: {len(rows)} pares jogador x oponente.")
+        self._save_disk(today, rows)
+        return True
+
+    def row(self, player_id, opponent_abbr):
+        if not self.ensure(): return None
+        try: key = (int(player_id), nba_team(opponent_abbr))
+        except (TypeError, ValueError): return None
+        with self._lock:
+            self.stats["lookups"] += 1
+            return self._rows.get(key)
+
+    # ------------------------------------------------------------------
+    # Visões (mesmo formato das engines antigas)
+    # ------------------------------------------------------------------
+    def matchup_status(self, player_id, opponent_abbr):
+        """HOT/NEUTRAL/COLD da temporada atual (formato do MatchupHistoryFetcher)."""
+        r = self.row(player_id, opponent_abbr)
+        if not r or not r["G_CUR"]: return None
+        colors = {"HOT": "#00FF9C", "COLD": "#FF4F4F", "NEUTRAL": "#94A3B8"}
+        return {
+            "status": r["STATUS"],
+            "color": colors[r["STATUS"]],
+            "stats": {
+                "PTS": round(r["PTS_CUR"], 1), "REB": round(r["REB_CUR"], 1),
+                "AST": round(r["AST_CUR"], 1), "3PM": round(r["FG3M_CUR"], 1),
+                "PRA": round(r["PRA_CUR"], 1)
+            },
+            "diff_pct": round((r["RATIO"] - 1) * 100, 1),
+            "games_count": int(r["G_CUR"])
+        }
+
+    def narrative(self, player_id, opponent_abbr):
+        """Killer/Cold/Neutro em 2 temporadas (formato do NarrativeIntelligence)."""
+        r = self.row(player_id, opponent_abbr)
+        if not r or r["G_ALL"] < NARRATIVE_MIN_GAMES: return None
+        badges = {"Killer": "🔥 CARRASCO", "Cold": "❄️ TRAUMA", "Neutro": "H2H"}
+        games = int(r["G_ALL"])
+        return {
+            "games_played": games,
+            "avg_stats": {
+                "PTS": round(r["PTS_ALL"], 1), "REB": round(r["REB_ALL"], 1),
+                "AST": round(r["AST_ALL"], 1)
+            },
+            "comparison": {
+                "season_pts": round(r["SEASON_PTS"], 1),
+                "diff_pct": round(r["DIFF_PCT"], 1)
+            },
+            "narrative": r["NARRATIVE"],
+            "badge": badges[r["NARRATIVE"]],
+            "last_games_count": games
+        }
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, date=self._date)
+
+
+# Instância única do processo
+h2h_table = H2HTable()
@@ -0,0 +1,200 @@
+# ============================================================================
+# HTTP CLIENT (POOL ÚNICO PARA ESPN / CBS / PINNACLE / WEB)
+# ============================================================================
+# Antes cada fetch era um requests.get solto: conexão TCP+TLS nova a cada
+# chamada e várias sem timeout (Pinnacle). Aqui:
+#
+#   - uma Session com pool por host (keep-alive) compartilhada pelo processo
+#   - timeout obrigatório (padrão DEFAULT_TIMEOUT se o chamador não passar)
+#   - revalidação condicional: guarda ETag/Last-Modified e manda
+#     If-None-Match/If-Modified-Since; um 304 devolve o corpo do disco
+#   - cache em disco pequeno (cache/http), chave = URL + params
+#
+# A resposta é sempre um requests.Response, então o código chamador
+# (status_code, json(), text, raise_for_status) não muda.
+#
+# Uso:
+#   from http_client import http_get
+#   r = http_get(url, headers=HEADERS, timeout=10)
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (3.05, 15)   # (conexão, leitura) em segundos
+HTTP_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "http")
+HTTP_CACHE_MAX_ENTRIES = 512
+POOL_CONNECTIONS = 16          # hosts distintos mantidos no pool
+POOL_MAXSIZE = 16              # conexões simultâneas por host
+
+
+def _cache_key(url, params):
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    raw = url + "?" + json.dumps(items, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class HttpClient:
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_entries=HTTP_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"requests": 0, "not_modified": 0, "fresh_hits": 0,
+                      "stored": 0, "errors": 0}
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def get(self, url, params=None, headers=None, timeout=None, cache=True, max_age=0):
+        """
+        GET com pool + revalidação. cache=False ignora o disco (não manda
+        validadores nem grava). max_age>0 serve do disco sem rede enquanto
+        a entrada for mais nova que max_age segundos.
+        """
+        timeout = timeout or DEFAULT_TIMEOUT
+        key = _cache_key(url, params) if cache else None
+        entry = self._load(key) if key else None
+
+        if entry and max_age and time.time() - entry["meta"].get("fetched_at", 0) < max_age:
+            self._bump("fresh_hits")
+            return self._from_cache(entry, url)
+
+        req_headers = dict(headers or {})
+        if entry:
+            meta = entry["meta"]
+            if meta.get("etag"): req_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"): req_headers["If-Modified-Since"] = meta["last_modified"]
+
+        self._bump("requests")
+        try:
+            r = self.session.get(url, params=params, headers=req_headers, timeout=timeout)
+        except requests.RequestException:
+            self._bump("errors")
+            raise
+
+        if r.status_code == 304 and entry:
+            self._bump("not_modified")
+            self._touch(key, entry)
+            return self._from_cache(entry, r.url or url)
+
+        if key and r.status_code == 200 and (r.headers.get("ETag") or r.headers.get("Last-Modified") or max_age):
+            self._store(key, url, r)
+        return r
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def clear_cache(self):
+        """Apaga o cache em disco (as conexões do pool continuam vivas)."""
+        try:
+            for name in os.listdir(self.cache_dir):
+                try: os.remove(os.path.join(self.cache_dir, name))
+                except OSError: pass
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Cache em disco: <key>.json (meta) + <key>.body (bytes crus)
+    # ------------------------------------------------------------------
+    def _bump(self, field):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            return {"meta": meta, "body": body}
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, url, r):
+        meta = {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "content_type": r.headers.get("Content-Type"),
+            "encoding": r.encoding,
+            "fetched_at": time.time(),
+        }
+        meta_path, body_path = self._paths(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Corpo primeiro, meta por último: meta sem corpo nunca fica no disco
+            tmp = body_path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(r.content)
+            os.replace(tmp, body_path)
+            tmp = meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, meta_path)
+        except OSError:
+            return
+        self._bump("stored")
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 32 == 0
+        if prune: self._prune()
+
+    def _touch(self, key, entry):
+        # 304 confirma o corpo: renova fetched_at (vale para o max_age)
+        entry["meta"]["fetched_at"] = time.time()
+        meta_path, _ = self._paths(key)
+        try:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(entry["meta"], f)
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Mantém só as max_entries entradas usadas mais recentemente."""
+        try:
+            metas = [n for n in os.listdir(self.cache_dir) if n.endswith(".json")]
+        except FileNotFoundError:
+            return
+        if len(metas) <= self.max_entries: return
+        metas.sort(key=lambda n: os.path.getmtime(os.path.join(self.cache_dir, n)))
+        for name in metas[:len(metas) - self.max_entries]:
+            for path in self._paths(name[:-5]):
+                try: os.remove(path)
+                except OSError: pass
+
+    @staticmethod
+    def _from_cache(entry, url):
+        meta = entry["meta"]
+        r = requests.Response()
+        r.status_code = 200
+        r._content = entry["body"]
+        r.url = url
+        r.encoding = meta.get("encoding")
+        if meta.get("content_type"): r.headers["Content-Type"] = meta["content_type"]
+        if meta.get("etag"): r.headers["ETag"] = meta["etag"]
+        if meta.get("last_modified"): r.headers["Last-Modified"] = meta["last_modified"]
+        r.headers["X-SuiteNAS-Cache"] = "HIT"
+        return r
+
+
+# Instância única do processo (pool sobrevive aos reruns do Streamlit)
+http = HttpClient()
+
+
+def http_get(url, params=None, headers=None, timeout=None, cache=True, max_age=0):
+    return http.get(url, params=params, headers=headers, timeout=timeout, cache=cache, max_age=max_age)
@@ -0,0 +1,312 @@
+# ============================================================================
+# INGEST WORKER (REFRESH FORA DO STREAMLIT, POR AGENDA)
+# ============================================================================
+# Todo refresh rodava no thread do script, disparado por botão: a página
+# ficava presa até acabar e duas sessões podiam baixar a mesma coisa ao
+# mesmo tempo. Este processo roda os jobs sozinho, em ordem de dependência:
+#
+#   scoreboard -> injuries / logs -> l5 / h2h / dvp / rotation_dna
+#
+#   - cada job tem seu intervalo (SUITENAS_INGEST_<JOB>=segundos ou --every)
+#   - job cuja dependência falhou na última execução fica 'blocked'
+#   - jobs com follow=True rodam sempre que a dependência rodou com sucesso
+#   - lock por job (cache/locks/<job>.lock), o mesmo usado pelos botões da
+#     página Config: worker e sessões nunca rodam o mesmo job juntos
+#   - saúde de cada job (status, duração, erro, próxima execução) vai para
+#     a chave 'ingest_health' do store; o app só lê
+#
+# Uso:
+#   python ingest_worker.py                  # loop com as agendas padrão
+#   python ingest_worker.py --once           # um ciclo (jobs vencidos) e sai
+#   python ingest_worker.py --job logs       # roda já (e as dependências)
+#   python ingest_worker.py --every logs=1800 --every injuries=900
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCK_DIR = os.path.join(BASE_DIR, "cache", "locks")
+LOCK_TTL = 45 * 60  # lock mais velho que isso é de processo morto
+KEY_INGEST_HEALTH = "ingest_health"
+INGEST_HEALTH_FILE = os.path.join(BASE_DIR, "cache", "ingest_health.json")
+DEFAULT_TICK = 30   # segundos entre verificações da agenda
+ERROR_RETRY = 5 * 60  # job que falhou tenta de novo antes do intervalo normal
+
+
+# ============================================================================
+# LOCK POR JOB (ENTRE PROCESSOS)
+# ============================================================================
+class JobLock:
+    """
+    Lock de arquivo criado com O_EXCL. Uso:
+        with job_lock("logs") as locked:
+            if locked: ...
+    """
+    def __init__(self, name, ttl=LOCK_TTL, lock_dir=LOCK_DIR):
+        self.name = name
+        self.ttl = ttl
+        self.path = os.path.join(lock_dir, f"{name}.lock")
+        self.locked = False
+
+    def _owner(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try: age = time.time() - os.path.getmtime(self.path)
+                except OSError: continue  # sumiu entre o open e o stat: tenta de novo
+                if age < self.ttl: return False
+                print(f"⚠️ [Lock] '{self.name}' abandonado há {age:.0f}s ({self._owner()}). Assumindo.")
+                try: os.remove(self.path)
+                except OSError: pass
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"pid": os.getpid(), "host": socket.gethostname(),
+                           "since": datetime.now().isoformat()}, f)
+            self.locked = True
+            return True
+        return False
+
+    def release(self):
+        if not self.locked: return
+        self.locked = False
+        try: os.remove(self.path)
+        except OSError: pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def job_lock(name, ttl=LOCK_TTL):
+    return JobLock(name, ttl=ttl)
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+# Cada job recebe o módulo do app (SuiteNAS, importado sem UI) e devolve um
+# resumo curto; exceção = falha.
+def _job_scoreboard(app):
+    games = app.fetch_espn_scoreboard(progress_ui=False) or []
+    app.save_data_universal(app.KEY_SCOREBOARD, games, app.SCOREBOARD_JSON_FILE)
+    return f"{len(games)} jogos"
+
+
+def _job_injuries(app):
+    from injuries import InjuryMonitor
+    from roster_loader import ESPN_TEAM_CODES
+    monitor = InjuryMonitor()
+    if not monitor.update_all_teams(list(ESPN_TEAM_CODES)):
+        raise RuntimeError("nenhum time atualizado")
+    return f"{sum(len(v) for v in monitor.get_all_injuries().values())} lesionados"
+
+
+def _job_logs(app):
+    logs = app.fetch_and_upload_real_game_logs(progress_ui=False, incremental=True)
+    if not logs: raise RuntimeError("LeagueGameLog vazio")
+    return f"{len(logs)} jogadores"
+
+
+def _job_l5(app):
+    df = app.get_players_l5(progress_ui=False, incremental=True)
+    if df is None or df.empty: raise RuntimeError("L5 vazio")
+    return f"{len(df)} jogadores"
+
+
+def _job_h2h(app):
+    from h2h_table import h2h_table
+    if not h2h_table.ensure(force=True): raise RuntimeError("tabela H2H indisponível")
+    return f"{h2h_table.get_stats()['pairs']} pares"
+
+
+def _job_dvp(app):
+    from modules.new_modules.dvp_analyzer import DvPAnalyzer
+    if not DvPAnalyzer().update_data(): raise RuntimeError("scraping DvP falhou")
+    return "ok"
+
+
+def _job_rotation_dna(app):
+    from modules.new_modules.rotation_forensics import RotationForensics
+    dna = RotationForensics().generate_dna_report()
+    if not dna: raise RuntimeError("DNA vazio")
+    app.save_data_universal("rotation_dna_v27", dna)
+    return f"{len(dna)} times"
+
+
+# Ordem do dict = ordem topológica (dependência sempre antes)
+JOBS = {
+    "scoreboard":   {"fn": _job_scoreboard,   "deps": (),                "interval": 15 * 60},
+    "injuries":     {"fn": _job_injuries,     "deps": ("scoreboard",),   "interval": 30 * 60},
+    "logs":         {"fn": _job_logs,         "deps": ("scoreboard",),   "interval": 60 * 60},
+    "l5":           {"fn": _job_l5,           "deps": ("logs",),         "interval": 60 * 60, "follow": True},
+    "h2h":          {"fn": _job_h2h,          "deps": ("logs",),         "interval": 24 * 3600},
+    "dvp":          {"fn": _job_dvp,          "deps": ("logs",),         "interval": 12 * 3600},
+    "rotation_dna": {"fn": _job_rotation_dna, "deps": ("logs",),         "interval": 24 * 3600},
+}
+
+
+def with_dependencies(names):
+    """names + todas as dependências, na ordem de JOBS."""
+    wanted = set()
+    def add(n):
+        if n in wanted: return
+        wanted.add(n)
+        for d in JOBS[n]["deps"]: add(d)
+    for n in names: add(n)
+    return [n for n in JOBS if n in wanted]
+
+
+# ============================================================================
+# WORKER (SAÚDE VAI PARA O STORE; O APP SÓ LÊ)
+# ============================================================================
+class IngestWorker:
+    def __init__(self, app, intervals=None, jobs=None):
+        self.app = app
+        self.jobs = {n: dict(JOBS[n]) for n in (jobs or JOBS)}
+        for name, seconds in (intervals or {}).items():
+            if name in self.jobs: self.jobs[name]["interval"] = seconds
+        self.state = {n: {"status": "idle", "last_run": 0.0, "last_ok": 0.0,
+                          "duration": 0.0, "error": None, "summary": ""} for n in self.jobs}
+        self.started_at = datetime.now().isoformat()
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+    def run_job(self, name):
+        state = self.state[name]
+        with job_lock(name) as locked:
+            if not locked:
+                state["status"] = "busy"  # outro processo (ou sessão) está rodando
+                print(f"⏳ [Worker] '{name}' já em execução em outro processo. Pulando.")
+                return False
+            start = time.time()
+            state.update(status="running", last_run=start)
+            self.publish()
+            print(f"▶️ [Worker] {name}...")
+            try:
+                state["summary"] = str(self.jobs[name]["fn"](self.app) or "")
+                state.update(status="ok", last_ok=time.time(), error=None)
+                print(f"✅ [Worker] {name}: {state['summary']} ({time.time() - start:.1f}s)")
+            except Exception as e:
+                state.update(status="error", error=f"{type(e).__name__}: {e}"[:300])
+                print(f"❌ [Worker] {name}: {state['error']}")
+            state["duration"] = round(time.time() - start, 1)
+        self.publish()
+        return state["status"] == "ok"
+
+    def due(self, name, now, ran_ok):
+        job = self.jobs[name]
+        if job.get("follow") and any(d in ran_ok for d in job["deps"]): return True
+        state = self.state[name]
+        interval = min(job["interval"], ERROR_RETRY) if state["status"] == "error" else job["interval"]
+        return now - state["last_run"] >= interval
+
+    def tick(self, force=None):
+        """Um ciclo: roda (em ordem) os jobs vencidos ou os de `force`."""
+        now = time.time()
+        ran_ok = set()
+        for name in self.jobs:
+            deps = [d for d in self.jobs[name]["deps"] if d in self.state]
+            if any(self.state[d]["status"] in ("error", "blocked") for d in deps):
+                if self.state[name]["status"] != "blocked":
+                    print(f"⛔ [Worker] {name} bloqueado: dependência falhou.")
+                self.state[name]["status"] = "blocked"
+                continue
+            if self.state[name]["status"] == "blocked": self.state[name]["status"] = "idle"
+            if force is not None:
+                if name not in force: continue
+            elif not self.due(name, now, ran_ok):
+                continue
+            if self.run_job(name): ran_ok.add(name)
+        self.publish()
+        return ran_ok
+
+    def loop(self, tick=DEFAULT_TICK):
+        agenda = ", ".join(f"{n}={j['interval']}s" for n, j in self.jobs.items())
+        print(f"🛰️ [Worker] Iniciado ({agenda}).")
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"❌ [Worker] Ciclo falhou: {e}")
+            time.sleep(tick)
+
+    # ------------------------------------------------------------------
+    # Saúde
+    # ------------------------------------------------------------------
+    def publish(self):
+        def ts(v): return datetime.fromtimestamp(v).isoformat() if v else None
+        health = {
+            "worker": {"host": socket.gethostname(), "pid": os.getpid(),
+                       "started_at": self.started_at, "heartbeat": datetime.now().isoformat()},
+            "jobs": {
+                n: {"status": s["status"], "summary": s["summary"], "error": s["error"],
+                    "duration": s["duration"], "last_run": ts(s["last_run"]), "last_ok": ts(s["last_ok"]),
+                    "next_run": ts(s["last_run"] + self.jobs[n]["interval"]) if s["last_run"] else None}
+                for n, s in self.state.items()
+            },
+        }
+        try:
+            self.app.save_data_universal(KEY_INGEST_HEALTH, health, INGEST_HEALTH_FILE, background=False)
+        except Exception as e:
+            print(f"⚠️ [Worker] Falha ao publicar saúde: {e}")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+def parse_intervals(pairs):
+    intervals = {}
+    for name in JOBS:
+        env = os.environ.get(f"SUITENAS_INGEST_{name.upper()}")
+        if env:
+            try: intervals[name] = int(env)
+            except ValueError: pass
+    for pair in pairs or []:
+        name, _, seconds = pair.partition("=")
+        if name not in JOBS or not seconds.isdigit():
+            raise SystemExit(f"--every inválido: {pair} (jobs: {', '.join(JOBS)})")
+        intervals[name] = int(seconds)
+    return intervals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker de ingestão do SuiteNAS (sem UI).")
+    parser.add_argument("--once", action="store_true", help="roda um ciclo (jobs vencidos) e sai")
+    parser.add_argument("--job", action="append", choices=list(JOBS), help="roda já este job (e dependências) e sai")
+    parser.add_argument("--every", action="append", metavar="JOB=SEG", help="intervalo de um job em segundos")
+    parser.add_argument("--tick", type=int, default=DEFAULT_TICK, help="segundos entre verificações da agenda")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, BASE_DIR)
+    import SuiteNAS as app  # o main() do app só roda sob `streamlit run`
+
+    worker = IngestWorker(app, intervals=parse_intervals(args.every))
+    if args.job:
+        ran = worker.tick(force=set(with_dependencies(args.job)))
+        return 0 if set(args.job) <= ran else 1
+    if args.once:
+        worker.tick()
+        return 0 if all(s["status"] in ("ok", "idle") for s in worker.state.values()) else 1
+    worker.loop(tick=args.tick)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
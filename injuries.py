@@ -9,7 +9,9 @@ import os
 import json
 import time
 from datetime import datetime
-import requests
+from http_client import http_get
+from roster_loader import roster_snapshot
+from injury_index import get_injury_index
 import unicodedata
 import re
 import streamlit as st # Adicionado para debug visual se necessário
@@ -52,7 +54,7 @@ def fetch_cbs_injuries():
     if not BS4_AVAILABLE: return {}
     url = "https://www.cbssports.com/nba/injuries/"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
+        r = http_get(url, headers=HEADERS, timeout=10)
         if r.status_code != 200: return {}
         soup = BeautifulSoup(r.text, "html.parser")
         injuries = {}
@@ -78,6 +80,7 @@ class InjuryMonitor:
     def __init__(self):
         self.cbs_data = {} 
         self.last_cbs_update = 0
+        self._index = None  # InjuryIndex do snapshot atual (refeito só quando o snapshot muda)
         self.cache = self._load_from_cloud()
 
     def _load_from_cloud(self):
@@ -101,36 +104,28 @@ class InjuryMonitor:
     def fetch_injuries_for_team(self, team_abbr):
         if not self.cbs_data: self.refresh_market_intelligence()
         
-        nba_to_espn = {"UTA":"utah","NOP":"no","NYK":"ny","GSW":"gs","SAS":"sa","PHX":"pho","WAS":"wsh","BKN":"bkn"}
-        team_code = nba_to_espn.get(team_abbr.upper(), team_abbr.lower())
-        url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams/{team_code}/roster"
-        
         try:
-            r = requests.get(url, headers=HEADERS, timeout=10)
-            if r.status_code != 200: return False
-            data = r.json()
+            # Elenco já parseado pelo roster_snapshot (1 download por time por TTL)
+            if roster_snapshot.raw(team_abbr, refresh=False) is None:
+                roster_snapshot.refresh([team_abbr], headers=HEADERS)
+            if roster_snapshot.raw(team_abbr, refresh=False) is None: return False
             team_injuries = []
             
-            # Extração flexível de atletas
-            athletes = data.get("athletes", [])
-            if not athletes and "team" in data: athletes = data["team"].get("athletes", [])
-            
-            for ath in athletes:
-                raw_name = ath.get("fullName", "")
+            for p in roster_snapshot.team_players(team_abbr, refresh=False):
+                raw_name = p["name"]
                 norm_name = normalize_name(raw_name)
                 
                 # ESPN Data
-                espn_status = ath.get("status", {}).get("type", {}).get("name", "Active")
-                espn_injuries = ath.get("injuries", [])
+                espn_status = p["status"]
                 
                 is_hurt = False
                 final_status = espn_status
                 details = ""
                 
-                if espn_injuries:
+                if p["injured"]:
                     is_hurt = True
-                    final_status = espn_injuries[0].get("status", final_status)
-                    details = espn_injuries[0].get("shortComment", "")
+                    final_status = p["injury_status"] or final_status
+                    details = p["details"]
                 elif "active" not in str(espn_status).lower():
                     is_hurt = True
                 
@@ -152,6 +147,7 @@ class InjuryMonitor:
                     })
             
             self.cache["teams"][team_abbr.upper()] = team_injuries
+            self._index = None
             return True
         except Exception as e:
             print(f"❌ [Injuries] Erro time {team_abbr}: {e}")
@@ -160,9 +156,10 @@ class InjuryMonitor:
     def update_all_teams(self, team_list):
         self.refresh_market_intelligence()
         success = 0
+        # Elencos em paralelo (snapshot compartilhado); o cruzamento com a CBS continua em memória
+        roster_snapshot.refresh(team_list, headers=HEADERS, timeout=10)
         for team in team_list:
             if self.fetch_injuries_for_team(team): success += 1
-            time.sleep(0.1) # Throttling leve
             
         if success > 0:
             self.save_to_cloud()
@@ -184,16 +181,15 @@ class InjuryMonitor:
     def get_team_injuries(self, team_abbr):
         return self.cache.get("teams", {}).get(team_abbr.upper(), [])
 
-    def is_player_blocked(self, player_name, team_abbr):
-        target = normalize_name(player_name)
-        injuries = self.get_team_injuries(team_abbr)
-        block_keywords = ['out', 'surg', 'injur', 'doubt', 'protocol', 'g-league', 'quest', 'gtd']
-        
-        for inj in injuries:
-            if target in inj.get("name_norm", ""):
-                status = str(inj.get("status", "")).lower()
-                if any(x in status for x in block_keywords): return True
-        return False
+    def index(self):
+        """Índice nome -> status e bloqueados por política do snapshot carregado."""
+        if self._index is None:
+            self._index = get_injury_index(self.cache.get("teams", {}))
+        return self._index
+
+    def is_player_blocked(self, player_name, team_abbr, policy="OUT_GTD"):
+        """Consulta O(1) no índice (política: ver injury_index.BLOCK_POLICIES)."""
+        return self.index().is_blocked(player_name, team_abbr, policy=policy)
 
 # Instância Singleton
 monitor = InjuryMonitor()
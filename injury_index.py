@@ -0,0 +1,156 @@
+# ============================================================================
+# INJURY INDEX (NOME -> STATUS E BLOQUEADOS POR POLÍTICA, UM POR SNAPSHOT)
+# ============================================================================
+# O InjuryMonitor.is_player_blocked normalizava o nome e varria a lista do
+# time com 'in' de substring a cada chamada (e o Hit Prop Hunter chama isso
+# para a liga inteira a cada render); o Oráculo, o Blowout Hunter e o DvP
+# achatavam o payload aninhado de lesões cada um do seu jeito. Aqui o
+# snapshot vira, uma vez por versão:
+#
+#   status[player_key]          -> status ('Out | CBS: Expected to be out...')
+#   team_status[(TIME, key)]    -> status (siglas canônicas, BRK -> BKN)
+#   blocked(política)           -> frozenset de player_keys (calculado 1x)
+#
+# A política é um nome de BLOCK_POLICIES ou uma tupla de palavras-chave
+# (substring no status, sem diferenciar maiúsculas).
+#
+# Uso:
+#   from injury_index import get_injury_index
+#   inj = get_injury_index(get_data_universal('injuries'))
+#   inj.is_blocked('Nic Claxton', 'BRK', policy="OUT")
+import hashlib
+import threading
+
+from roster_loader import player_key
+from game_slate import canonical_team
+
+BLOCK_POLICIES = {
+    # Só quem está fora (Oráculo: GTD/Day-to-Day ainda são projetados)
+    "OUT": ("out",),
+    # Fora + dúvida/questionável (padrão do InjuryMonitor.is_player_blocked)
+    "OUT_GTD": ("out", "surg", "injur", "doubt", "protocol", "g-league", "quest", "gtd"),
+    # OUT_GTD + Day-to-Day e Game Time Decision
+    "OUT_GTD_DAY": ("out", "surg", "injur", "doubt", "protocol", "g-league", "quest", "gtd", "day", "game time"),
+    # Ausência praticamente certa (Blowout Hunter)
+    "UNAVAILABLE": ("out", "doubtful", "surgery", "injured", "protocol", "suspended", "g league", "personal"),
+}
+INJURY_INDEX_CACHE_SIZE = 4
+
+
+def flatten_injuries(raw):
+    """
+    Registros (nome, TIME, status) de qualquer formato de payload de lesões:
+    {'teams': {TIME: [..]}}, {TIME: [..]}, lista de dicts ou 'Nome - status'.
+    O TIME vem do próprio registro ou da chave do dict que contém a lista.
+    """
+    out = []
+    stack = [(raw, "")]
+    while stack:
+        curr, team = stack.pop()
+        if isinstance(curr, dict):
+            if 'player' in curr or 'name' in curr:
+                name = curr.get('player') or curr.get('name')
+                owner = curr.get('team') or team
+                if name: out.append((str(name), canonical_team(owner) if owner else "", str(curr.get('status', ''))))
+                continue
+            for k, v in reversed(list(curr.items())):
+                if isinstance(v, (list, dict)): stack.append((v, k if isinstance(v, list) else team))
+        elif isinstance(curr, list):
+            stack.extend((item, team) for item in reversed(curr))
+        elif isinstance(curr, str) and curr.strip():
+            out.append((curr.split(' - ')[0].strip(), canonical_team(team) if team else "", curr))
+    return out
+
+
+def _merge(index, key, status):
+    # Mesmo jogador em duas fontes: guarda os dois status (bloqueia se qualquer um bloquear)
+    prev = index.get(key)
+    index[key] = status if prev is None or status in prev else f"{prev} | {status}"
+
+
+def _keywords(policy):
+    if isinstance(policy, str): return BLOCK_POLICIES[policy]
+    return tuple(str(k).lower() for k in policy)
+
+
+class InjuryIndex:
+    def __init__(self, records):
+        """`records`: (nome, TIME, status) como sai do flatten_injuries."""
+        status, team_status = {}, {}
+        for name, team, st in records:
+            key = player_key(name)
+            if not key: continue
+            _merge(status, key, st)
+            if team: _merge(team_status, (team, key), st)
+        self.status = status
+        self.team_status = team_status
+        self.teams = frozenset(t for t, _ in team_status)
+        self._lower = {k: v.lower() for k, v in status.items()}
+        self._team_lower = {k: v.lower() for k, v in team_status.items()}
+        self._lock = threading.Lock()
+        self._blocked = {}   # palavras-chave -> (frozenset keys, frozenset (TIME, key))
+
+    def __len__(self):
+        return len(self.status)
+
+    def _policy_sets(self, policy):
+        words = _keywords(policy)
+        sets = self._blocked.get(words)
+        if sets is None:
+            sets = (frozenset(k for k, s in self._lower.items() if any(w in s for w in words)),
+                    frozenset(k for k, s in self._team_lower.items() if any(w in s for w in words)))
+            with self._lock: self._blocked[words] = sets
+        return sets
+
+    # ------------------------------------------------------------------
+    # Consultas (O(1))
+    # ------------------------------------------------------------------
+    def blocked(self, policy="OUT_GTD"):
+        """frozenset de player_keys bloqueados pela política."""
+        return self._policy_sets(policy)[0]
+
+    def status_of(self, name, team=None):
+        key = player_key(name)
+        team = canonical_team(team) if team else ""
+        if team in self.teams: return self.team_status.get((team, key))
+        return self.status.get(key)
+
+    def is_blocked(self, name, team=None, policy="OUT_GTD"):
+        """
+        Bloqueado pela política? Com time conhecido no snapshot, só olha a
+        lista daquele time; sem time (ou time fora do snapshot), a liga toda.
+        """
+        keys, pairs = self._policy_sets(policy)
+        key = player_key(name)
+        team = canonical_team(team) if team else ""
+        if team in self.teams: return (team, key) in pairs
+        return key in keys
+
+
+# ============================================================================
+# CACHE POR VERSÃO DO SNAPSHOT
+# ============================================================================
+_INDEX_LOCK = threading.Lock()
+_INDEX_CACHE = {}
+
+
+def injuries_version(records):
+    h = hashlib.sha1()
+    for name, team, st in records:
+        h.update(f"{name}|{team}|{st};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_injury_index(raw):
+    """InjuryIndex do payload de lesões (qualquer formato), um por versão."""
+    if isinstance(raw, InjuryIndex): return raw
+    records = flatten_injuries(raw) if raw else []
+    version = injuries_version(records)
+    with _INDEX_LOCK:
+        index = _INDEX_CACHE.pop(version, None)
+        if index is None:
+            index = InjuryIndex(records)
+        _INDEX_CACHE[version] = index
+        while len(_INDEX_CACHE) > INJURY_INDEX_CACHE_SIZE:
+            _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+    return index
@@ -5,7 +5,8 @@
 import os
 import json
 import logging
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from boxscore_store import boxscore_store
 import hashlib
 from datetime import datetime
 
@@ -18,6 +19,7 @@ except ImportError:
 
 # Chave do Supabase
 KEY_AUDIT = "audit_trixies"
+BOXSCORE_WORKERS = 8  # boxscores da ESPN baixados em paralelo na validação
 logger = logging.getLogger("AuditSystem")
 
 # HEADERS DE NAVEGADOR (Para passar pelo bloqueio da ESPN)
@@ -127,174 +129,104 @@ class AuditSystem:
     # INTEGRAÇÃO ESPN (COM HEADERS ANTI-BLOQUEIO)
     # =========================================================================
     def fetch_espn_boxscore(self, game_id):
-        if not game_id or str(game_id) in ['MULTI', 'MIX', 'UNK', 'None']: 
-            return None
-        
+        # Jogo final vem do boxscore_store (disco); só jogo em andamento vai à ESPN
         try:
-            url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/nba/summary?event={game_id}"
-            # USA OS HEADERS GLOBAIS
-            r = requests.get(url, timeout=6, headers=HEADERS)
-            if r.status_code == 200: 
-                return r.json()
+            return boxscore_store.espn_summary(game_id, timeout=6)
         except Exception as e: 
             logger.warning(f"Erro boxscore ESPN {game_id}: {e}")
         return None
 
-    def _extract_player_stats(self, boxscore, player_name):
-        """Extração inteligente baseada em labels da ESPN."""
-        try:
-            bs = boxscore.get('boxscore', {})
-            teams = bs.get('players', []) 
-            if not teams: teams = bs.get('teams', [])
-
-            p_clean = player_name.lower().replace('.', '').replace("'", "").strip()
-            
-            for team in teams:
-                stats_block = team.get('statistics', [])
-                if not stats_block: continue
-                
-                # Mapa dinâmico de colunas (Labels)
-                labels = stats_block[0].get('labels', [])
-                idx_map = {label: i for i, label in enumerate(labels)}
-                
-                idx_pts = idx_map.get("PTS", -1)
-                idx_reb = idx_map.get("REB", -1)
-                idx_ast = idx_map.get("AST", -1)
-                idx_stl = idx_map.get("STL", -1)
-                idx_blk = idx_map.get("BLK", -1)
-                idx_to  = idx_map.get("TO", -1)
-                idx_3pt = idx_map.get("3PT", -1)
-                if idx_3pt == -1: idx_3pt = idx_map.get("3PM", -1)
-
-                athletes = stats_block[0].get('athletes', [])
-                
-                for ath in athletes:
-                    ath_name = ath.get('athlete', {}).get('displayName', '').lower().replace('.', '').replace("'", "").strip()
-                    
-                    # Fuzzy match simples
-                    if p_clean in ath_name or ath_name in p_clean:
-                        stats = ath.get('stats', [])
-                        
-                        def get_val(idx):
-                            if idx != -1 and idx < len(stats):
-                                try: return float(stats[idx])
-                                except: return 0.0
-                            return 0.0
-                        
-                        # Tratamento especial para 3PM (Formato "2-5" -> 2.0)
-                        t3 = 0.0
-                        if idx_3pt != -1 and idx_3pt < len(stats):
-                            val_str = str(stats[idx_3pt])
-                            if "-" in val_str:
-                                try: t3 = float(val_str.split("-")[0])
-                                except: t3 = 0.0
-                            else:
-                                try: t3 = float(val_str)
-                                except: t3 = 0.0
-
-                        return {
-                            "PTS": get_val(idx_pts),
-                            "REB": get_val(idx_reb),
-                            "AST": get_val(idx_ast),
-                            "STL": get_val(idx_stl),
-                            "BLK": get_val(idx_blk),
-                            "3PM": t3,
-                            "TOV": get_val(idx_to)
-                        }
-        except Exception:
-            pass
-        return None
+    def _extract_player_stats(self, index, player_name, team=None):
+        """Stats do jogador pelo PlayerIndex do jogo (id/nome exato, depois fuzzy restrito)."""
+        row = index.find(player_name, team=team) if index else None
+        if row is None: return None
+        return {k: row.get(k, 0.0) for k in ("PTS", "REB", "AST", "STL", "BLK", "3PM", "TOV")}
 
     # =========================================================================
     # SMART VALIDATION
     # =========================================================================
-    def smart_validate_ticket(self, ticket_id):
-        # 1. Carrega dados frescos
-        self.audit_data = self._load_data()
+    def _resolve_game_id(self, leg, ticket):
+        """game_id da perna (ou do bilhete, se a perna não tiver). None se não houver."""
+        g_id = leg.get('game_id')
         
-        ticket = next((t for t in self.audit_data if t.get('id') == ticket_id), None)
-        if not ticket: return False, "Bilhete não encontrado."
+        # Tenta achar ID no ticket se não tiver na perna
+        if not g_id or str(g_id) in ['MULTI', 'MIX', 'UNK']:
+            ticket_gid = ticket.get('game_info', {}).get('game_id')
+            if ticket_gid and str(ticket_gid) not in ['MULTI', 'MIX']:
+                return ticket_gid
+            return None
+        return g_id
 
-        legs = ticket.get('legs', [])
-        bs_cache = {}
-        updates = False
-        
-        report = {"total": len(legs), "updated": 0, "no_id": 0, "game_pending": 0}
-        any_lost = False
+    def _fetch_boxscores(self, game_ids, max_workers=BOXSCORE_WORKERS):
+        """{game_id: (final, PlayerIndex)} baixando/indexando cada jogo uma vez, em paralelo."""
+        def fetch(g_id):
+            try: return boxscore_store.espn_index(g_id, timeout=6)
+            except Exception as e:
+                logger.warning(f"Erro boxscore ESPN {g_id}: {e}")
+                return False, None
 
-        for leg in legs:
-            # Se já ganhou ou perdeu, não valida de novo (a menos que queira forçar)
-            if leg.get('status') in ['WIN', 'LOSS'] and leg.get('actual_value', 0) > 0:
-                continue
+        game_ids = list(dict.fromkeys(game_ids))
+        if not game_ids: return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(game_ids)))) as executor:
+            results = executor.map(fetch, game_ids)
+            return {g: res for g, res in zip(game_ids, results) if res[1] is not None}
 
-            g_id = leg.get('game_id')
-            
-            # Tenta achar ID no ticket se não tiver na perna
-            if not g_id or str(g_id) in ['MULTI', 'MIX', 'UNK']:
-                ticket_gid = ticket.get('game_info', {}).get('game_id')
-                if ticket_gid and str(ticket_gid) not in ['MULTI', 'MIX']:
-                    g_id = ticket_gid
-                else:
-                    report["no_id"] += 1
-                    continue
-
-            # Cache de Boxscore para não spammar API
-            if g_id not in bs_cache:
-                bs = self.fetch_espn_boxscore(g_id)
-                if bs: bs_cache[g_id] = bs
-                else: continue 
+    def _settle_leg(self, leg, box, report):
+        """Aplica o boxscore numa perna. True se a perna mudou."""
+        is_final, index = box
+        stats = self._extract_player_stats(index, leg.get('player_name', ''), leg.get('team'))
+        
+        # Verifica se jogo acabou
+        if not is_final: report["game_pending"] += 1
+
+        if stats:
+            mkt = leg.get('market_type', 'UNK')
+            line = float(leg.get('line', 0))
+            actual = 0.0
             
-            boxscore = bs_cache[g_id]
-            stats = self._extract_player_stats(boxscore, leg.get('player_name', ''))
+            # Mapeamento de mercados
+            if mkt == "PTS": actual = stats['PTS']
+            elif mkt == "REB": actual = stats['REB']
+            elif mkt == "AST": actual = stats['AST']
+            elif mkt == "STL": actual = stats['STL']
+            elif mkt == "BLK": actual = stats['BLK']
+            elif mkt == "3PM": actual = stats['3PM']
+            elif mkt == "PRA": actual = stats['PTS'] + stats['REB'] + stats['AST']
             
-            # Verifica se jogo acabou
-            try:
-                game_status = boxscore.get('header', {}).get('competitions', [{}])[0].get('status', {}).get('type', {})
-                is_final = game_status.get('completed', False)
-                if not is_final: report["game_pending"] += 1
-            except: is_final = False
-
-            if stats:
-                mkt = leg.get('market_type', 'UNK')
-                line = float(leg.get('line', 0))
-                actual = 0.0
-                
-                # Mapeamento de mercados
-                if mkt == "PTS": actual = stats['PTS']
-                elif mkt == "REB": actual = stats['REB']
-                elif mkt == "AST": actual = stats['AST']
-                elif mkt == "STL": actual = stats['STL']
-                elif mkt == "BLK": actual = stats['BLK']
-                elif mkt == "3PM": actual = stats['3PM']
-                elif mkt == "PRA": actual = stats['PTS'] + stats['REB'] + stats['AST']
-                
-                # Combo markets (Ex: PTS+AST)
-                if "+" in mkt:
-                    parts = mkt.split('+')
-                    val_sum = 0
-                    for p in parts: val_sum += stats.get(p, 0)
-                    actual = val_sum
-
-                leg['actual_value'] = actual
-                
-                # Lógica de Win/Loss
-                if actual >= line:
-                    leg['status'] = 'WIN'
-                elif is_final:
-                    leg['status'] = 'LOSS'
-                    any_lost = True
-                
-                updates = True
-                report["updated"] += 1
+            # Combo markets (Ex: PTS+AST)
+            if "+" in mkt:
+                parts = mkt.split('+')
+                val_sum = 0
+                for p in parts: val_sum += stats.get(p, 0)
+                actual = val_sum
+
+            leg['actual_value'] = actual
             
+            # Lógica de Win/Loss
+            if actual >= line:
+                leg['status'] = 'WIN'
             elif is_final:
-                # Jogo acabou e jogador não encontrado -> DNP (Did Not Play) -> Loss
                 leg['status'] = 'LOSS'
-                leg['actual_value'] = 0
-                any_lost = True
-                updates = True
-                report["updated"] += 1
+            
+            report["updated"] += 1
+            return True
+        
+        if is_final:
+            # Jogo acabou e jogador não encontrado -> DNP (Did Not Play) -> Loss
+            leg['status'] = 'LOSS'
+            leg['actual_value'] = 0
+            report["updated"] += 1
+            return True
+        return False
+
+    @staticmethod
+    def _pending_legs(ticket):
+        # Se já ganhou ou perdeu, não valida de novo (a menos que queira forçar)
+        return [leg for leg in ticket.get('legs', [])
+                if not (leg.get('status') in ['WIN', 'LOSS'] and leg.get('actual_value', 0) > 0)]
 
+    @staticmethod
+    def _update_ticket_status(ticket):
         # Atualiza Status Global do Ticket
         current_legs = ticket.get('legs', [])
         has_loss = any(l.get('status') == 'LOSS' for l in current_legs)
@@ -302,8 +234,33 @@ class AuditSystem:
         
         if has_loss: ticket['status'] = 'LOSS'
         elif all_wins: ticket['status'] = 'WIN'
+
+    def _settle_ticket(self, ticket, boxes, report):
+        """Liquida as pernas pendentes de um bilhete com os boxscores já baixados."""
+        updates = False
+        for leg in self._pending_legs(ticket):
+            g_id = self._resolve_game_id(leg, ticket)
+            if g_id is None:
+                report["no_id"] += 1
+                continue
+            box = boxes.get(g_id)
+            if box is None: continue
+            if self._settle_leg(leg, box, report): updates = True
+        self._update_ticket_status(ticket)
+        return updates
+
+    def smart_validate_ticket(self, ticket_id):
+        # 1. Carrega dados frescos
+        self.audit_data = self._load_data()
         
-        if updates: 
+        ticket = next((t for t in self.audit_data if t.get('id') == ticket_id), None)
+        if not ticket: return False, "Bilhete não encontrado."
+
+        report = {"total": len(ticket.get('legs', [])), "updated": 0, "no_id": 0, "game_pending": 0}
+        game_ids = [g for g in (self._resolve_game_id(l, ticket) for l in self._pending_legs(ticket)) if g is not None]
+        boxes = self._fetch_boxscores(game_ids)
+
+        if self._settle_ticket(ticket, boxes, report): 
             self._persist() # Salva na nuvem
 
         if report["updated"] > 0:
@@ -312,3 +269,32 @@ class AuditSystem:
             return True, "Jogos ainda em andamento. Volte mais tarde."
             
         return True, "Validação concluída."
+
+    def validate_all_pending(self, on_progress=None):
+        """
+        Liquida todos os bilhetes PENDING de uma vez: junta os game_ids de
+        todas as pernas, baixa cada boxscore uma vez (em paralelo), aplica e
+        salva na nuvem uma única vez. on_progress(fase, feito, total).
+        """
+        self.audit_data = self._load_data()
+        pending = [t for t in self.audit_data if t.get('status', 'PENDING') == 'PENDING']
+        report = {"tickets": len(pending), "updated_tickets": 0, "games": 0,
+                  "updated": 0, "no_id": 0, "game_pending": 0}
+        if not pending: return report
+
+        game_ids = []
+        for ticket in pending:
+            for leg in self._pending_legs(ticket):
+                g_id = self._resolve_game_id(leg, ticket)
+                if g_id is not None: game_ids.append(g_id)
+        if on_progress: on_progress("boxscores", 0, len(set(game_ids)))
+        boxes = self._fetch_boxscores(game_ids)
+        report["games"] = len(boxes)
+
+        for i, ticket in enumerate(pending, start=1):
+            if self._settle_ticket(ticket, boxes, report): report["updated_tickets"] += 1
+            if on_progress: on_progress("tickets", i, len(pending))
+
+        if report["updated_tickets"]:
+            self._persist()  # um upload para o lote inteiro
+        return report
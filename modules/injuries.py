@@ -9,7 +9,9 @@ import os
 import json
 import time
 from datetime import datetime
-import requests
+from http_client import http_get
+from roster_loader import roster_snapshot
+from injury_index import get_injury_index
 import unicodedata
 import re
 
@@ -59,7 +61,7 @@ def fetch_cbs_injuries():
     
     url = "https://www.cbssports.com/nba/injuries/"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
+        r = http_get(url, headers=HEADERS, timeout=10)
         if r.status_code != 200: return {}
         
         soup = BeautifulSoup(r.text, "html.parser")
@@ -96,6 +98,7 @@ class InjuryMonitor:
         # Cache em memória apenas para execução corrente
         self.cbs_data = {} 
         self.last_cbs_update = 0
+        self._index = None  # InjuryIndex do snapshot atual (refeito só quando o snapshot muda)
         
         # Carrega estado inicial do Supabase
         self.cache = self._load_from_cloud()
@@ -123,50 +126,35 @@ class InjuryMonitor:
 
     def fetch_injuries_for_team(self, team_abbr):
         """
-        Busca na ESPN API e enriquece com dados da CBS em memória.
+        Lê o elenco do roster_snapshot (ESPN, 1 download por time por TTL)
+        e enriquece com dados da CBS em memória.
         """
         # Garante que temos dados da CBS atualizados
         if not self.cbs_data: self.refresh_market_intelligence()
         
-        # Mapeamento ESPN
-        nba_to_espn = {
-            "UTA": "utah", "NOP": "no", "NYK": "ny", "GSW": "gs", "SAS": "sa", 
-            "PHX": "pho", "WAS": "wsh", "BKN": "bkn"
-        }
-        team_code = nba_to_espn.get(team_abbr.upper(), team_abbr.lower())
-        url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams/{team_code}/roster"
-        
-        time.sleep(0.2) # Delay anti-bloqueio
-        
         try:
-            r = requests.get(url, headers=HEADERS, timeout=10)
-            if r.status_code != 200: return False
+            if roster_snapshot.raw(team_abbr, refresh=False) is None:
+                roster_snapshot.refresh([team_abbr], headers=HEADERS)
+            if roster_snapshot.raw(team_abbr, refresh=False) is None: return False
             
-            data = r.json()
             team_injuries = []
             
-            # Extração segura de atletas
-            athletes = []
-            if "athletes" in data: athletes = data["athletes"]
-            elif "team" in data and "athletes" in data["team"]: athletes = data["team"]["athletes"]
-            
-            for ath in athletes:
-                raw_name = ath.get("fullName", "")
+            for p in roster_snapshot.team_players(team_abbr, refresh=False):
+                raw_name = p["name"]
                 norm_name = normalize_name(raw_name)
                 
                 # 1. Dados Oficiais (ESPN API)
-                espn_status = ath.get("status", {}).get("type", {}).get("name", "Active")
-                espn_injuries = ath.get("injuries", [])
+                espn_status = p["status"]
                 
                 is_hurt = False
                 final_status = espn_status
                 details = ""
                 
                 # Detecta flag na ESPN
-                if espn_injuries:
+                if p["injured"]:
                     is_hurt = True
-                    final_status = espn_injuries[0].get("status", final_status)
-                    details = espn_injuries[0].get("shortComment", "")
+                    final_status = p["injury_status"] or final_status
+                    details = p["details"]
                 elif "active" not in str(espn_status).lower():
                     is_hurt = True
                 
@@ -197,6 +185,7 @@ class InjuryMonitor:
             
             # Atualiza cache local
             self.cache["teams"][team_abbr.upper()] = team_injuries
+            self._index = None
             return True
             
         except Exception as e:
@@ -210,6 +199,8 @@ class InjuryMonitor:
         success_count = 0
         # print(f"🔄 [InjuryMonitor] Cruzando dados de {len(team_list)} times...")
         
+        # Elencos de todos os times em paralelo (snapshot compartilhado)
+        roster_snapshot.refresh(team_list, headers=HEADERS, timeout=10)
         for team in team_list:
             if self.fetch_injuries_for_team(team):
                 success_count += 1
@@ -235,30 +226,15 @@ class InjuryMonitor:
         """Retorna lesões de um time (Lê da memória que foi carregada do Supabase)."""
         return self.cache.get("teams", {}).get(team_abbr.upper(), [])
 
-    def is_player_blocked(self, player_name, team_abbr):
-        """
-        Verifica se o jogador deve ser bloqueado.
-        Usa Fuzzy Match e palavras-chave de risco.
-        """
-        target = normalize_name(player_name)
-        injuries = self.get_team_injuries(team_abbr)
-        
-        # Palavras que indicam risco inaceitável para aposta
-        block_keywords = ['out', 'surg', 'injur', 'doubt', 'protocol', 'g-league']
-        
-        # 'Questionable' (quest) e 'Day-to-Day' (day) são riscos.
-        # Se quiser ser conservador, mantenha na lista.
-        block_keywords.extend(['quest', 'day', 'gtd', 'game time']) 
-        
-        for inj in injuries:
-            inj_name = inj.get("name_norm", "")
-            # Se nome bate
-            if target in inj_name or inj_name in target:
-                status = str(inj.get("status", "")).lower()
-                # Se status contém palavra proibida
-                if any(x in status for x in block_keywords):
-                    return True
-        return False
+    def index(self):
+        """Índice nome -> status e bloqueados por política do snapshot carregado."""
+        if self._index is None:
+            self._index = get_injury_index(self.cache.get("teams", {}))
+        return self._index
+
+    def is_player_blocked(self, player_name, team_abbr, policy="OUT_GTD_DAY"):
+        """Consulta O(1) no índice (política: ver injury_index.BLOCK_POLICIES)."""
+        return self.index().is_blocked(player_name, team_abbr, policy=policy)
 
 # Instância Global
 monitor = InjuryMonitor()
@@ -1,4 +1,4 @@
-import requests
+from http_client import http_get
 
 def get_espn_boxscore(game_id):
     """Busca o JSON completo do jogo na ESPN."""
@@ -9,7 +9,7 @@ def get_espn_boxscore(game_id):
     
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = http_get(url, headers=headers, timeout=10)
         if resp.status_code == 200:
             return resp.json()
     except:
@@ -19,6 +19,13 @@ import hashlib # Adicionado para garantir determinismo
 
 logger = logging.getLogger("Desdobrador_Inteligente_v3.3_Fixed")
 
+try:
+    from game_slate import get_game_slate
+    SLATE_AVAILABLE = True
+except ImportError:
+    SLATE_AVAILABLE = False
+    logger.warning("game_slate indisponível: Desdobrador desativado.")
+
 class DesdobradorInteligente:
     def __init__(self, strategy_engine):
         self.engine = strategy_engine
@@ -85,21 +92,24 @@ class DesdobradorInteligente:
         except Exception as e:
             logger.warning(f"Erro ao aplicar seed: {e}")
 
-    def gerar_desdobramentos(self, players_ctx: Dict, games_ctx: List[Dict], 
+    def gerar_desdobramentos(self, players_ctx: Dict, games_ctx, 
                             perfil: str = 'BALANCEADO', max_combinacoes: int = 20) -> List[Dict]:
+        """`games_ctx`: GameSlate do dia (ou a lista crua do scoreboard, convertida aqui)."""
         logger.info(f"Iniciando v3.3 (Audit Fix) - Perfil: {perfil}")
+        if not SLATE_AVAILABLE: return []
+        slate = get_game_slate(games_ctx)
         
         # 0. APLICAR DETERMINISMO (FIX: Isso impede que os resultados mudem a cada clique)
-        self._set_deterministic_seed(games_ctx)
+        self._set_deterministic_seed(slate)
 
         # Garantir que o perfil está em maiúsculas
         perfil = perfil.upper()
         
         # 1. ANÁLISE CONTEXTUAL DOS JOGOS
-        game_analysis = self._analisar_contexto_jogos(games_ctx)
+        game_analysis = self._analisar_contexto_jogos(slate)
         
         # 2. CLUSTERIZAÇÃO COM CONTEXTO
-        pools = self._criar_pools_contextuais(players_ctx, games_ctx, perfil, game_analysis)
+        pools = self._criar_pools_contextuais(players_ctx, slate, perfil, game_analysis)
         
         total_legs = sum(len(p) for p in pools.values())
         if total_legs < 8:
@@ -135,30 +145,16 @@ class DesdobradorInteligente:
         
         return comb_finais
     
-    def _analisar_contexto_jogos(self, games_ctx: List[Dict]) -> Dict:
-        """Analisa contexto dos jogos para tomada de decisão"""
+    def _analisar_contexto_jogos(self, slate) -> Dict:
+        """Analisa contexto dos jogos para tomada de decisão (spread/risco já parseados no slate)"""
         analysis = {}
         
-        for game in games_ctx:
-            # FIX: Prioriza game_id numérico se disponível
-            game_id = game.get('game_id')
-            if not game_id or game_id == "UNK":
-                game_id = f"{game.get('away')} @ {game.get('home')}"
-            
-            # Análise de blowout potential (baseado em spreads)
-            spread = 0
-            try:
-                spread = abs(float(game.get('spread', 0)))
-            except:
-                spread = 0
-                
-            blowout_risk = 'ALTO' if spread > 12 else 'MEDIO' if spread > 8 else 'BAIXO'
-            
+        for i, game_id in enumerate(slate.game_ids):
             analysis[game_id] = {
-                'spread': spread,
-                'blowout_risk': blowout_risk,
-                'total_line': game.get('total', 0),
-                'teams': [game.get('away'), game.get('home')]
+                'spread': abs(float(slate.spread[i])),
+                'blowout_risk': slate.risk[i],
+                'total_line': float(slate.total[i]),
+                'teams': [slate.away[i], slate.home[i]]
             }
             
         return analysis
@@ -226,27 +222,18 @@ class DesdobradorInteligente:
              avg = player['adjusted_stats'].get(market.lower(), 0)
         return f"Análise Técnica (Avg {avg:.1f})"
     
-    def _criar_pools_contextuais(self, players_ctx: Dict, games_ctx: List[Dict], 
+    def _criar_pools_contextuais(self, players_ctx: Dict, slate, 
                                 perfil: str, game_analysis: Dict) -> Dict[str, List[Dict]]:
         pools = {'PTS': [], 'AST': [], 'REB': [], 'COMBO': []}
         
-        game_map = {}
-        for game in games_ctx:
-            # FIX: Prioriza game_id numérico
-            game_id = game.get('game_id')
-            if not game_id or game_id == "UNK":
-                game_id = f"{game.get('away')} @ {game.get('home')}"
-                
-            game_map[game.get('away')] = {'game_id': game_id, 'opponent': game.get('home')}
-            game_map[game.get('home')] = {'game_id': game_id, 'opponent': game.get('away')}
-        
         for team, players in players_ctx.items():
-            if team not in game_map:
+            # Jogo e adversário direto do slate (siglas canônicas, O(1))
+            game_info = slate.context(team)
+            if game_info is None:
                 continue
                 
-            game_info = game_map[team]
             game_id = game_info['game_id']
-            opponent = game_info['opponent']
+            opponent = game_info['opp']
             
             # Contexto do jogo atual
             game_ctx = game_analysis.get(game_id, {})
@@ -5,7 +5,7 @@
 import os
 import json
 import pandas as pd
-import requests
+from http_client import http_get
 import time
 from datetime import datetime
 
@@ -100,7 +100,7 @@ class DvPAnalyzer:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
-            response = requests.get(DATA_URL, headers=headers, timeout=10)
+            response = http_get(DATA_URL, headers=headers, timeout=10)
             
             if response.status_code != 200:
                 print(f"❌ Erro HTTP {response.status_code}")
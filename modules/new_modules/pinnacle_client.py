@@ -1,6 +1,11 @@
-import requests
+from http_client import http_get
 import re
+import json
+import time
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any
 
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +22,7 @@ class PinnacleClient:
         }
         self.SPORT_ID = 3      # Basquete
         self.LEAGUE_ID = 487   # NBA Regular Season
+        self.timeout = (3.05, 10)  # Antes sem timeout: uma conexão presa travava a página
 
     def get_nba_games(self) -> List[Dict]:
         """Busca contexto dos jogos (Spread/Total)"""
@@ -24,7 +30,7 @@ class PinnacleClient:
         params = {"sport_id": self.SPORT_ID, "league_ids": self.LEAGUE_ID, "is_have_odds": "true"}
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = http_get(url, headers=self.headers, params=params, timeout=self.timeout)
             if response.status_code != 200: return []
             data = response.json()
             
@@ -66,15 +72,17 @@ class PinnacleClient:
             return clean_games
         except: return []
 
-    def get_player_props(self, game_id: int) -> List[Dict]:
-        """Busca props com filtros relaxados e mapeamento corrigido"""
+    def get_player_props(self, game_id: int, raise_errors: bool = False) -> List[Dict]:
+        """Busca props com filtros relaxados e mapeamento corrigido.
+        raise_errors=True propaga falhas de rede/HTTP (o sync diferencia erro de evento sem props)."""
         url = f"{self.base_url}/kit/v1/special-markets"
         params = {"sport_id": self.SPORT_ID, "event_id": game_id}
         
         props_list = []
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = http_get(url, headers=self.headers, params=params, timeout=self.timeout)
+            if raise_errors: response.raise_for_status()
             data = response.json()
             specials = data.get('specials', [])
             
@@ -140,5 +148,117 @@ class PinnacleClient:
             return props_list
 
         except Exception as e:
+            if raise_errors: raise
             logger.error(f"Erro props: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+# ============================================================================
+# SYNC DE PROPS (PARALELO + MERGE INCREMENTAL)
+# ============================================================================
+# Antes: get_player_props jogo a jogo e o pinnacle_props_map refeito do zero.
+# Agora todos os eventos saem juntos (concorrência limitada + espaçamento
+# mínimo entre requisições para respeitar o RapidAPI) e cada resposta entra
+# num índice jogador -> mercado -> {line, odds, ts, game_id}. Evento cujo
+# hash de mercados não mudou desde o último sync não é remesclado.
+PROPS_MAX_WORKERS = 6
+PROPS_MIN_INTERVAL = 0.2   # segundos entre disparos (~5 req/s no RapidAPI)
+
+
+class PropsIndex:
+    def __init__(self, max_workers=PROPS_MAX_WORKERS, min_interval=PROPS_MIN_INTERVAL):
+        self.max_workers = max_workers
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._pace_lock = threading.Lock()
+        self._next_slot = 0.0
+        self.index = {}          # jogador -> mercado -> {line, odds, ts, game_id}
+        self.event_hash = {}     # game_id -> hash dos mercados
+        self.event_players = {}  # game_id -> {(jogador, mercado)} que vieram dele
+        self.last_sync = None
+
+    def _pace(self):
+        # Reserva o próximo horário livre; cada worker dorme só o necessário
+        with self._pace_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now: time.sleep(slot - now)
+
+    def _fetch(self, client, game_id):
+        self._pace()
+        return client.get_player_props(game_id, raise_errors=True)
+
+    @staticmethod
+    def _hash(props):
+        raw = json.dumps(sorted((p["player"], p["market"], p["line"], p["odds"]) for p in props), default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _merge(self, game_id, props, ts):
+        """Troca as entradas do evento pelas novas. Chamar com o lock."""
+        for name, market in self.event_players.get(game_id, ()):
+            entry = self.index.get(name, {}).get(market)
+            if entry and entry.get("game_id") == game_id:
+                del self.index[name][market]
+                if not self.index[name]: del self.index[name]
+        keys = set()
+        for p in props:
+            self.index.setdefault(p["player"], {})[p["market"]] = {
+                "line": p["line"], "odds": p["odds"], "ts": ts, "game_id": game_id
+            }
+            keys.add((p["player"], p["market"]))
+        self.event_players[game_id] = keys
+
+    def sync(self, client, games, on_progress=None):
+        """
+        Baixa as props de todos os `games` em paralelo e mescla no índice.
+        Jogos que saíram do slate são removidos. on_progress(done, total, game).
+        Retorna contadores {fetched, changed, unchanged, failed}.
+        """
+        stats = {"fetched": 0, "changed": 0, "unchanged": 0, "failed": 0}
+        by_id = {g["game_id"]: g for g in games or [] if g.get("game_id") is not None}
+        total = len(by_id)
+
+        with self._lock:
+            for gid in [g for g in self.event_players if g not in by_id]:
+                self._merge(gid, [], None)
+                self.event_players.pop(gid, None)
+                self.event_hash.pop(gid, None)
+
+        if total:
+            workers = max(1, min(self.max_workers, total))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._fetch, client, gid): gid for gid in by_id}
+                for done, fut in enumerate(as_completed(futures), start=1):
+                    gid = futures[fut]
+                    try:
+                        props = fut.result() or []
+                    except Exception as e:
+                        logger.error(f"Erro props {gid}: {e}")
+                        props = None
+                    if props is None:
+                        stats["failed"] += 1
+                    else:
+                        stats["fetched"] += 1
+                        h = self._hash(props)
+                        with self._lock:
+                            if self.event_hash.get(gid) == h:
+                                stats["unchanged"] += 1
+                            else:
+                                self._merge(gid, props, time.time())
+                                self.event_hash[gid] = h
+                                stats["changed"] += 1
+                    if on_progress: on_progress(done, total, by_id[gid])
+
+        with self._lock:
+            self.last_sync = time.time()
+        return stats
+
+    def props_map(self):
+        """Cópia no formato do pinnacle_props_map (jogador -> mercado -> dados)."""
+        with self._lock:
+            return {name: {m: dict(v) for m, v in markets.items()} for name, markets in self.index.items()}
+
+
+# Índice único do processo (todas as sessões enxergam o mesmo sync)
+props_index = PropsIndex()
@@ -1,6 +1,7 @@
-import time
 import pandas as pd
-from nba_api.stats.endpoints import teamgamelogs, boxscoretraditionalv2
+from nba_api.stats.endpoints import teamgamelogs
+from nba_scheduler import nba_frame, PRIORITY_BACKGROUND
+from boxscore_store import boxscore_store
 from nba_api.stats.static import teams
 
 class RotationForensics:
@@ -39,12 +40,13 @@ class RotationForensics:
         
         try:
             # 1. Busca jogos com diferença de placar >= 14 (Blowout claro)
-            logs_call = teamgamelogs.TeamGameLogs(
+            logs = nba_frame(
+                teamgamelogs.TeamGameLogs,
+                priority=PRIORITY_BACKGROUND,
                 team_id_nullable=tid, 
                 season_nullable=current_season, 
                 last_n_games_numeric=lookback
             )
-            logs = logs_call.get_data_frames()[0]
             
             # Filtra vitórias ou derrotas por 14+ pontos
             blowout_games = logs[logs['PLUS_MINUS'].abs() >= 14]
@@ -56,11 +58,9 @@ class RotationForensics:
             player_stats = {}
             # Analisa os últimos 10 blowouts para capturar a rotação mais recente
             for gid in game_ids[:10]:
-                # --- CORREÇÃO 2: AUMENTO DO SLEEP PARA EVITAR RATE LIMIT (403 Forbidden) ---
-                time.sleep(0.7) 
-                
+                # --- CORREÇÃO 2: RATE LIMIT (403 Forbidden) FICA COM O nba_scheduler ---
                 try:
-                    box = boxscoretraditionalv2.BoxScoreTraditionalV2(game_id=gid).get_data_frames()[0]
+                    box = boxscore_store.nba_traditional(gid)  # jogo do TeamGameLogs = final, fica no disco
                     team_box = box[box['TEAM_ID'] == tid]
                     
                     for _, row in team_box.iterrows():
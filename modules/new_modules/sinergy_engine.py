@@ -2,7 +2,13 @@
 # ==============================================================================
 # SINERGY ENGINE v2.0 - O CAÇADOR DE CORRELAÇÕES
 # ==============================================================================
-import statistics
+import numpy as np
+
+try:
+    from player_log_store import get_log_store
+    STORE_AVAILABLE = True
+except ImportError:
+    STORE_AVAILABLE = False
 
 class SinergyEngine:
     def __init__(self):
@@ -13,56 +19,42 @@ class SinergyEngine:
         Analisa qual companheiro tem a maior correlação positiva 
         quando o Herói explode em uma estatística (Ex: AST).
         """
-        hero_data = logs_cache.get(hero_name, {})
-        if not hero_data: return None, 0
+        if not STORE_AVAILABLE or not logs_cache: return None, 0
+        store = get_log_store(logs_cache)
+        hero_row = store.row.get(hero_name)
+        if hero_row is None: return None, 0
 
         # Pega os logs do Herói
-        hero_logs = hero_data.get('logs', {}).get(trigger_stat, [])
-        if len(hero_logs) < 5: return None, 0
+        hero_logs = store.series(hero_row, trigger_stat, 15)
+        if store.count(trigger_stat, 5, [hero_row])[0] < 5: return None, 0
 
         # Define o "Gatilho" (Ex: Jogos onde deu mais que a média de assistências)
         avg_trigger = sum(hero_logs[:10]) / len(hero_logs[:10])
         threshold = max(5, avg_trigger * 1.1) # Jogos 10% acima da média
 
         # Identifica os índices dos jogos onde o Herói foi bem
-        explosive_indices = [i for i, val in enumerate(hero_logs[:15]) if val >= threshold]
+        explosive_indices = [i for i, val in enumerate(hero_logs) if val >= threshold]
         
         if len(explosive_indices) < 2: 
             return None, 0 # Pouca amostra de explosão
 
-        best_partner = None
-        best_synergy_score = 0
-        best_partner_avg = 0
-
-        # Varre todos os jogadores do MESMO time
-        for teammate_name, t_data in logs_cache.items():
-            if teammate_name == hero_name: continue
-            if t_data.get('team') != hero_team: continue
-
-            t_logs = t_data.get('logs', {}).get(target_stat, [])
-            if not t_logs: continue
-
-            # Calcula média normal do parceiro
-            normal_avg = sum(t_logs[:15]) / len(t_logs[:15])
-            if normal_avg < 12: continue # Ignora bagres com poucos pontos
-
-            # Calcula média do parceiro APENAS nos jogos onde o Herói explodiu
-            synergy_vals = []
-            for idx in explosive_indices:
-                if idx < len(t_logs):
-                    synergy_vals.append(t_logs[idx])
-            
-            if not synergy_vals: continue
-            
-            synergy_avg = sum(synergy_vals) / len(synergy_vals)
-            
-            # O Score é o quanto ele melhora (Ex: Média 20 -> Média 25 com o Herói = +25%)
-            improvement_pct = ((synergy_avg - normal_avg) / normal_avg) * 100
-            
-            # Filtro: Tem que melhorar pelo menos 5% e ter média relevante
-            if improvement_pct > 5 and synergy_avg > best_partner_avg:
-                best_partner = teammate_name
-                best_partner_avg = synergy_avg
-                best_synergy_score = improvement_pct
-
-        return best_partner, best_partner_avg
+        # Todos os jogadores do MESMO time, numa matriz companheiro x jogo (L15)
+        rows = np.array([r for r, t in enumerate(store.teams) if t == hero_team and r != hero_row], dtype=np.int64)
+        if not len(rows): return None, 0
+        window = store.window(target_stat, 15, rows)
+        played = np.sum(~np.isnan(window), axis=1)
+
+        # Média normal do parceiro e média APENAS nos jogos onde o Herói explodiu
+        normal_avg = np.nansum(window, axis=1) / np.maximum(played, 1)
+        boom = window[:, explosive_indices]
+        boom_games = np.sum(~np.isnan(boom), axis=1)
+        synergy_avg = np.nansum(boom, axis=1) / np.maximum(boom_games, 1)
+
+        # O Score é o quanto ele melhora (Ex: Média 20 -> Média 25 com o Herói = +25%)
+        # Filtro: ignora bagres (< 12), tem que melhorar pelo menos 5% e ter média relevante
+        improvement_pct = (synergy_avg - normal_avg) / np.where(normal_avg > 0, normal_avg, 1.0) * 100
+        eligible = (played > 0) & (normal_avg >= 12) & (boom_games > 0) & (improvement_pct > 5) & (synergy_avg > 0)
+        if not eligible.any(): return None, 0
+
+        best = int(np.argmax(np.where(eligible, synergy_avg, -np.inf)))
+        return store.names[int(rows[best])], float(synergy_avg[best])
@@ -1,6 +1,7 @@
-import time
 import pandas as pd
-from nba_api.stats.endpoints import teamgamelogs, boxscoretraditionalv2
+from nba_api.stats.endpoints import teamgamelogs
+from nba_scheduler import nba_frame, PRIORITY_BACKGROUND
+from boxscore_store import boxscore_store
 from nba_api.stats.static import teams
 
 class RotationForensics:
@@ -28,7 +29,7 @@ class RotationForensics:
         tid = self.team_map.get(team_abbr)
         if not tid: return []
         try:
-            logs = teamgamelogs.TeamGameLogs(team_id_nullable=tid, season_nullable='2024-25', last_n_games_nullable=lookback).get_data_frames()[0]
+            logs = nba_frame(teamgamelogs.TeamGameLogs, priority=PRIORITY_BACKGROUND, team_id_nullable=tid, season_nullable='2024-25', last_n_games_nullable=lookback)
             blowouts = logs[logs['PLUS_MINUS'].abs() >= 15]
         except: return []
 
@@ -38,8 +39,7 @@ class RotationForensics:
 
         for gid in game_ids:
             try:
-                time.sleep(0.4) 
-                box = boxscoretraditionalv2.BoxScoreTraditionalV2(game_id=gid).get_data_frames()[0]
+                box = boxscore_store.nba_traditional(gid)  # jogo do TeamGameLogs = final, fica no disco
                 team_box = box[box['TEAM_ID'] == tid]
                 for _, row in team_box.iterrows():
                     name = row['PLAYER_NAME']
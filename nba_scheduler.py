@@ -0,0 +1,219 @@
+# ============================================================================
+# NBA SCHEDULER (FILA ÚNICA PARA O stats.nba.com)
+# ============================================================================
+# Todas as chamadas nba_api do processo passam por aqui. Antes cada módulo
+# tinha o seu time.sleep(0.4/0.6/0.7) e nenhum sabia do outro: com o L5, o
+# H2H e a narrativa rodando juntos o stats.nba.com devolvia 429/403.
+#
+#   - token bucket: no máximo RATE req/s (rajada de BURST)
+#   - MAX_CONCURRENT requisições abertas ao mesmo tempo
+#   - prioridade: página interativa passa na frente de refresh em background
+#   - dedupe: chamadas idênticas em voo compartilham a mesma resposta
+#   - backoff adaptativo: 429/403/timeout derrubam a taxa e pausam a fila;
+#     respostas OK recuperam a taxa aos poucos
+#
+# Uso:
+#   from nba_scheduler import nba_frame, PRIORITY_BACKGROUND
+#   df = nba_frame(playergamelog.PlayerGameLog, player_id=pid, season=SEASON)
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+DEFAULT_RATE = float(os.environ.get("SUITENAS_NBA_RATE", 2.0))          # req/s
+DEFAULT_BURST = int(os.environ.get("SUITENAS_NBA_BURST", 4))
+DEFAULT_MAX_CONCURRENT = int(os.environ.get("SUITENAS_NBA_CONCURRENCY", 3))
+
+# Status HTTP que significam "vai mais devagar"
+THROTTLE_STATUS = {403, 429, 500, 502, 503, 504}
+
+
+def _is_throttle_error(exc):
+    """True para erros transitórios (bloqueio, timeout, conexão caída)."""
+    try:
+        import requests
+        if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return True
+        if isinstance(exc, requests.exceptions.HTTPError):
+            status = getattr(exc.response, "status_code", None)
+            return status in THROTTLE_STATUS
+    except ImportError:
+        pass
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # Página de bloqueio do stats.nba.com chega como HTML -> JSONDecodeError
+    if isinstance(exc, ValueError) and "Expecting value" in str(exc):
+        return True
+    return False
+
+
+def _request_key(endpoint_cls, params):
+    # timeout não muda a resposta, então não entra na chave do dedupe
+    items = tuple(sorted((k, repr(v)) for k, v in params.items() if k != "timeout"))
+    return (getattr(endpoint_cls, "__module__", ""), getattr(endpoint_cls, "__name__", str(endpoint_cls)), items)
+
+
+class NBAScheduler:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_concurrent=DEFAULT_MAX_CONCURRENT,
+                 max_retries=3, min_rate=0.2, base_backoff=2.0, max_backoff=60.0):
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._active = 0
+        self._waiting = {}        # ticket -> prioridade (menor passa primeiro)
+        self._seq = 0
+        self._cooldown_until = 0.0
+        self._strikes = 0         # erros de throttle seguidos
+        self._inflight = {}       # request_key -> Future
+        self.stats = {"calls": 0, "deduped": 0, "retries": 0, "throttled": 0,
+                      "failed": 0, "last_error": None}
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def call(self, endpoint_cls, priority=PRIORITY_INTERACTIVE, **params):
+        """
+        Instancia `endpoint_cls(**params)` respeitando taxa/concorrência.
+        Devolve o objeto do endpoint (get_data_frames/get_dict já prontos).
+        Chamadas idênticas em voo recebem o mesmo objeto.
+        """
+        key = _request_key(endpoint_cls, params)
+        with self._cond:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+            else:
+                self.stats["deduped"] += 1
+
+        if not owner:
+            return fut.result()
+
+        try:
+            result = self._execute(endpoint_cls, priority, params)
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    def frames(self, endpoint_cls, priority=PRIORITY_INTERACTIVE, **params):
+        return self.call(endpoint_cls, priority=priority, **params).get_data_frames()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats.update({
+                "rate": round(self.rate, 2), "active": self._active,
+                "waiting": len(self._waiting), "inflight": len(self._inflight),
+                "cooldown": max(0.0, round(self._cooldown_until - time.monotonic(), 1)),
+            })
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _execute(self, endpoint_cls, priority, params):
+        attempt = 0
+        while True:
+            self._acquire(priority)
+            try:
+                with self._cond:
+                    self.stats["calls"] += 1
+                result = endpoint_cls(**params)
+            except Exception as e:
+                throttled = _is_throttle_error(e)
+                self._release(throttled=throttled, error=e)
+                if not throttled or attempt >= self.max_retries:
+                    with self._cond:
+                        self.stats["failed"] += 1
+                    raise
+                attempt += 1
+                with self._cond:
+                    self.stats["retries"] += 1
+                continue
+            self._release(throttled=False)
+            return result
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _acquire(self, priority):
+        with self._cond:
+            self._seq += 1
+            ticket = (priority, self._seq)
+            self._waiting[ticket] = priority
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    is_next = min(self._waiting) == ticket
+                    wait = None
+                    if not is_next or self._active >= self.max_concurrent:
+                        wait = None  # acordado por release/notify
+                    elif now < self._cooldown_until:
+                        wait = self._cooldown_until - now
+                    elif self._tokens < 1.0:
+                        wait = (1.0 - self._tokens) / self.rate
+                    else:
+                        self._tokens -= 1.0
+                        self._active += 1
+                        return
+                    self._cond.wait(wait)
+            finally:
+                del self._waiting[ticket]
+                self._cond.notify_all()
+
+    def _release(self, throttled, error=None):
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                # Backoff exponencial com jitter + corta a taxa pela metade
+                self._strikes += 1
+                self.stats["throttled"] += 1
+                self.stats["last_error"] = f"{type(error).__name__}: {error}"[:200]
+                delay = min(self.max_backoff, self.base_backoff * (2 ** (self._strikes - 1)))
+                delay *= random.uniform(0.8, 1.2)
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                self.rate = max(self.min_rate, self.rate * 0.5)
+                self._tokens = 0.0
+                print(f"⏳ [NBA] Throttle ({type(error).__name__}). Pausa {delay:.1f}s, taxa {self.rate:.2f} req/s.")
+            elif error is None:
+                self._strikes = 0
+                self.rate = min(self.base_rate, self.rate * 1.1)
+            self._cond.notify_all()
+
+
+# Instância única do processo (Streamlit reexecuta o script, o módulo fica)
+scheduler = NBAScheduler()
+
+
+def nba_call(endpoint_cls, priority=PRIORITY_INTERACTIVE, **params):
+    return scheduler.call(endpoint_cls, priority=priority, **params)
+
+
+def nba_frames(endpoint_cls, priority=PRIORITY_INTERACTIVE, **params):
+    return scheduler.frames(endpoint_cls, priority=priority, **params)
+
+
+def nba_frame(endpoint_cls, priority=PRIORITY_INTERACTIVE, index=0, **params):
+    """Atalho para o caso comum: get_data_frames()[index]."""
+    return scheduler.frames(endpoint_cls, priority=priority, **params)[index]
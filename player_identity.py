@@ -0,0 +1,268 @@
+# ============================================================================
+# PLAYER IDENTITY (NOME -> ID NBA / NOME CANÔNICO / FOTO, PROCESSO INTEIRO)
+# ============================================================================
+# Trinity, Blowout Hunter, Garimpo, Escalações, Depto Médico, Desdobramentos,
+# Hit Prop Hunter, 5/7/10 e Nexus montavam cada um o seu mapa nome -> ID
+# varrendo df_l5.iterrows() a cada render, e o resolve_player_id do Trinity
+# ainda caía numa busca parcial linear no vault inteiro. Aqui as fontes
+# (nba_players_map.json, tabela L5 e real_game_logs) viram, uma vez por
+# versão dos dados, um conjunto de índices:
+#
+#   exato          player_key -> registro             ('LUKADONCIC')
+#   sobrenome+time (sobrenome, TIME) -> ids            ('DONCIC', 'DAL')
+#   sobrenome      sobrenome -> ids (só se único na liga)
+#   prefixo        mesmo sobrenome e primeiro nome prefixo ('Nic'/'Nicolas')
+#   trigramas      trigrama -> chaves, desempate por similaridade (difflib)
+#
+# e cada resolve(nome, time) fica memoizado no próprio índice.
+#
+# Uso:
+#   from player_identity import get_player_identity
+#   ident = get_player_identity(df_l5=st.session_state.get('df_l5'), logs=logs)
+#   ident.resolve('Nic Claxton', 'BKN')  # {'id', 'name', 'team', 'min', 'headshot'}
+#   ident.headshot('Luka Doncic')
+import difflib
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+
+from roster_loader import name_tokens
+from game_slate import canonical_team
+
+PLAYERS_MAP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nba_players_map.json")
+HEADSHOT_URL = "https://cdn.nba.com/headshots/nba/latest/1040x760/{pid}.png"
+FALLBACK_HEADSHOT = "https://cdn.nba.com/headshots/nba/latest/1040x760/fallback.png"
+FUZZY_MIN_RATIO = 0.85   # similaridade mínima (difflib) para aceitar um match por trigramas
+FUZZY_MIN_MARGIN = 0.05  # o melhor tem que ganhar do segundo por pelo menos isso
+IDENTITY_CACHE_SIZE = 4
+
+# Colunas aceitas na tabela L5 (o nome varia conforme a origem do DataFrame)
+L5_NAME_COLS = ("PLAYER_NAME", "PLAYER", "NAME")
+L5_ID_COLS = ("PLAYER_ID", "ID", "PERSON_ID")
+L5_TEAM_COLS = ("TEAM", "TEAM_ABBREVIATION", "TEAM_CODE")
+L5_MIN_COLS = ("MIN_AVG", "MIN", "MINUTES")
+
+
+def headshot_url(pid):
+    try: pid = int(float(pid or 0))
+    except (TypeError, ValueError): pid = 0
+    return HEADSHOT_URL.format(pid=pid) if pid > 0 else FALLBACK_HEADSHOT
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _to_int(v):
+    try: return int(float(v))
+    except (TypeError, ValueError): return 0
+
+
+def _to_float(v):
+    try: return float(v)
+    except (TypeError, ValueError): return 0.0
+
+
+def _l5_records(df_l5):
+    """Registros (nome, id, time, minutos) da tabela L5, sem iterrows."""
+    if df_l5 is None or not hasattr(df_l5, "columns") or getattr(df_l5, "empty", True): return []
+    cols = {str(c).upper().strip(): c for c in df_l5.columns}
+    pick = lambda options: next((cols[c] for c in options if c in cols), None)
+    c_name, c_id = pick(L5_NAME_COLS), pick(L5_ID_COLS)
+    if c_name is None or c_id is None: return []
+    c_team, c_min = pick(L5_TEAM_COLS), pick(L5_MIN_COLS)
+    n = len(df_l5)
+    names = df_l5[c_name].tolist()
+    ids = df_l5[c_id].tolist()
+    teams = df_l5[c_team].tolist() if c_team is not None else [""] * n
+    mins = df_l5[c_min].tolist() if c_min is not None else [0.0] * n
+    return [(str(nm), _to_int(pid), str(tm or ""), _to_float(mn)) for nm, pid, tm, mn in zip(names, ids, teams, mins)]
+
+
+def _log_records(logs):
+    return [(name, _to_int(e.get("id")), str(e.get("team") or ""), 0.0)
+            for name, e in (logs or {}).items() if isinstance(e, dict)]
+
+
+def _map_records(players_map):
+    return [(name, _to_int(pid), "", 0.0) for name, pid in (players_map or {}).items()]
+
+
+_MAP_CACHE = {}  # caminho -> (mtime, dict)
+
+
+def load_players_map(path=PLAYERS_MAP_FILE):
+    """nba_players_map.json (nome -> id), relido só quando o arquivo muda."""
+    try:
+        mtime = os.path.getmtime(path)
+        cached = _MAP_CACHE.get(path)
+        if cached and cached[0] == mtime: return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data = data if isinstance(data, dict) else {}
+        _MAP_CACHE[path] = (mtime, data)
+        return data
+    except (OSError, ValueError):
+        return {}
+
+
+class PlayerIdentity:
+    def __init__(self, records):
+        """`records`: (nome, id, time, minutos) em ordem de prioridade (o primeiro vence)."""
+        self.by_key = {}                  # player_key -> registro
+        self.by_last_team = defaultdict(set)
+        self.by_last = defaultdict(set)
+        self.by_last_first = defaultdict(list)  # sobrenome -> [(primeiro nome, chave)]
+        self.by_trigram = defaultdict(set)
+        self._lock = threading.Lock()
+        self._memo = {}
+        self.stats = {"lookups": 0, "memo_hits": 0, "fuzzy": 0, "misses": 0}
+
+        for name, pid, team, minutes in records:
+            tokens = name_tokens(name)
+            if not tokens: continue
+            key = "".join(tokens)
+            team = canonical_team(team) if team else ""
+            rec = self.by_key.get(key)
+            if rec is None:
+                rec = {"id": 0, "name": name, "team": team, "min": 0.0}
+                self.by_key[key] = rec
+                last = "".join(tokens[1:]) or tokens[0]
+                self.by_last_first[last].append((tokens[0], key))
+                for tg in _trigrams(key): self.by_trigram[tg].add(key)
+            # Fonte de prioridade menor só completa o que falta
+            if not rec["id"] and pid > 0: rec["id"] = pid
+            if not rec["team"] and team: rec["team"] = team
+            if not rec["min"] and minutes: rec["min"] = minutes
+
+        for key, rec in self.by_key.items():
+            if not rec["id"]: continue
+            tokens = name_tokens(rec["name"])
+            last = "".join(tokens[1:]) or tokens[0]
+            self.by_last[last].add(rec["id"])
+            if rec["team"]: self.by_last_team[(last, rec["team"])].add(rec["id"])
+        self._by_id = {rec["id"]: rec for rec in self.by_key.values() if rec["id"]}
+
+    @property
+    def size(self):
+        return len(self.by_key)
+
+    # ------------------------------------------------------------------
+    # Resolução (exato -> sobrenome+time -> prefixo -> sobrenome único -> trigramas)
+    # ------------------------------------------------------------------
+    def _unique(self, ids):
+        return self._by_id.get(next(iter(ids))) if len(ids) == 1 else None
+
+    def _lookup(self, tokens, team):
+        key = "".join(tokens)
+        rec = self.by_key.get(key)
+        if rec is not None and rec["id"]: return rec
+
+        last = "".join(tokens[1:]) or tokens[0]
+        if team:
+            rec = self._unique(self.by_last_team.get((last, team), ()))
+            if rec: return rec
+
+        if len(tokens) > 1:
+            first = tokens[0]
+            cands = {self.by_key[k]["id"] for f, k in self.by_last_first.get(last, [])
+                     if self.by_key[k]["id"] and min(len(f), len(first)) >= 3
+                     and (f.startswith(first) or first.startswith(f))}
+            rec = self._unique(cands)
+            if rec: return rec
+
+        rec = self._unique(self.by_last.get(last, ()))
+        if rec and (not team or not rec["team"] or rec["team"] == team): return rec
+
+        # Trigramas: candidatos que dividem mais trigramas, desempate por similaridade
+        grams = _trigrams(key)
+        votes = defaultdict(int)
+        for tg in grams:
+            for k in self.by_trigram.get(tg, ()): votes[k] += 1
+        shortlist = sorted(votes, key=votes.get, reverse=True)[:10]
+        scored = sorted(((difflib.SequenceMatcher(None, key, k).ratio(), k) for k in shortlist
+                         if self.by_key[k]["id"]), reverse=True)
+        if scored and scored[0][0] >= FUZZY_MIN_RATIO and (len(scored) == 1 or scored[0][0] - scored[1][0] >= FUZZY_MIN_MARGIN):
+            rec = self.by_key[scored[0][1]]
+            if not team or not rec["team"] or rec["team"] == team:
+                with self._lock: self.stats["fuzzy"] += 1
+                return rec
+        return None
+
+    def resolve(self, name, team=None):
+        """{'id', 'name', 'team', 'min', 'headshot'} (id 0 e foto padrão se não achar)."""
+        team = canonical_team(team) if team and str(team).upper() not in ("UNK", "?") else ""
+        tokens = name_tokens(name)
+        memo_key = ("".join(tokens), team)
+        with self._lock:
+            self.stats["lookups"] += 1
+            hit = self._memo.get(memo_key)
+            if hit is not None:
+                self.stats["memo_hits"] += 1
+                return hit
+        rec = self._lookup(tokens, team) if tokens else None
+        if rec:
+            out = {"id": rec["id"], "name": rec["name"], "team": rec["team"], "min": rec["min"],
+                   "headshot": headshot_url(rec["id"])}
+        else:
+            # Sem id, mas o registro exato ainda pode ter minutos/time
+            rec = self.by_key.get(memo_key[0]) or {}
+            out = {"id": 0, "name": rec.get("name", name), "team": rec.get("team", team), "min": rec.get("min", 0.0),
+                   "headshot": FALLBACK_HEADSHOT}
+            with self._lock: self.stats["misses"] += 1
+        with self._lock:
+            self._memo[memo_key] = out
+        return out
+
+    def player_id(self, name, team=None):
+        return self.resolve(name, team)["id"]
+
+    def headshot(self, name, team=None, pid=0):
+        """Foto pelo id direto (se válido) ou pelo nome."""
+        if _to_int(pid) > 0: return headshot_url(pid)
+        return self.resolve(name, team)["headshot"]
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, players=len(self.by_key), memo=len(self._memo))
+
+
+# ============================================================================
+# CACHE POR VERSÃO (UM ÍNDICE POR COMBINAÇÃO DE FONTES)
+# ============================================================================
+_IDENTITY_LOCK = threading.Lock()
+_IDENTITY_CACHE = {}
+
+
+def _version(*record_lists):
+    h = hashlib.sha1()
+    for records in record_lists:
+        h.update(b"#")
+        for name, pid, team, minutes in records:
+            h.update(f"{name}|{pid}|{team}|{minutes};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_player_identity(df_l5=None, logs=None, players_map=None):
+    """
+    Índice de identidade compartilhado pelo processo. Fontes, por prioridade:
+    tabela L5 (id + time + minutos), real_game_logs (id + time) e o
+    nba_players_map.json (id). Reconstruído só quando alguma fonte muda.
+    """
+    if players_map is None: players_map = load_players_map()
+    sources = (_l5_records(df_l5), _log_records(logs), _map_records(players_map))
+    version = _version(*sources)
+    with _IDENTITY_LOCK:
+        ident = _IDENTITY_CACHE.pop(version, None)
+        if ident is not None:
+            _IDENTITY_CACHE[version] = ident  # volta para o fim (mais recente)
+            return ident
+    ident = PlayerIdentity([r for records in sources for r in records])
+    with _IDENTITY_LOCK:
+        _IDENTITY_CACHE[version] = ident
+        while len(_IDENTITY_CACHE) > IDENTITY_CACHE_SIZE:
+            _IDENTITY_CACHE.pop(next(iter(_IDENTITY_CACHE)))
+    return ident
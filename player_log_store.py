@@ -0,0 +1,346 @@
+# ============================================================================
+# PLAYER LOG STORE (COLUNAR, NUMPY)
+# ============================================================================
+# Oráculo, Trinity, 5/7/10, Nexus, Garimpo, Hot Streaks e Sinergia varriam o
+# real_game_logs ({nome: {'logs': {'PTS': [...], ...}}}) jogador por jogador,
+# fatiando listas num loop Python por stat. Aqui o dict vira, uma vez por
+# versão dos dados:
+#
+#   data[jogador, jogo, stat]   float32 (jogo 0 = mais recente, NaN = sem jogo)
+#   lengths[jogador]            jogos na janela
+#   names / ids / teams         colunas por linha + índices nome -> linha
+#
+# e as engines pedem janelas inteiras de uma vez: mean/min/kth/hits das
+# últimas N partidas para a liga toda num punhado de operações de coluna.
+#
+# Uso:
+#   from player_log_store import get_log_store
+#   store = get_log_store(real_game_logs)
+#   floors = store.min('PTS', 10)            # um valor por jogador (NaN se < 1 jogo)
+#   ok = store.count('PTS', 10) >= 10
+#
+# Índice de acertos: "quantos dos últimos N foram >= X" e "k-ésimo menor dos
+# últimos N" são as perguntas de Trinity, Hot Streaks, 5/7/10 e Garimpo.
+# Para cada (stat, N) pedido o store guarda, uma vez:
+#
+#   sorted[(stat, N)]   janela ordenada por jogador     -> kth em O(1)
+#   cum[(stat, N)]      histograma acumulado (stats inteiras: cum[p, v] =
+#                       jogos >= v)                     -> hits em O(1)
+#
+# Jogo novo não reconstrói nada: get_log_store compara a marca de cada
+# jogador com o store anterior e só recalcula as linhas que mudaram.
+import hashlib
+import threading
+
+import numpy as np
+
+from roster_loader import player_key
+
+MAX_GAMES = 30  # tamanho da janela publicada pelo Turbo (build_player_log_windows)
+# Nomes alternativos de stat aceitos nas consultas -> coluna do store
+STAT_ALIASES = {"3PM": "FG3M", "FG3M": "3PM", "3PA": "FG3A", "FG3A": "3PA"}
+HIST_MAX_VALUE = 255  # acima disso (ou stat fracionária) o hits cai para a janela ordenada
+PATCH_MAX_SHARE = 0.25  # mais que isso de jogadores mudou -> reconstrói em vez de remendar
+MARK_DIGEST_STATS = ("PTS", "REB", "AST", "MIN")  # marca sem game_ids: valores mais recentes
+MARK_DIGEST_GAMES = 3
+
+
+def _to_float(v):
+    try: return float(str(v).replace(':', '.'))
+    except (TypeError, ValueError): return np.nan
+
+
+def player_mark(name, e):
+    """Marca barata de um jogador (muda quando entra jogo novo ou troca de time)."""
+    marks = e.get('game_ids') or e.get('game_dates') or []
+    logs = e.get('logs') or {}
+    pts = logs.get('PTS') or []
+    head = marks[0] if marks else ''
+    if not marks:
+        # Base antiga sem game_ids/game_dates: janela cheia (30) não muda de tamanho
+        # com jogo novo, então entram os valores mais recentes na marca
+        head = ",".join(str(v) for stat in MARK_DIGEST_STATS
+                        for v in (logs.get(stat) or [])[:MARK_DIGEST_GAMES])
+    return f"{name}|{e.get('team')}|{head}|{len(pts)}"
+
+
+def _entries(logs):
+    return [(name, e) for name, e in (logs or {}).items()
+            if isinstance(e, dict) and isinstance(e.get('logs'), dict) and e['logs']]
+
+
+def logs_version(logs):
+    """Impressão digital barata do real_game_logs (muda quando entra jogo novo)."""
+    h = hashlib.sha1()
+    for name, e in (logs or {}).items():
+        if not isinstance(e, dict): continue
+        h.update(f"{player_mark(name, e)};".encode("utf-8"))
+    return h.hexdigest()
+
+
+class PlayerLogStore:
+    def __init__(self, logs, max_games=MAX_GAMES):
+        entries = _entries(logs)
+        self.max_games = max_games
+        self.names = [name for name, _ in entries]
+        self.marks = [player_mark(name, e) for name, e in entries]
+        self.ids = np.array([int(e.get('id') or 0) for _, e in entries], dtype=np.int64)
+        self.teams = [str(e.get('team') or '') for _, e in entries]
+        self.row = {name: i for i, name in enumerate(self.names)}
+        self.key_row = {}
+        for i, name in enumerate(self.names):
+            self.key_row.setdefault(player_key(name), i)
+
+        stats = []
+        for _, e in entries:
+            for s in e['logs']:
+                if s not in stats: stats.append(s)
+        self.stats = stats
+        self.stat_index = {s: i for i, s in enumerate(stats)}
+
+        n = len(entries)
+        self.data = np.full((n, max_games, len(stats)), np.nan, dtype=np.float32)
+        self.stat_lengths = np.zeros((n, len(stats)), dtype=np.int16)
+        self._load_rows(np.arange(n), [e for _, e in entries])
+        self._sorted = {}   # (coluna, n) -> janela ordenada (NaN no fim)
+        self._cum = {}      # (coluna, n) -> histograma acumulado ou None (stat não inteira)
+
+    def _load_rows(self, rows, entries):
+        """Copia as listas de `entries` para as linhas `rows` do array."""
+        n, width = len(rows), self.max_games
+        self.data[rows] = np.nan
+        for si, stat in enumerate(self.stats):
+            lists = [(e['logs'].get(stat) or [])[:width] for e in entries]
+            lens = np.fromiter((len(v) for v in lists), dtype=np.int64, count=n)
+            self.stat_lengths[rows, si] = lens
+            total = int(lens.sum())
+            if not total: continue
+            flat = [x for v in lists for x in v]
+            try: values = np.asarray(flat, dtype=np.float32)
+            except (TypeError, ValueError): values = np.array([_to_float(x) for x in flat], dtype=np.float32)
+            cols = np.arange(total) - np.repeat(np.cumsum(lens) - lens, lens)
+            self.data[np.repeat(rows, lens), cols, si] = values
+        self.lengths = self.stat_lengths.max(axis=1) if len(self.stats) else np.zeros(len(self.names), dtype=np.int16)
+
+    # ------------------------------------------------------------------
+    # Atualização incremental (jogo novo)
+    # ------------------------------------------------------------------
+    def changed_rows(self, logs):
+        """
+        Linhas cujo jogador mudou em `logs`, ou None se a mudança não cabe num
+        patch (jogador entrou/saiu, stat nova).
+        """
+        entries = _entries(logs)
+        if [name for name, _ in entries] != self.names: return None
+        changed = []
+        for i, (name, e) in enumerate(entries):
+            if player_mark(name, e) == self.marks[i]: continue
+            if any(s not in self.stat_index for s in e['logs']): return None
+            changed.append(i)
+        return changed
+
+    def updated(self, logs, rows):
+        """Cópia do store com só as `rows` relidas de `logs` (índices refeitos nessas linhas)."""
+        new = object.__new__(PlayerLogStore)
+        new.__dict__.update(self.__dict__)
+        new.data, new.stat_lengths = self.data.copy(), self.stat_lengths.copy()
+        new.ids, new.teams, new.marks = self.ids.copy(), list(self.teams), list(self.marks)
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            new._sorted, new._cum = dict(self._sorted), dict(self._cum)
+            return new
+
+        entries = [logs[self.names[r]] for r in rows.tolist()]
+        for r, e in zip(rows.tolist(), entries):
+            new.ids[r] = int(e.get('id') or 0)
+            new.teams[r] = str(e.get('team') or '')
+            new.marks[r] = player_mark(self.names[r], e)
+        new._load_rows(rows, entries)
+
+        new._sorted, new._cum = {}, {}
+        for (si, n), m in self._sorted.items():
+            m = m.copy()
+            m[rows] = np.sort(new._raw_window(si, n, rows), axis=1)
+            new._sorted[(si, n)] = m
+        for (si, n), cum in self._cum.items():
+            part = None if cum is None else new._histogram(si, n, rows, cum.shape[1] - 2)
+            if part is None: continue  # valor fora do histograma: refeito sob demanda
+            cum = cum.copy()
+            cum[rows] = part
+            new._cum[(si, n)] = cum
+        return new
+
+    # ------------------------------------------------------------------
+    # Linhas
+    # ------------------------------------------------------------------
+    @property
+    def size(self):
+        return len(self.names)
+
+    def find(self, name):
+        """Linha do jogador (nome exato, depois player_key) ou None."""
+        r = self.row.get(name)
+        return r if r is not None else self.key_row.get(player_key(name))
+
+    def rows_for_teams(self, teams, normalize=None):
+        """Linhas cujo time (normalizado por `normalize`) está em `teams`."""
+        teams = set(teams)
+        norm = normalize or (lambda t: t)
+        return np.array([i for i, t in enumerate(self.teams) if t and norm(t) in teams], dtype=np.int64)
+
+    def _col(self, stat):
+        si = self.stat_index.get(stat)
+        if si is None: si = self.stat_index.get(STAT_ALIASES.get(stat))
+        return si
+
+    # ------------------------------------------------------------------
+    # Índice de acertos (janela ordenada + histograma acumulado)
+    # ------------------------------------------------------------------
+    def _raw_window(self, si, n, rows=None):
+        m = self.data[:, :n, si] if rows is None else self.data[rows, :n, si]
+        if m.shape[1] < n:  # janela pedida maior que o store: completa com NaN
+            m = np.concatenate([m, np.full((m.shape[0], n - m.shape[1]), np.nan, dtype=np.float32)], axis=1)
+        return m
+
+    def _sorted_window(self, si, n):
+        m = self._sorted.get((si, n))
+        if m is None:
+            m = np.sort(self._raw_window(si, n), axis=1)  # NaN vai para o fim
+            self._sorted[(si, n)] = m
+        return m
+
+    def _histogram(self, si, n, rows=None, vmax=None):
+        """
+        cum[p, v] = jogos >= v nas últimas n (v = 0..vmax+1). None se a stat
+        não for inteira e não-negativa (ou passar de `vmax`, quando fixo).
+        """
+        m = self._raw_window(si, n, rows)
+        valid = ~np.isnan(m)
+        vals = m[valid]
+        if len(vals) and (vals.min() < 0 or np.any(vals != np.round(vals)) or vals.max() > HIST_MAX_VALUE):
+            return None
+        top = int(vals.max()) if len(vals) else 0
+        if vmax is None: vmax = top
+        elif top > vmax: return None
+        counts = np.zeros((m.shape[0], vmax + 2), dtype=np.int16)
+        np.add.at(counts, (np.nonzero(valid)[0], vals.astype(np.int64)), 1)
+        return np.flip(np.cumsum(np.flip(counts, axis=1), axis=1), axis=1)
+
+    def _cum_window(self, si, n):
+        key = (si, n)
+        if key not in self._cum:
+            self._cum[key] = self._histogram(si, n)
+        return self._cum[key]
+
+    # ------------------------------------------------------------------
+    # Janelas (todas devolvem um valor por linha; `rows` restringe)
+    # ------------------------------------------------------------------
+    def window(self, stat, n, rows=None):
+        """Matriz linhas x n das últimas n partidas (NaN onde não há jogo)."""
+        si = self._col(stat)
+        size = self.size if rows is None else len(rows)
+        if si is None: return np.full((size, n), np.nan, dtype=np.float32)
+        return self._raw_window(si, n, rows)
+
+    def count(self, stat, n, rows=None):
+        si = self._col(stat)
+        if si is None: return np.zeros(self.size if rows is None else len(rows), dtype=np.int64)
+        lens = self.stat_lengths[:, si] if rows is None else self.stat_lengths[rows, si]
+        return np.minimum(lens.astype(np.int64), n)
+
+    def mean(self, stat, n, rows=None):
+        """Média das últimas n (0.0 sem jogos, como o sum/len das engines)."""
+        m = self.window(stat, n, rows)
+        cnt = np.sum(~np.isnan(m), axis=1)
+        return np.where(cnt > 0, np.nansum(m, axis=1, dtype=np.float64) / np.maximum(cnt, 1), 0.0)
+
+    def min(self, stat, n, rows=None):
+        """Mínimo das últimas n (NaN sem jogos)."""
+        return self.kth(stat, n, 0, rows)
+
+    def kth(self, stat, n, k, rows=None):
+        """k-ésimo menor valor das últimas n (k=0 -> mínimo). NaN se não houver k+1 jogos."""
+        si = self._col(stat)
+        size = self.size if rows is None else len(rows)
+        if si is None or k >= n: return np.full(size, np.nan)
+        m = self._sorted_window(si, n)
+        col = m[:, k] if rows is None else m[rows, k]
+        return col.astype(np.float64)
+
+    def quantile(self, stat, n, q, rows=None):
+        m = self.window(stat, n, rows)
+        out = np.full(m.shape[0], np.nan)
+        has = ~np.all(np.isnan(m), axis=1)
+        if has.any(): out[has] = np.nanquantile(m[has], q, axis=1)
+        return out
+
+    def hits(self, stat, n, line, rows=None):
+        """Quantos dos últimos n jogos foram >= line (line escalar ou um por linha)."""
+        si = self._col(stat)
+        size = self.size if rows is None else len(rows)
+        if si is None: return np.zeros(size, dtype=np.int64)
+        line = np.asarray(line, dtype=np.float64)
+        cum = self._cum_window(si, n)
+        if cum is not None:
+            # Stat inteira: jogos >= line == jogos >= ceil(line) -> uma leitura no histograma
+            last = cum.shape[1] - 1  # coluna vmax+1: sempre 0 (linha NaN também cai aqui)
+            idx = np.clip(np.ceil(np.where(np.isnan(line), np.inf, line)), 0, last).astype(np.int64)
+            sub = cum if rows is None else cum[rows]
+            if idx.ndim: return sub[np.arange(size), idx].astype(np.int64)
+            return sub[:, int(idx)].astype(np.int64)
+        m = self._sorted_window(si, n)
+        m = m if rows is None else m[rows]
+        if line.ndim: line = line[:, None]
+        return np.sum(m >= line, axis=1)
+
+    def hit_rate(self, row, stat, n, line):
+        """(acertos, jogos) de um jogador nas últimas n contra `line`."""
+        rows = [row]
+        return int(self.hits(stat, n, line, rows)[0]), int(np.sum(~np.isnan(self.window(stat, n, rows))))
+
+    def series(self, row, stat, n=None):
+        """Lista Python das últimas n partidas de uma linha (sem NaN)."""
+        si = self._col(stat)
+        if si is None: return []
+        length = int(self.stat_lengths[row, si])
+        if n is not None: length = min(length, n)
+        values = self.data[row, :length, si]
+        return values[~np.isnan(values)].astype(np.float64).tolist()
+
+
+# ============================================================================
+# CACHE POR VERSÃO (UM STORE POR real_game_logs DIFERENTE)
+# ============================================================================
+_STORE_LOCK = threading.Lock()
+_STORE_CACHE = {}        # versão -> PlayerLogStore (liga inteira e recortes por slate)
+STORE_CACHE_SIZE = 4
+
+
+def get_log_store(logs):
+    """
+    PlayerLogStore do real_game_logs. Mesma versão -> store em cache; poucos
+    jogadores mudaram desde o último store -> cópia remendada só nessas
+    linhas; senão reconstrói.
+    """
+    if isinstance(logs, PlayerLogStore): return logs
+    version = logs_version(logs)
+    with _STORE_LOCK:
+        store = _STORE_CACHE.pop(version, None)
+        if store is not None:
+            _STORE_CACHE[version] = store  # volta para o fim (mais recente)
+            return store
+        bases = list(reversed(_STORE_CACHE.values()))
+
+    store = None
+    for base in bases:
+        rows = base.changed_rows(logs)
+        if rows is not None and len(rows) <= max(1, int(base.size * PATCH_MAX_SHARE)):
+            store = base.updated(logs, rows)
+            break
+    if store is None: store = PlayerLogStore(logs)
+
+    with _STORE_LOCK:
+        _STORE_CACHE[version] = store
+        while len(_STORE_CACHE) > STORE_CACHE_SIZE:
+            _STORE_CACHE.pop(next(iter(_STORE_CACHE)))
+    return store
@@ -0,0 +1,218 @@
+# ============================================================================
+# ROSTER LOADER (ELENCOS ESPN DO SLATE EM PARALELO)
+# ============================================================================
+# Escalações, Garimpo, InjuryMonitor e fetch_team_roster baixavam o JSON de
+# elenco da ESPN um time por vez (15 jogos = 30 idas e voltas em série).
+# fetch_slate_rosters dispara todos os times de uma vez num pool limitado e
+# devolve um único mapa TIME -> JSON do elenco. As conexões e o 304 vêm do
+# http_client. Páginas e engines leem pelo roster_snapshot (abaixo).
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import http_get
+
+# Mapa de tradução NBA Oficial -> Códigos URL da ESPN
+ESPN_TEAM_CODES = {
+    "ATL": "atl", "BOS": "bos", "BKN": "bkn", "CHA": "cha", "CHI": "chi",
+    "CLE": "cle", "DAL": "dal", "DEN": "den", "DET": "det", "GSW": "gs",
+    "HOU": "hou", "IND": "ind", "LAC": "lac", "LAL": "lal", "MEM": "mem",
+    "MIA": "mia", "MIL": "mil", "MIN": "min", "NOP": "no", "NYK": "ny",
+    "OKC": "okc", "ORL": "orl", "PHI": "phi", "PHX": "pho", "POR": "por",
+    "SAC": "sac", "SAS": "sa", "TOR": "tor", "UTA": "utah", "WAS": "wsh"
+}
+ESPN_ROSTER_URL = "https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams/{team}/roster"
+ROSTER_MAX_WORKERS = 8
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def espn_team_code(team_abbr):
+    return ESPN_TEAM_CODES.get(str(team_abbr).upper(), str(team_abbr).lower())
+
+
+def roster_athletes(data):
+    """Lista de atletas do JSON de elenco (formato plano ou aninhado em 'team')."""
+    if not isinstance(data, dict): return []
+    if "athletes" in data: return data["athletes"] or []
+    if "team" in data and "athletes" in data["team"]: return data["team"]["athletes"] or []
+    return []
+
+
+def slate_teams(games):
+    """Times (sem repetição, na ordem do scoreboard) dos jogos do dia."""
+    teams = []
+    for g in games or []:
+        for side in ("home", "away"):
+            t = g.get(f"{side}_abbr") or g.get(side)
+            if t and t != "UNK" and t not in teams: teams.append(t)
+    return teams
+
+
+def fetch_roster(team_abbr, headers=None, timeout=10):
+    """JSON do elenco de um time, ou None se a ESPN não respondeu 200."""
+    url = ESPN_ROSTER_URL.format(team=espn_team_code(team_abbr))
+    try:
+        r = http_get(url, headers=headers or DEFAULT_HEADERS, timeout=timeout)
+        if r.status_code == 200:
+            return r.json()
+    except Exception as e:
+        print(f"⚠️ [Roster] Falha {team_abbr}: {e}")
+    return None
+
+
+def fetch_slate_rosters(teams, headers=None, timeout=10, max_workers=ROSTER_MAX_WORKERS):
+    """
+    Baixa os elencos de todos os `teams` em paralelo.
+    Retorna {TIME: json}; times que falharam ficam de fora do mapa.
+    """
+    unique = []
+    for t in teams or []:
+        if t and t not in unique: unique.append(t)
+    if not unique: return {}
+
+    workers = max(1, min(max_workers, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda t: fetch_roster(t, headers=headers, timeout=timeout), unique)
+        return {t: data for t, data in zip(unique, results) if data is not None}
+
+
+# ============================================================================
+# SNAPSHOT DE ELENCOS/LESÕES (TTL ÚNICO PARA O PROCESSO)
+# ============================================================================
+# Um só lugar transforma o JSON de elenco em registros de jogador. Cada
+# time é baixado no máximo uma vez por janela de ROSTER_TTL, não importa
+# quantas páginas/engines perguntem. Índices:
+#   - status(nome)          -> registro do jogador (por player_key)
+#   - active_roster(time)   -> jogadores liberados
+#   - blocked()             -> player_keys de quem não joga
+ROSTER_TTL = 600  # segundos (o mesmo do antigo st.cache_data do Garimpo)
+_NAME_SUFFIXES = {"JR", "SR", "II", "III", "IV", "V"}
+# Status de lesão da ESPN que tiram o jogador do jogo
+BLOCKING_INJURY_STATUS = {"OUT", "SUSPENSION", "SUSPENDED"}
+
+
+def name_tokens(name):
+    """'Jaren Jackson Jr.' -> ['JAREN', 'JACKSON'] (sem acento, pontuação e sufixo)."""
+    if not name: return []
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").upper()
+    # Iniciais coladas por ponto viram um token só: 'C.J.' -> 'CJ'
+    text = re.sub(r"\b([A-Z])\.(?=[A-Z]\.)", r"\1", text)
+    return [t for t in re.split(r"[^A-Z0-9]+", text) if t and t not in _NAME_SUFFIXES]
+
+
+def player_key(name):
+    """Chave canônica de nome: 'Jaren Jackson Jr.' -> 'JARENJACKSON'."""
+    return "".join(name_tokens(name))
+
+
+def parse_roster_player(ath, team):
+    """Registro único de jogador a partir de um atleta do JSON da ESPN."""
+    if not isinstance(ath, dict): return None
+    name = ath.get("fullName") or ath.get("displayName") or "Unknown"
+
+    pos_obj = ath.get("position") if isinstance(ath.get("position"), dict) else {}
+    status_obj = ath.get("status") if isinstance(ath.get("status"), dict) else {}
+    type_obj = status_obj.get("type") if isinstance(status_obj.get("type"), dict) else {}
+    status = type_obj.get("name", "Active")
+
+    injuries = ath.get("injuries") or []
+    inj = injuries[0] if injuries and isinstance(injuries[0], dict) else {}
+    injury_status = inj.get("status", "")
+
+    active = status == "Active" and str(injury_status).upper() not in BLOCKING_INJURY_STATUS
+    return {
+        "name": name, "key": player_key(name), "team": team,
+        "espn_id": ath.get("id", 0), "pos": pos_obj.get("abbreviation", "-"),
+        "status": status, "injury_status": injury_status,
+        "details": inj.get("shortComment", ""), "injured": bool(injuries),
+        "active": active,
+    }
+
+
+class RosterSnapshot:
+    def __init__(self, ttl=ROSTER_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # um refresh por vez no processo
+        self._teams = {}    # TIME -> {"fetched_at", "data", "players"}
+        self._by_key = {}   # player_key -> registro
+        self.stats = {"fetches": 0, "hits": 0}
+
+    # ------------------------------------------------------------------
+    # Atualização
+    # ------------------------------------------------------------------
+    def refresh(self, teams, force=False, headers=None, timeout=10):
+        """Baixa só os times vencidos (ou todos se force). Retorna {TIME: json}."""
+        teams = [str(t).upper() for t in teams or [] if t and t != "UNK"]
+        with self._refresh_lock:
+            now = time.time()
+            with self._lock:
+                stale = [t for t in dict.fromkeys(teams)
+                         if force or t not in self._teams or now - self._teams[t]["fetched_at"] >= self.ttl]
+                self.stats["hits"] += len(set(teams)) - len(stale)
+            if stale:
+                fetched = fetch_slate_rosters(stale, headers=headers, timeout=timeout)
+                with self._lock:
+                    self.stats["fetches"] += len(stale)
+                    for t, data in fetched.items():
+                        self._teams[t] = {
+                            "fetched_at": now, "data": data,
+                            "players": [p for p in (parse_roster_player(a, t) for a in roster_athletes(data)) if p],
+                        }
+                    self._reindex()
+        with self._lock:
+            return {t: self._teams[t]["data"] for t in teams if t in self._teams}
+
+    def invalidate(self, team=None):
+        with self._lock:
+            if team is None: self._teams.clear()
+            else: self._teams.pop(str(team).upper(), None)
+            self._reindex()
+
+    def _reindex(self):
+        self._by_key = {p["key"]: p for entry in self._teams.values() for p in entry["players"]}
+
+    # ------------------------------------------------------------------
+    # Leitura (índices)
+    # ------------------------------------------------------------------
+    def raw(self, team, refresh=True):
+        """JSON cru da ESPN (para quem ainda lê o formato original)."""
+        if refresh: self.refresh([team])
+        with self._lock:
+            entry = self._teams.get(str(team).upper())
+            return entry["data"] if entry else None
+
+    def team_players(self, team, refresh=True):
+        if refresh: self.refresh([team])
+        with self._lock:
+            entry = self._teams.get(str(team).upper())
+            return list(entry["players"]) if entry else []
+
+    def active_roster(self, team, refresh=True):
+        return [p for p in self.team_players(team, refresh=refresh) if p["active"]]
+
+    def status(self, name):
+        with self._lock:
+            return self._by_key.get(player_key(name))
+
+    def is_blocked(self, name):
+        p = self.status(name)
+        return bool(p) and not p["active"]
+
+    def blocked(self, teams=None):
+        """player_keys bloqueados (todos os times carregados ou só `teams`)."""
+        if teams: self.refresh(teams)
+        wanted = {str(t).upper() for t in teams} if teams else None
+        with self._lock:
+            return {p["key"] for t, entry in self._teams.items() if wanted is None or t in wanted
+                    for p in entry["players"] if not p["active"]}
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, teams=len(self._teams), players=len(self._by_key))
+
+
+# Instância única do processo (compartilhada por todas as sessões)
+roster_snapshot = RosterSnapshot()